@@ -6,7 +6,10 @@ import csv
 import os
 import sys
 import re
+from array import array
 from typing import *
+from Utilities.profiling import profiled
+from Utilities.raw_text import read_records
 
 
 # Helper functions for preprocessing
@@ -52,12 +55,15 @@ class Preprocessing:
                  question_num: int = None,
                  sentences_path: str = None,
                  people_path: str = None,
-                 stopwords_path: str = None) -> None:
+                 stopwords_path: str = None,
+                 record_offsets: bool = False) -> None:
 
         # Initialize the Preprocessing class with the required data paths
         self.question_num = question_num
         self.sentences_path = sentences_path
         self.people_path = people_path
+        # With record_offsets, the start and end byte offsets of the record of each processed sentence (--raw_offsets)
+        self.sentence_offsets = array('Q') if record_offsets else None
         self.stopwords = self.load_stopwords_file(stopwords_path)
 
         if not stopwords_path:  # Stopwords are required for preprocessing
@@ -91,6 +97,20 @@ class Preprocessing:
             print(f"Error loading stopwords file: {e}")
             sys.exit(1)
 
+    def sentence_records(self) -> Iterator[Tuple[str, int, int]]:
+        """
+        Read the sentences CSV file.
+        :return: The sentences, each with the byte offsets of its record when they are recorded (0, 0 otherwise).
+        """
+        if self.sentence_offsets is not None:
+            for row, start, end in read_records(self.sentences_path):
+                yield row['sentence'], start, end
+            return
+        with open(self.sentences_path, "r") as file:
+            for row in csv.DictReader(file):
+                yield row['sentence'], 0, 0
+
+    @profiled(count=len)
     def preprocess_sentences(self) -> List[List[str]]:
         """
         Preprocess the sentences from the sentences CSV file.
@@ -99,19 +119,22 @@ class Preprocessing:
         :return: A list of processed sentences.
         """
         processed_sentences = []
+        if self.sentence_offsets is not None:
+            del self.sentence_offsets[:]
         try:
             # Load the sentences CSV file and clean the sentences
-            with open(self.sentences_path, "r") as file:
-                reader = csv.DictReader(file)
-                for row in reader:
-                    sentence = clean_text(row['sentence'], self.stopwords)
-                    if sentence:  # Skip empty sentences
-                        processed_sentences.append(sentence.split())
+            for text, start, end in self.sentence_records():
+                sentence = clean_text(text, self.stopwords)
+                if sentence:  # Skip empty sentences
+                    processed_sentences.append(sentence.split())
+                    if self.sentence_offsets is not None:
+                        self.sentence_offsets.extend((start, end))
             return processed_sentences
         except Exception as e:
             print(f"Error loading sentences file: {e}")
             sys.exit(1)
 
+    @profiled(count=len)
     def preprocess_people(self) -> List[List[List[str]]]:
         """
         Preprocess the people from the people CSV file.
@@ -5,8 +5,39 @@
 
 from collections import defaultdict
 import sys
-from typing import Dict, Any
+from typing import Dict, Any, List
 from Utilities.helper import preprocess_init
+from Utilities.profiling import profiled
+
+
+@profiled()
+def add_sequence_counts(sequence_counts: Dict[str, Dict[tuple, int]], sentences: List[List[str]], N: int):
+    """
+    Count the sequences of up to length N of the sentences, adding to existing counts.
+    :param sequence_counts: {"<size>_seq" -> {sequence -> count}}, updated in place.
+    :param sentences: The processed sentences to count.
+    :param N: Maximum size of the sequences.
+    """
+    for sentence in sentences:
+        for seq_size in range(1, N + 1):
+            counts = sequence_counts.setdefault(f"{seq_size}_seq", defaultdict(int))
+            for i in range(len(sentence) - seq_size + 1):  # Loop over the sentence
+                seq = tuple(sentence[i:i + seq_size])  # Create a sequence of length seq_size
+                counts[seq] += 1  # Increment the count of the sequence
+
+
+def format_sequence_counts(sequence_counts: Dict[str, Dict[tuple, int]], N: int) -> list:
+    """
+    Convert sequence counts to the sorted Task 2 output format.
+    :param sequence_counts: {"<size>_seq" -> {sequence -> count}}.
+    :param N: Maximum size of the sequences.
+    :return: A list of lists where each inner list contains a sequence type (e.g., "1_seq") and its key-value pairs.
+    """
+    return [
+        [seq_type, sorted([[" ".join(key), value] for key, value in sequence_counts.get(seq_type, {}).items()],
+                          key=lambda x: x[0])]
+        for seq_type in (f"{i}_seq" for i in range(1, N + 1))
+    ]
 
 
 class SequenceCounter:
@@ -16,7 +47,8 @@ class SequenceCounter:
             sentences_path: str = None,
             stopwords_path: str = None,
             preprocess_path: str = None,
-            N: int = None
+            N: int = None,
+            data: Dict[str, Any] = None
     ):
         """
         Initialize the PersonMentionCounter class.
@@ -25,6 +57,7 @@ class SequenceCounter:
         :param stopwords_path: The path for a file with a list of common words to remove CSV file.
         :param preprocess_path: Path to the preprocessed JSON file (optional).
         :param N: Maximum size of the sequences to create.
+        :param data: Already preprocessed data, as returned by preprocess_init (optional).
         """
         # Initialize the class attributes
         self.question_num = question_num
@@ -36,32 +69,24 @@ class SequenceCounter:
         self.preprocess_path = preprocess_path
 
         # Load the preprocessed data weather from a preprocessed file or preprocess it from raw data
-        self.data = preprocess_init(preprocess_path, sentences_path, None, stopwords_path)
+        if data is None:
+            data = preprocess_init(preprocess_path, sentences_path, None, stopwords_path)
+        self.data = data
 
     @property
+    @profiled(count=lambda counts: sum(len(seqs) for _, seqs in counts))
     def count_sequences(self) -> list[list[str | list[list[str | int]]]]:
         """
         Count the occurrence of sequences of up to length of N in the processed sentences.
         :return: A list of lists where each inner list contains a sequence type (e.g., "1_seq") and its key-value pairs.
         """
 
-        # Initialize a dictionary to store the counts of sequences of different lengths
-        sequence_counts = {f"{i}_seq": defaultdict(int) for i in range(1, self.N + 1)}
-
         # Count the sequences of different lengths in the processed sentences
-        for sentence in self.data.get("Processed Sentences", []):
-            for seq_size in range(1, self.N + 1):
-                for i in range(len(sentence) - seq_size + 1):  # Loop over the sentence
-                    seq = tuple(sentence[i:i + seq_size])  # Create a sequence of length seq_size
-                    sequence_counts[f"{seq_size}_seq"][seq] += 1  # Increment the count of the sequence
-
-        # Convert default dict to a sorted list of lists
-        sorted_counts = [
-            [seq_type, sorted([[" ".join(key), value] for key, value in counts.items()], key=lambda x: x[0])]
-            for seq_type, counts in sequence_counts.items()
-        ]
+        sequence_counts = {}
+        add_sequence_counts(sequence_counts, self.data.get("Processed Sentences", []), self.N)
 
-        return sorted_counts
+        # Convert to a sorted list of lists
+        return format_sequence_counts(sequence_counts, self.N)
 
     def generate_results(self) -> Dict[str, Any]:
         """
@@ -6,6 +6,7 @@
 from collections import defaultdict
 from typing import Dict, Any
 from Utilities.helper import preprocess_init
+from Utilities.profiling import profiled
 
 
 class PersonMentionCounter:
@@ -16,6 +17,7 @@ class PersonMentionCounter:
             people_path: str = None,
             stopwords_path: str = None,
             preprocess_path: str = None,
+            data: Dict[str, Any] = None
     ):
         """
         Initialize the PersonMentionCounter class.
@@ -24,14 +26,18 @@ class PersonMentionCounter:
         :param people_path: Path to the people CSV file.
         :param stopwords_path: Path to the stopwords CSV file.
         :param preprocess_path: Path to the preprocessed JSON file (if available).
+        :param data: Already preprocessed data, as returned by preprocess_init (optional).
         """
         # Initialize the class attributes
         self.question_num = question_num
 
         # Load the preprocessed data weather from a preprocessed file or preprocess it from raw data
-        self.data = preprocess_init(preprocess_path, sentences_path, people_path, stopwords_path)
+        if data is None:
+            data = preprocess_init(preprocess_path, sentences_path, people_path, stopwords_path)
+        self.data = data
 
     @property
+    @profiled(count=len)
     def count_mentions(self) -> Dict[str, int]:
         """
         Count the mentions of each person in the processed sentences.
@@ -3,13 +3,37 @@
 # The SearchEngine class is responsible for building a search index
 # mapping each K-seq to the sentences in which it appears.
 # The implementation is using a dictionary as the primary data structure
-# to enable O(1) search complexity for the K-seqs.
+# to enable O(1) search complexity for the K-seqs, with compressed postings of sentence ids (see PostingsIndex).
+# A K-seq word may hold a "*" wildcard ("harry *", "dumble*"), matched through the sorted term dictionary of the index.
+# Besides the "keys", the query file may hold "queries" combining K-seqs with AND/OR/NOT and WITHIN n sentences
+# (see Utilities/boolean_query.py), answered in "Query Matches".
+# With top_k, only the k best sentences of each K-seq and query are returned, ranked by BM25 (see Utilities/ranking.py).
+# ShardedSearchEngine searches several corpora, or ranges of the sentences of a corpus, each with its own index shard
+# built and cached on its own, in parallel threads or processes, and merges their results. Each corpus is loaded once
+# and each shard only holds its range of the sentences.
+# With raw_offsets_path, the original text of each matched sentence is read from the sentences CSV file through the
+# byte offsets recorded by Task 1 (see Utilities/raw_text.py), in "K-Seq Original Sentences" and "Query Original
+# Sentences".
 
+import heapq
 import json
 import sys
-from typing import Dict, Any, List
-from collections import defaultdict
-from Utilities.helper import map_n_grams, preprocess_init
+from array import array
+from itertools import compress
+from typing import TYPE_CHECKING, Dict, Any, List, Collection, Tuple
+from Utilities import cache
+from Utilities.cache import cached, configure_cache
+from Utilities.helper import preprocess_init
+from Utilities.postings import PostingsIndex
+from Utilities.profiling import profiled
+from Utilities.serialization import KEYS_SCHEMA, load_json
+
+if TYPE_CHECKING:
+    # Boolean queries, BM25 ranking and the original sentences are only imported by the searches that use them
+    from Utilities.ranking import Bm25Ranker, CollectionStatistics
+    from Utilities.raw_text import RawSentences
+
+ALPHABETICAL_SCAN_RATIO = 8  # Matches above 1 / ratio of the sentences are read from the alphabetical order
 
 
 class SearchEngine:
@@ -19,8 +43,13 @@ class SearchEngine:
             sentences_path: str = None,
             stopwords_path: str = None,
             preprocess_path: str = None,
-            k_seq_path: str = None
-
+            k_seq_path: str = None,
+            data: Dict[str, Any] = None,
+            k_seq_list: Dict[str, Any] = None,
+            top_k: int = None,
+            shard: Tuple[int, int] = None,
+            raw_offsets_path: str = None,
+            cache_paths: List[str] = None
     ):
         """
         Initialize the SearchEngine class.
@@ -30,62 +59,243 @@ class SearchEngine:
         :param stopwords_path: Path to the stopwords file.
         :param preprocess_path: Path to the preprocessed JSON file (optional).
         :param k_seq_path: Path to the K-seq JSON file.
+        :param data: Already preprocessed data, as returned by preprocess_init (optional).
+        :param k_seq_list: The K-seq queries, {"keys": [...]}, given directly instead of k_seq_path (optional).
+        :param top_k: Return only the k best sentences of each K-seq and query, ranked by BM25 (optional).
+        :param shard: (i, n) to index only the i-th of n equal ranges of consecutive sentences of the corpus, which
+                      data already is when given (see shard_data) (optional).
+        :param raw_offsets_path: The sentence offsets file written by Task 1 with --raw_offsets, to add the original
+                                 text of the matched sentences to the results (optional).
+        :param cache_paths: The input files of the data given directly, which key the cached n-gram index like
+                            [preprocess_path, sentences_path, stopwords_path] (optional).
 
         """
         self.question_num = question_num
         self.k_seq_path = k_seq_path
-        if k_seq_path is None:
+        self.k_seq_list = k_seq_list
+        self.top_k = top_k
+        self.shard = shard
+        self.raw_offsets_path = raw_offsets_path
+        if top_k is not None and top_k < 1:
+            print("Error: top_k must be a positive number of sentences.")
+            sys.exit(1)
+        if k_seq_path is None and k_seq_list is None:
             print("K-seq query path must be provided for Task 4.")
             sys.exit(1)
+        if shard is not None and raw_offsets_path:
+            print("Error: The original sentences are read for a whole corpus, not for an index shard.")
+            sys.exit(1)
 
         # Load the K-seq list from the JSON file
-        try:
-            with open(k_seq_path, "r") as file:
-                self.k_seq_list = json.load(file)
-                if not isinstance(self.k_seq_list, dict):
-                    print("Error: K-seq list must be a dictionary.")
-                    sys.exit(1)
-        except json.JSONDecodeError:
-            print("Error: Failed to decode query keys JSON. Please provide it with the correct format.")
-            sys.exit(1)
-        except FileNotFoundError:
-            print("Error: K-seq query file not found.")
+        if k_seq_list is None:
+            try:
+                with open(k_seq_path, "rb") as file:
+                    self.k_seq_list = load_json(file, KEYS_SCHEMA)
+            except json.JSONDecodeError:
+                print("Error: Failed to decode query keys JSON. Please provide it with the correct format.")
+                sys.exit(1)
+            except FileNotFoundError:
+                print("Error: K-seq query file not found.")
+                sys.exit(1)
+        if not isinstance(self.k_seq_list, dict):
+            print("Error: K-seq list must be a dictionary.")
             sys.exit(1)
 
         # Load the preprocessed data weather from a preprocessed file or preprocess it from raw data
-        self.data = preprocess_init(preprocess_path, sentences_path, None, stopwords_path)
+        if data is None:
+            data = preprocess_init(preprocess_path, sentences_path, None, stopwords_path)
+            if shard is not None:
+                data = shard_data(data, shard)
+            # Input files of the data, which key the cached n-gram index
+            self.cache_paths = [preprocess_path, sentences_path, stopwords_path]
+        else:
+            self.cache_paths = cache_paths or []  # Without the input files, there is nothing to key a cache entry on
+        self.data = data
+        self.sentence_index = None  # Built on first use, see get_sentence_index()
+        self.ranker = None  # Created on first ranked search
+        self.alphabetical_order = None  # Sentence ids in alphabetical order, see get_alphabetical_order()
+        self.alphabetical_ranks = None  # {sentence id -> position in alphabetical_order}
+        self.first_positions = None  # {sentence id -> first position in the corpus}, see original_sentences()
 
-    def build_search_index(self) -> Dict[str, List[List[str]]] or List:
+    @profiled(count=len)
+    def get_sentence_index(self) -> PostingsIndex:
         """
-        Build a search index mapping each K-seq to the sentences in which it appears.
-        Uses a dictionary for O(1) lookup.
-        :returns: A dictionary mapping K-seqs to the sentences in which they appear.
+        Create (once) an index mapping every n-gram to the sentences it appears in, for O(1) lookup.
+        :return: The sentence index, see PostingsIndex.
         """
+        if self.sentence_index is None:
+            sentences = self.data.get("Processed Sentences", [])
+            params = {"N": None}
+            if self.shard is not None:
+                params["shard"] = list(self.shard)
+            self.sentence_index = cached("postings", self.cache_paths, params,
+                                         lambda: PostingsIndex.from_sentences(sentences, N=None))
+        return self.sentence_index
 
-        # Create a dictionary mapping sentences to their text for O(1) lookup
-        # The keys are n-grams and the values are the sentences they appear in.
-        sentence_index = map_n_grams(self.data.get("Processed Sentences", []), N=None)
+    def get_ranker(self) -> "Bm25Ranker":
+        from Utilities.ranking import Bm25Ranker
+        if self.ranker is None or self.ranker.index is not self.get_sentence_index():
+            self.ranker = Bm25Ranker(self.get_sentence_index())
+        return self.ranker
 
-        # Match K-seqs in O(1) Lookup
-        search_index = defaultdict(list)
-        added_kseqs = set()  # Keep track of added K-seqs to avoid duplicates
-        if not self.k_seq_list.get("keys"):
-            return {}
+    def get_alphabetical_order(self) -> Tuple[List[int], array]:
+        """
+        Sort the sentences of the index alphabetically, once for all the searches.
+        :return: The sentence ids in alphabetical order, and the rank of each sentence id in that order.
+        """
+        sentences = self.get_sentence_index().sentences
+        if self.alphabetical_ranks is None or len(self.alphabetical_ranks) != len(sentences):
+            order = sorted(range(len(sentences)), key=lambda sentence_id: " ".join(sentences[sentence_id]))
+            ranks = array('I', bytes(4 * len(order)))
+            for rank, sentence_id in enumerate(order):
+                ranks[sentence_id] = rank
+            self.alphabetical_order, self.alphabetical_ranks = order, ranks
+        return self.alphabetical_order, self.alphabetical_ranks
+
+    def alphabetical(self, sentence_ids: Collection[int]) -> List[int]:
+        """ Distinct sentence ids, in the alphabetical order of their sentences (then in order of appearance). """
+        order, ranks = self.get_alphabetical_order()
+        if len(sentence_ids) * ALPHABETICAL_SCAN_RATIO < len(order):
+            return sorted(sentence_ids, key=ranks.__getitem__)
+        # Many matches: mark their ranks, then read the marked ids from the presorted order
+        marks = bytearray(len(order))
+        for sentence_id in sentence_ids:
+            marks[ranks[sentence_id]] = 1
+        return list(compress(order, marks))
+
+    def sentences_of(self, sentence_ids: List[int]) -> List[List[str]]:
+        """ The sentences of ordered ids, in that order. """
+        sentences = self.get_sentence_index().sentences
+        return [list(sentences[sentence_id]) for sentence_id in sentence_ids]
+
+    def ranked(self, scored: List[Tuple[float, int]], with_scores: bool) -> List[list]:
+        """ The sentences of a ranking of (score, sentence id), as [score, sentence] pairs if with_scores. """
+        sentences = self.get_sentence_index().sentences
+        if with_scores:
+            return [[score, list(sentences[sentence_id])] for score, sentence_id in scored]
+        return [list(sentences[sentence_id]) for _, sentence_id in scored]
+
+    def original_sentences(self, raw_sentences: "RawSentences", matches: List[List[str]]) -> List[str]:
+        """
+        The original text of matched sentences, read at the first position of each sentence in the corpus.
+        :param raw_sentences: The original sentences of the corpus.
+        :param matches: Processed sentences of the index.
+        :return: The original text of each of them, in the same order.
+        """
+        sentence_index = self.get_sentence_index()
+        if self.first_positions is None or len(self.first_positions) != len(sentence_index.sentences):
+            # Sentence ids are given in order of first appearance: one pass over the corpus positions
+            first_positions = array('I')
+            for position, sentence_id in enumerate(sentence_index.sentence_at):
+                if sentence_id == len(first_positions):
+                    first_positions.append(position)
+            self.first_positions = first_positions
+        return [raw_sentences.text(self.first_positions[sentence_index.sentence_ids[tuple(sentence)]])
+                for sentence in matches]
 
+    def term_statistics(self, method: str, items: list) -> "CollectionStatistics":
+        """
+        The BM25 statistics of the index for the K-seqs ranked by a search, to combine with those of other shards.
+        :param method: "search" or "boolean_search".
+        :param items: The K-seqs or the queries of the search.
+        :return: The statistics of the index, with the document frequencies of the n-grams matching those K-seqs.
+        """
+        sentence_index = self.get_sentence_index()
+        if method == "search":
+            terms = [" ".join(k_seq) for k_seq in items if isinstance(k_seq, list) and k_seq]
         else:
-            for k_seq_value in self.k_seq_list.get("keys", []):
-                if isinstance(k_seq_value, list) and k_seq_value:  # Ensure non-empty list
-                    k_seq_text = " ".join(k_seq_value)  # Convert to text
-                    if k_seq_text in sentence_index and k_seq_text not in added_kseqs: # O(1) lookup and duplicate check
-
-                        # adding the sentences from sentence_index to search_index for the given k_seq_text
-                        search_index[k_seq_text].extend([list(seq) for seq in sentence_index[k_seq_text]])
-                        added_kseqs.add(k_seq_text)
-            # Convert results and sort sentences alphabetically
-            for k_seq_text in search_index:
-                search_index[k_seq_text] = sorted(search_index[k_seq_text], key=lambda x: " ".join(x))
+            from Utilities.boolean_query import parse_query, positive_terms
+            terms = [term for query in items for term in positive_terms(parse_query(query))]
+        return self.get_ranker().statistics(n_gram for term in terms for n_gram in sentence_index.expand(term))
+
+    @profiled(count=len)
+    def search(self, k_seqs: List[List[str]], top_k: int = None, with_scores: bool = False,
+               statistics: "CollectionStatistics" = None) -> Dict[str, List[List[str]]]:
+        """
+        Look up K-seqs in the sentence index.
+        :param k_seqs: The K-seqs to look up, each a list of words, "*" matching any characters within a word.
+        :param top_k: Return only the top_k sentences of each K-seq with the best BM25 score, best first (optional).
+        :param with_scores: Return the ranked sentences as [BM25 score, sentence] pairs, for merging rankings.
+        :param statistics: The BM25 statistics of the collection this index is a shard of (optional).
+        :returns: A dictionary mapping the found K-seqs to the sentences in which they appear, sorted alphabetically.
+                  The sentences of a wildcard K-seq are those containing any n-gram it matches.
+        """
+        # The keys are n-grams and the values are the sentences they appear in.
+        sentence_index = self.get_sentence_index()
+
+        # Answer each distinct K-seq once, in sorted order: wildcard K-seqs sharing a prefix then read neighbouring
+        # ranges of the term dictionary, and the postings of the n-grams they share are decoded once per batch
+        k_seq_texts = sorted({" ".join(k_seq_value) for k_seq_value in k_seqs
+                              if isinstance(k_seq_value, list) and k_seq_value})  # Ensure non-empty list
+        decoded = {}  # {n-gram -> sentence ids}, for this batch
+        sentence_lists = {}  # {sentence id -> sentence as a list}, shared by the results of this batch
+        sentences = sentence_index.sentences
+
+        search_index = {}
+        for k_seq_text in k_seq_texts:
+            if top_k is not None:
+                n_grams = sentence_index.expand(k_seq_text)
+                if n_grams:
+                    ranking = self.get_ranker().top_k_scored(n_grams, top_k, statistics=statistics)
+                    search_index[k_seq_text] = self.ranked(ranking, with_scores)
+                continue
+            if "*" in k_seq_text:  # Prefix range of the term dictionary
+                n_grams = sentence_index.expand(k_seq_text)
+            else:  # O(1) lookup
+                n_grams = [k_seq_text] if k_seq_text in sentence_index else []
+            if not n_grams:
+                continue
+            for n_gram in n_grams:
+                if n_gram not in decoded:
+                    decoded[n_gram] = sentence_index.sentence_ids_of(n_gram)
+            sentence_ids = decoded[n_grams[0]] if len(n_grams) == 1 else \
+                set().union(*(decoded[n_gram] for n_gram in n_grams))
+            # Order the sentences by their rank in the alphabetical order of the whole index
+            matches = []
+            for sentence_id in self.alphabetical(sentence_ids):
+                sentence = sentence_lists.get(sentence_id)
+                if sentence is None:
+                    sentence = sentence_lists[sentence_id] = list(sentences[sentence_id])
+                matches.append(sentence)
+            search_index[k_seq_text] = matches
         return search_index
 
+    @profiled(count=len)
+    def boolean_search(self, queries: List[str], top_k: int = None, with_scores: bool = False,
+                       statistics: "CollectionStatistics" = None) -> Dict[str, List[List[str]]]:
+        """
+        Evaluate boolean and proximity queries on the sentence index.
+        :param queries: The queries, e.g. 'harry AND NOT "ron weasley"'.
+        :param top_k: Return only the top_k matches of each query with the best BM25 score for its K-seqs (optional).
+        :param with_scores: Return the ranked sentences as [BM25 score, sentence] pairs, for merging rankings.
+        :param statistics: The BM25 statistics of the collection this index is a shard of (optional).
+        :returns: A dictionary mapping each query to the sentences matching it, sorted alphabetically.
+        :raises QuerySyntaxError: If a query cannot be parsed.
+        """
+        from Utilities.boolean_query import QueryEvaluator, parse_query, positive_terms
+        sentence_index = self.get_sentence_index()
+        evaluator = QueryEvaluator(sentence_index)
+        if top_k is None:
+            return {query: self.sentences_of(self.alphabetical(evaluator.evaluate(parse_query(query))))
+                    for query in queries}
+        query_index = {}
+        for query in queries:
+            node = parse_query(query)
+            n_grams = [n_gram for term in positive_terms(node) for n_gram in sentence_index.expand(term)]
+            ranking = self.get_ranker().top_k_scored(n_grams, top_k, evaluator.evaluate(node), statistics)
+            query_index[query] = self.ranked(ranking, with_scores)
+        return query_index
+
+    def build_search_index(self) -> Dict[str, List[List[str]]] or List:
+        """
+        Build a search index mapping each K-seq of the query file to the sentences in which it appears.
+        Uses a dictionary for O(1) lookup.
+        :returns: A dictionary mapping K-seqs to the sentences in which they appear.
+        """
+        if not self.k_seq_list.get("keys"):
+            return {}
+        return self.search(self.k_seq_list.get("keys", []), self.top_k)
+
     def generate_results(self) -> Dict[str, Any]:
         """
             Generate the final results for the task.
@@ -101,8 +311,209 @@ class SearchEngine:
         else:
             k_seq_matches = []
 
+        results = {"K-Seq Matches": k_seq_matches}
+        queries = self.k_seq_list.get("queries")
+        if queries is not None:
+            if not isinstance(queries, list) or not all(isinstance(query, str) for query in queries):
+                print("Error: \"queries\" must be a list of query strings.")
+                sys.exit(1)
+            from Utilities.boolean_query import QuerySyntaxError
+            try:
+                query_index = self.boolean_search(queries, self.top_k)
+            except QuerySyntaxError as e:
+                print(f"Error: {e}")
+                sys.exit(1)
+            results["Query Matches"] = [[query, query_index[query]] for query in sorted(query_index)]
+
+        if self.raw_offsets_path is not None:
+            from Utilities.raw_text import RawSentences
+            raw_sentences = RawSentences(self.raw_offsets_path)
+            if len(raw_sentences) != len(self.data.get("Processed Sentences", [])):
+                print(f"Error: The sentence offsets at {self.raw_offsets_path} do not match the preprocessed "
+                      f"sentences. Run Task 1 with --raw_offsets again.")
+                sys.exit(1)
+            try:
+                for key in [key for key in ("K-Seq Matches", "Query Matches") if key in results]:
+                    results[key.replace("Matches", "Original Sentences")] = [
+                        [item, self.original_sentences(raw_sentences, matches)] for item, matches in results[key]]
+            finally:
+                raw_sentences.close()
+
         return {
-            f"Question {self.question_num}": {
-                "K-Seq Matches": k_seq_matches
-            }
+            f"Question {self.question_num}": results
         }
+
+
+shard_engine = None  # The SearchEngine of the shard of a worker process, see open_worker_shard
+
+
+def shard_data(data: Dict[str, Any], shard: Tuple[int, int]) -> Dict[str, Any]:
+    """ The data of a corpus reduced to the i-th of n equal ranges of its consecutive sentences, shard = (i, n). """
+    index, count = shard
+    sentences = data.get("Processed Sentences", [])
+    start, end = index * len(sentences) // count, (index + 1) * len(sentences) // count
+    return {**data, "Processed Sentences": sentences[start:end]}
+
+
+def open_shard(data: Dict[str, Any], cache_paths: List[str], shard: Tuple[int, int] = None) -> SearchEngine:
+    """
+    Open the search engine of an index shard.
+    :param data: The sentences of the shard (see shard_data), or of the whole corpus if shard is None.
+    :param cache_paths: The input files of the corpus, [preprocess_path, sentences_path, stopwords_path].
+    :param shard: (i, n) for the i-th of n ranges of the sentences of the corpus, the whole corpus if None.
+    :return: The search engine, with its index built (or read from the artifact cache).
+    """
+    engine = SearchEngine(k_seq_list={"keys": []}, data=data, shard=shard, cache_paths=cache_paths)
+    engine.get_sentence_index()
+    return engine
+
+
+def open_worker_shard(data: Dict[str, Any], cache_paths: List[str], shard: Tuple[int, int] or None,
+                      cache_dir: str or None, cache_max_bytes: int):
+    """ Initialize a worker process holding one shard, with the artifact cache of the parent process. """
+    global shard_engine
+    configure_cache(cache_dir, cache_max_bytes)
+    shard_engine = open_shard(data, cache_paths, shard)
+
+
+def call_worker_shard(method: str, *arguments) -> Any:
+    """ Call a method of the SearchEngine of the shard of this worker process. """
+    return getattr(shard_engine, method)(*arguments)
+
+
+def merge_alphabetical(shard_matches: List[List[List[str]]]) -> List[List[str]]:
+    """ Merge alphabetically sorted sentence lists, keeping one of identical sentences of different shards. """
+    if len(shard_matches) == 1:
+        return shard_matches[0]
+    merged = []
+    seen = set()
+    for sentence in heapq.merge(*shard_matches, key=" ".join):
+        if tuple(sentence) not in seen:
+            seen.add(tuple(sentence))
+            merged.append(sentence)
+    return merged
+
+
+def merge_ranked(shard_matches: List[List[list]], top_k: int, with_scores: bool) -> List[list]:
+    """ Merge rankings of [score, sentence] pairs into the top_k best distinct sentences. """
+    merged = []
+    seen = set()
+    for score, sentence in heapq.merge(*shard_matches, key=lambda pair: -pair[0]):
+        if tuple(sentence) not in seen:
+            seen.add(tuple(sentence))
+            merged.append([score, sentence] if with_scores else sentence)
+            if len(merged) == top_k:
+                break
+    return merged
+
+
+class ShardedSearchEngine(SearchEngine):
+    """ A SearchEngine over several index shards, whose searches fan out to every shard in parallel. """
+
+    def __init__(
+            self,
+            question_num: int = 4,
+            corpus_paths: List[str] = None,
+            stopwords_path: str = None,
+            k_seq_path: str = None,
+            k_seq_list: Dict[str, Any] = None,
+            top_k: int = None,
+            shard_count: int = 1,
+            processes: bool = False
+    ):
+        """
+        Initialize the ShardedSearchEngine class.
+
+        :param question_num: The task reference number.
+        :param corpus_paths: The corpora to search, Task 1 JSON files or sentences CSV files.
+        :param stopwords_path: Path to the stopwords file, for the sentences CSV files.
+        :param k_seq_path: Path to the K-seq JSON file.
+        :param k_seq_list: The K-seq queries, {"keys": [...]}, given directly instead of k_seq_path (optional).
+        :param top_k: Return only the k best sentences of each K-seq and query, ranked by BM25 (optional).
+        :param shard_count: Number of shards of each corpus, ranges of its sentences.
+        :param processes: Hold each shard in a process of its own instead of searching them in threads.
+
+        """
+        # The shards hold the sentences, this engine only reads the queries and merges the results
+        super().__init__(question_num, k_seq_path=k_seq_path, data={}, k_seq_list=k_seq_list, top_k=top_k)
+        if not corpus_paths:
+            print("Error: At least one corpus must be provided for a sharded search.")
+            sys.exit(1)
+        if shard_count < 1:
+            print("Error: The number of shards of a corpus must be positive.")
+            sys.exit(1)
+        shard_specs = []  # (data, cache paths, shard) of each shard
+        for corpus_path in corpus_paths:
+            # Each corpus is loaded (or preprocessed) once, each of its shards only gets its range of the sentences
+            if corpus_path.endswith(".json"):
+                cache_paths = [corpus_path, None, None]
+            else:
+                cache_paths = [None, corpus_path, stopwords_path]
+            data = preprocess_init(cache_paths[0], cache_paths[1], None, cache_paths[2])
+            for index in range(shard_count):
+                shard = (index, shard_count) if shard_count > 1 else None
+                shard_specs.append((shard_data(data, shard) if shard else data, cache_paths, shard))
+
+        if processes:
+            from concurrent.futures import ProcessPoolExecutor
+            active_cache = cache.active_cache
+            cache_config = (active_cache.cache_dir, active_cache.max_bytes) if active_cache else (None, 0)
+            self.shards = None
+            self.executors = [ProcessPoolExecutor(max_workers=1, initializer=open_worker_shard,
+                                                  initargs=shard_spec + cache_config)
+                              for shard_spec in shard_specs]
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+            self.executors = [ThreadPoolExecutor(max_workers=len(shard_specs))]
+            self.shards = list(self.executors[0].map(lambda shard_spec: open_shard(*shard_spec), shard_specs))
+
+    def fan_out(self, method: str, *arguments) -> list:
+        """ Call a method of SearchEngine on every shard in parallel, returning the result of each shard. """
+        if self.shards is None:
+            futures = [executor.submit(call_worker_shard, method, *arguments) for executor in self.executors]
+        else:
+            futures = [self.executors[0].submit(getattr(shard, method), *arguments) for shard in self.shards]
+        return [future.result() for future in futures]
+
+    def fan_out_search(self, method: str, items: list, top_k: int or None) -> List[Dict[str, list]]:
+        """
+        Run a search on every shard. A ranked search first gathers the statistics of every shard, so that all the
+        shards score their sentences as one collection and their rankings can be merged.
+        """
+        statistics = None
+        if top_k is not None:
+            from Utilities.ranking import CollectionStatistics
+            statistics = CollectionStatistics.combine(self.fan_out("term_statistics", method, items))
+        return self.fan_out(method, items, top_k, True, statistics)
+
+    @staticmethod
+    def merge(shard_results: List[Dict[str, list]], top_k: int or None, with_scores: bool) -> Dict[str, list]:
+        """ Merge the results of the shards, as if their corpora were one (identical sentences are listed once). """
+        merged = {}
+        for key in set().union(*shard_results):
+            shard_matches = [shard_result[key] for shard_result in shard_results if key in shard_result]
+            if top_k is None:
+                merged[key] = merge_alphabetical(shard_matches)
+            else:
+                merged[key] = merge_ranked(shard_matches, top_k, with_scores)
+        return merged
+
+    @profiled(count=len)
+    def search(self, k_seqs: List[List[str]], top_k: int = None, with_scores: bool = False,
+               statistics: "CollectionStatistics" = None) -> Dict[str, List[List[str]]]:
+        """ See SearchEngine.search, over all the shards (which gather their own statistics). """
+        return self.merge(self.fan_out_search("search", k_seqs, top_k), top_k, with_scores)
+
+    @profiled(count=len)
+    def boolean_search(self, queries: List[str], top_k: int = None, with_scores: bool = False,
+                       statistics: "CollectionStatistics" = None) -> Dict[str, List[List[str]]]:
+        """ See SearchEngine.boolean_search, over all the shards (which gather their own statistics). """
+        from Utilities.boolean_query import parse_query
+        for query in queries:
+            parse_query(query)  # Report syntax errors before the fan-out
+        return self.merge(self.fan_out_search("boolean_search", queries, top_k), top_k, with_scores)
+
+    def close(self):
+        """ Stop the threads or processes of the shards. """
+        for executor in self.executors:
+            executor.shutdown()
@@ -6,6 +6,8 @@ from typing import Dict, Any
 import sys
 from collections import defaultdict
 from Utilities.helper import map_n_grams, preprocess_init
+from Utilities.profiling import profiled
+from Utilities.progress import track
 
 
 class PersonContexts:
@@ -16,7 +18,8 @@ class PersonContexts:
             people_path: str = None,
             stopwords_path: str = None,
             preprocess_path: str = None,
-            N: int = None
+            N: int = None,
+            data: Dict[str, Any] = None
     ):
         """
         Initialize the PersonContexts class.
@@ -27,6 +30,7 @@ class PersonContexts:
         :param stopwords_path: Path to the stopwords file.
         :param preprocess_path: Path to the preprocessed JSON file (optional).
         :param N: Maximum size of the k-seqs to create.
+        :param data: Already preprocessed data, as returned by preprocess_init (optional).
         """
         self.question_num = question_num
         self.sentences_path = sentences_path
@@ -39,8 +43,11 @@ class PersonContexts:
             sys.exit(1)
 
         # Load the preprocessed data weather from a preprocessed file or preprocess it from raw data
-        self.data = preprocess_init(preprocess_path, sentences_path, people_path, stopwords_path)
+        if data is None:
+            data = preprocess_init(preprocess_path, sentences_path, people_path, stopwords_path)
+        self.data = data
 
+    @profiled(count=len)
     def contexts_and_k_seqs(self) -> list[list[list[Any] | Any]]:
         """
         Find the contexts in which people are mentioned and extract associated k-seqs.
@@ -76,7 +83,8 @@ class PersonContexts:
         # Reverse mapping of k_seqs to names
         name_to_k_seqs = defaultdict(set)
 
-        for sentence_tokens in processed_sentences:
+        progress = track("Task 5 person contexts", len(processed_sentences), "sentences")
+        for i, sentence_tokens in enumerate(processed_sentences, 1):
             sentence = " ".join(sentence_tokens)  # Convert tokens to a sentence
 
             # Get k-seqs (actual n-grams) for this sentence
@@ -90,6 +98,8 @@ class PersonContexts:
                 for name in aliases:
                     if name in sentence:
                         name_to_k_seqs[main_name].update(list(k_seqs))
+            progress.update(i, people=len(name_to_k_seqs))
+        progress.finish(len(processed_sentences), people=len(name_to_k_seqs))
 
         # Convert k_seqs to a list of lists for JSON compatibility and sort alphabetically
         return [
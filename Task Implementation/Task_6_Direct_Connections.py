@@ -2,26 +2,157 @@
 # This script finds direct connections between people based on shared contexts.
 # The DirectConnections class preprocesses the input data if necessary and generates the final results for Task 6.
 # It uses a PersonGraph to represent people as nodes and shared contexts as edges.
+# With several window sizes and thresholds (sweep), the mention table is built once and the co-occurrence counts of
+# every window size are derived from the gaps between the mentions of each person and pair (see sweep_co_occurrences),
+# giving the Pair Matches of every combination in one run.
+# The co-occurrence counts are kept in a WeightedCSRGraph, which can be saved (--save_counts) and answer later runs
+# for any threshold, or the strongest neighbors of each person, without the corpus (SavedDirectConnections).
 
+import heapq
 import re
 import sys
-from collections import defaultdict
-from typing import Dict, Any, List
+from collections import Counter
+from typing import Dict, Any, List, Set, Tuple
+from Utilities.cache import cached
+from Utilities.graph import CSRGraph, WeightedCSRGraph
 from Utilities.helper import preprocess_init
+from Utilities.profiling import profiled
+from Utilities.progress import track
+
+
+@profiled(count=len)
+def find_mentions(nodes: Dict[str, "PersonNode"], sentences: List[List[str]]) -> List[List[str]]:
+    """
+    Find the people mentioned (by any alias) in each sentence.
+    :param nodes: The people, {main name -> PersonNode}.
+    :param sentences: The processed sentences.
+    :return: A list with the sorted main names of the people mentioned in each sentence.
+    """
+    people_in_sentences = []
+    progress = track("Task 6 mentions", len(sentences), "sentences")
+    for i, sentence in enumerate(sentences, 1):
+        sentence_text = " ".join(sentence)
+        # Ensure alias matches as a standalone word
+        people_in_sentences.append(sorted(
+            main_name for main_name, node in nodes.items()
+            if any(re.search(rf'\b{name}\b', sentence_text) for name in node.aliases)
+        ))
+        progress.update(i)
+    progress.finish(len(sentences))
+    return people_in_sentences
+
+
+@profiled()
+def count_co_occurrences(co_occurrence_counts: Dict[Tuple[str, str], int], people_in_sentences: List[List[str]],
+                         window_size: int, first_window: int = 0):
+    """
+    Count the pairs of people sharing each window of consecutive sentences, adding to existing counts.
+    :param co_occurrence_counts: {(person1, person2) -> number of shared windows}, updated in place.
+    :param people_in_sentences: The mention table, see find_mentions.
+    :param window_size: The size of the windows.
+    :param first_window: The first window start to count, earlier windows were counted already.
+    """
+    windows = range(first_window, len(people_in_sentences) - window_size + 1)
+    progress = track("Task 6 co-occurrence windows", len(windows), "windows")
+    for i in windows:
+        people_in_window = set()
+        for people in people_in_sentences[i:i + window_size]:
+            people_in_window.update(people)
+
+        # Count co-occurrences
+        people_list = sorted(people_in_window)
+        for j in range(len(people_list)):
+            for k in range(j + 1, len(people_list)):
+                pair = (people_list[j], people_list[k])
+                co_occurrence_counts[pair] = co_occurrence_counts.get(pair, 0) + 1
+        progress.update(i - first_window + 1, pairs=len(co_occurrence_counts))
+    progress.finish(len(windows), pairs=len(co_occurrence_counts))
+
+
+@profiled()
+def sweep_co_occurrences(people_in_sentences: List[List[str]],
+                         window_sizes: List[int]) -> Dict[int, Dict[Tuple[str, str], int]]:
+    """
+    Count the pairs of people sharing each window of consecutive sentences, for several window sizes at once.
+    The windows of size w holding both people of a pair are all the windows, minus those without the first person,
+    minus those without the second, plus those without either. A run of g sentences without some people holds
+    max(0, g - w + 1) windows without them, so each term follows from the gaps between the mentions, for every w.
+    :param people_in_sentences: The mention table, see find_mentions.
+    :param window_sizes: The sizes of the windows, each between 1 and the number of sentences.
+    :return: {window size -> {(person1, person2) -> number of shared windows}}, as count_co_occurrences counts them.
+    """
+    sentence_count = len(people_in_sentences)
+    window_sizes = sorted(set(window_sizes))
+    if not window_sizes:
+        return {}
+    positions: Dict[str, List[int]] = {}  # {person -> increasing positions of the sentences mentioning them}
+    for position, people in enumerate(people_in_sentences):
+        for person in people:
+            positions.setdefault(person, []).append(position)
+
+    def missing_windows(mentions: List[int]) -> List[int]:
+        """ The number of windows of each size holding none of the mentions. """
+        gaps = Counter(following - previous - 1 for previous, following
+                       in zip([-1] + mentions, mentions + [sentence_count]))
+        return [sum((gap - window_size + 1) * count for gap, count in gaps.items() if gap >= window_size)
+                for window_size in window_sizes]
+
+    # The pairs sharing a window of the widest size, the only ones sharing a window of any of the sizes
+    widest = window_sizes[-1]
+    pairs = set()
+    for position, people in enumerate(people_in_sentences):
+        for other_people in people_in_sentences[max(0, position - widest + 1):position + 1]:
+            pairs.update((person, other) if person < other else (other, person)
+                         for person in people for other in other_people if person != other)
+
+    missing = {person: missing_windows(mentions) for person, mentions in positions.items()}
+    counts = {window_size: {} for window_size in window_sizes}
+    progress = track("Task 6 sweep pairs", len(pairs), "pairs")
+    for i, (person1, person2) in enumerate(sorted(pairs), 1):
+        missing_both = missing_windows(list(heapq.merge(positions[person1], positions[person2])))
+        for size_index, window_size in enumerate(window_sizes):
+            count = sentence_count - window_size + 1 - missing[person1][size_index] - missing[person2][size_index] \
+                + missing_both[size_index]
+            if count:
+                counts[window_size][person1, person2] = count
+        progress.update(i)
+    progress.finish(len(pairs))
+    return counts
+
+
+def pair_matches_from_counts(co_occurrences: WeightedCSRGraph, threshold: int) -> List[List[List[str]]]:
+    """
+    The Task 6 Pair Matches for a threshold, from the co-occurrence counts of a window size.
+    :param co_occurrences: The counts, with the window size and the number of sentences in their info.
+    :param threshold: The minimal count of a pair.
+    :return: The sorted pairs, each name as a list of words.
+    """
+    window_size, sentence_count = co_occurrences.info["window_size"], co_occurrences.info["sentence_count"]
+    # No edges if window size is 0 or threshold is greater than the number of sentences, as for one run
+    if window_size == 0 or (threshold > sentence_count and window_size > 1):
+        return []
+    return sorted([name1.split(), name2.split()] for name1, name2 in co_occurrences.edges_at_least(threshold))
+
+
+def top_neighbors_from_counts(co_occurrences: WeightedCSRGraph, count: int) -> List[list]:
+    """
+    The people with the most co-occurrences with each person.
+    :param co_occurrences: The co-occurrence counts.
+    :param count: Number of neighbors of each person.
+    :return: A [person, [[neighbor, co-occurrences], ...]] list per person, names as lists of words.
+    """
+    names = co_occurrences.names
+    return [[names[node].split(), [[names[neighbor].split(), weight]
+                                   for neighbor, weight in co_occurrences.top_neighbors(node, count)]]
+            for node in range(len(names))]
 
 
 class PersonNode:
-    """ Represents a person in the graph with their main name, aliases, and connections. """
+    """ Represents a person in the graph with their main name and aliases. """
 
     def __init__(self, main_name: str, aliases: List[str]):
         self.main_name = main_name
         self.aliases = set(aliases)  # Store aliases including partial names
-        self.neighbors = set()  # Store PersonNode references
-
-    def add_neighbor(self, other: "PersonNode"):
-        """ Connect this node to another person (undirected graph). """
-        if other != self:  # Prevent self-loops
-            self.neighbors.add(other)
 
 
 class PersonGraph:
@@ -29,6 +160,7 @@ class PersonGraph:
 
     def __init__(self, threshold: int):
         self.nodes: Dict[str, PersonNode] = {}  # Dictionary {person_name -> PersonNode}
+        self.edges: Set[Tuple[str, str]] = set()  # Undirected edges as alphabetically sorted name pairs
         self.threshold = threshold  # Minimum co-occurrence count required for an edge
 
     def add_person(self, main_name: str, aliases: List[str]):
@@ -36,24 +168,31 @@ class PersonGraph:
         if main_name not in self.nodes:
             self.nodes[main_name] = PersonNode(main_name, aliases)
 
+    def add_people(self, processed_people: List[List[List[str]]]):
+        """ Adds a node for each processed person, with their aliases and the words of all their names. """
+        for person in processed_people:
+            main_name = " ".join(person[0])
+            aliases = {" ".join(alias) for alias in person[1]}
+            partial_names = {word for full_name in [main_name] + list(aliases) for word in full_name.split()}
+            all_names = {main_name} | aliases | partial_names
+
+            self.add_person(main_name, list(all_names))
+
     def add_connection(self, person1: str, person2: str, count: int):
         """ Adds an edge between two people if they meet the threshold. """
         if count >= self.threshold:
             node1 = self.nodes.get(person1)
             node2 = self.nodes.get(person2)
-            if node1 and node2:
-                node1.add_neighbor(node2)
-                node2.add_neighbor(node1)
+            if node1 and node2 and node1 is not node2:  # Prevent self-loops
+                self.edges.add(tuple(sorted([node1.main_name, node2.main_name])))
 
     def get_edges(self) -> List[List[List[str]]]:
         """ Returns a sorted list of unique edges in nested list format. """
-        edges = set()
-        for node in self.nodes.values():
-            for neighbor in node.neighbors:
-                edge = tuple(sorted([node.main_name, neighbor.main_name]))
-                edges.add(edge)
+        return sorted([[name.split() for name in edge] for edge in self.edges])  # Nested list format
 
-        return sorted([[name.split() for name in edge] for edge in edges])  # Nested list format
+    def to_csr(self) -> CSRGraph:
+        """ Returns the compact CSR form of the graph, holding the people with at least one connection. """
+        return CSRGraph.from_edges(self.edges)
 
 
 class DirectConnections:
@@ -67,7 +206,11 @@ class DirectConnections:
             stopwords_path: str = None,
             preprocess_path: str = None,
             window_size: int = None,
-            threshold: int = None
+            threshold: int = None,
+            data: Dict[str, Any] = None,
+            window_sizes: List[int] = None,
+            thresholds: List[int] = None,
+            top_neighbors: int = None
     ):
         """
         Initialize the DirectConnections class.
@@ -79,15 +222,31 @@ class DirectConnections:
         :param preprocess_path: Path to the preprocessed JSON file (optional).
         :param window_size: The size of the window to consider.
         :param threshold: The threshold to use for the direct connections.
+        :param data: Already preprocessed data, as returned by preprocess_init (optional).
+        :param window_sizes: Window sizes to sweep, instead of window_size (optional).
+        :param thresholds: Thresholds to sweep, instead of threshold (optional).
+        :param top_neighbors: Also list the top_neighbors people co-occurring most with each person (optional).
         """
 
         self.question_num = question_num
         self.window_size = window_size
         self.threshold = threshold
+        self.sweep = window_sizes is not None or thresholds is not None  # Results for every combination
+        self.window_sizes = window_sizes or [window_size]
+        self.thresholds = thresholds or [threshold]
+        self.top_neighbors = top_neighbors
+        self.co_occurrences = None  # The co-occurrence counts, see get_co_occurrences()
         self.graph = PersonGraph(self.threshold)
+        self.graph_built = False  # Whether build_graph() already filled the graph
 
         # Load the preprocessed data or preprocess it from raw data
-        self.data = preprocess_init(preprocess_path, sentences_path, people_path, stopwords_path)
+        if data is None:
+            data = preprocess_init(preprocess_path, sentences_path, people_path, stopwords_path)
+            # Input files of the data, which key the cached mention table and graph
+            self.cache_paths = [preprocess_path, sentences_path, people_path, stopwords_path]
+        else:
+            self.cache_paths = []  # Data given directly, there is nothing to key a cache entry on
+        self.data = data
 
         # Extract processed data
         self.processed_sentences = self.data.get("Processed Sentences", [])
@@ -97,26 +256,28 @@ class DirectConnections:
 
     def validate_inputs(self):
         """ Validate window size and threshold inputs. """
-        if self.window_size is None or self.window_size < 0:
+        if any(window_size is None or window_size < 0 for window_size in self.window_sizes):
             print("Error: Window size (K) must be provided and non-negative.")
             sys.exit(1)
-        if self.threshold is None or self.threshold < 0:
+        if any(threshold is None or threshold < 0 for threshold in self.thresholds):
             print("Error: Threshold (T) must be provided and non-negative.")
             sys.exit(1)
-        if self.window_size > len(self.processed_sentences):
+        if max(self.window_sizes) > len(self.processed_sentences):
             print("Error: Window size (K) cannot exceed the number of sentences.")
             sys.exit(1)
 
     def create_nodes_with_aliases(self):
         """ Creates nodes with aliases and assigns them to the graph. """
-        for person in self.processed_people:
-            main_name = " ".join(person[0])
-            aliases = {" ".join(alias) for alias in person[1]}
-            partial_names = {word for full_name in [main_name] + list(aliases) for word in full_name.split()}
-            all_names = {main_name} | aliases | partial_names
+        self.graph.add_people(self.processed_people)
 
-            self.graph.add_person(main_name, list(all_names))
+    def find_people_in_sentences(self) -> List[List[str]]:
+        """
+        Builds the mention table: the people mentioned (by any alias) in each sentence.
+        :return: A list with the sorted main names of the people mentioned in each processed sentence.
+        """
+        return find_mentions(self.graph.nodes, self.processed_sentences)
 
+    @profiled()
     def add_edges_from_co_occurrences(self):
         """ Adds edges to the graph based on co-occurrences in shared windows of sentences. """
 
@@ -124,48 +285,139 @@ class DirectConnections:
         if self.window_size == 0 or (self.threshold > len(self.processed_sentences) and self.window_size > 1):
             return []
 
-        name_to_sentences = defaultdict(set)
+        # Add valid edges based on threshold
+        for person1, person2, count in self.get_co_occurrences().weighted_edges():
+            self.graph.add_connection(person1, person2, count)
 
-        # Map names to the sentences they appear in
-        for main_name, node in self.graph.nodes.items():
-            for sentence in self.processed_sentences:
-                sentence_text = " ".join(sentence)
+    def get_co_occurrences(self) -> WeightedCSRGraph:
+        """
+        Count (once) the windows of sentences shared by each pair of people, whatever the threshold.
+        :return: The counts as a weighted graph, with the window size and the number of sentences in its info.
+        """
+        if self.co_occurrences is None:
+            def count() -> WeightedCSRGraph:
+                self.create_nodes_with_aliases()
+                # The mention table only depends on the input files, so it is shared by all window sizes
+                people_in_sentences = cached("mentions", self.cache_paths, {}, self.find_people_in_sentences)
+
+                # Co-occurrence dictionary for counting shared windows
+                co_occurrence_counts = {}
+                if self.window_size:
+                    count_co_occurrences(co_occurrence_counts, people_in_sentences, self.window_size)
+                return WeightedCSRGraph.from_counts(co_occurrence_counts, {
+                    "window_size": self.window_size, "sentence_count": len(self.processed_sentences)})
+
+            self.co_occurrences = cached("co_occurrences", self.cache_paths, {"window_size": self.window_size}, count)
+        return self.co_occurrences
+
+    def save_counts(self, path: str):
+        """ Save the co-occurrence counts, for SavedDirectConnections. """
+        try:
+            self.get_co_occurrences().save(path)
+        except OSError as e:
+            print(f"Error: Could not save the co-occurrence counts to {path}: {e}")
+            sys.exit(1)
 
-                # Ensure alias matches as a standalone word
-                if any(re.search(rf'\b{name}\b', sentence_text) for name in node.aliases):
-                    name_to_sentences[main_name].add(tuple(sentence))
+    @profiled(count=lambda graph: len(graph.edges))
+    def build_graph(self) -> PersonGraph:
+        """ Builds the graph of people once, later calls return the same graph. """
+        if not self.graph_built:
+            self.create_nodes_with_aliases()
 
-        # Co-occurrence dictionary for counting shared windows
-        co_occurrence_counts = defaultdict(int)
+            def compute_edges():
+                self.add_edges_from_co_occurrences()
+                return self.graph.edges
 
-        # Identify valid co-occurrences in windows
-        for i in range(len(self.processed_sentences) - self.window_size + 1):
-            window_sentences = self.processed_sentences[i:i + self.window_size]
+            self.graph.edges = cached("graph", self.cache_paths,
+                                      {"window_size": self.window_size, "threshold": self.threshold}, compute_edges)
+            self.graph_built = True
+        return self.graph
 
-            people_in_window = set()
-            for sentence in window_sentences:
-                sentence_text = " ".join(sentence)
-                for main_name, node in self.graph.nodes.items():
-                    if any(re.search(rf'\b{name}\b', sentence_text) for name in node.aliases):
-                        people_in_window.add(main_name)
+    @profiled(count=len)
+    def sweep_pair_matches(self) -> List[list]:
+        """
+        Computes the Pair Matches of every combination of the swept window sizes and thresholds, from one mention
+        table and one pass over the mentions for all the window sizes.
+        :return: A [window size, threshold, Pair Matches] list per combination, in the order they were given.
+        """
+        self.create_nodes_with_aliases()
+        people_in_sentences = cached("mentions", self.cache_paths, {}, self.find_people_in_sentences)
+        counts = sweep_co_occurrences(people_in_sentences,
+                                      [window_size for window_size in self.window_sizes if window_size > 0])
+        sweep_matches = []
+        for window_size in self.window_sizes:
+            for threshold in self.thresholds:
+                graph = PersonGraph(threshold)
+                graph.nodes = self.graph.nodes
+                # No edges if window size is 0 or threshold is greater than the number of sentences, as for one run
+                if window_size > 0 and not (threshold > len(self.processed_sentences) and window_size > 1):
+                    for (person1, person2), count in counts[window_size].items():
+                        graph.add_connection(person1, person2, count)
+                sweep_matches.append([window_size, threshold, graph.get_edges()])
+        return sweep_matches
 
-            # Count co-occurrences
-            people_list = sorted(people_in_window)
-            for j in range(len(people_list)):
-                for k in range(j + 1, len(people_list)):
-                    co_occurrence_counts[(people_list[j], people_list[k])] += 1
+    def generate_results(self) -> Dict[str, Any]:
+        """ Generates the final results for Task 6. """
+        if self.sweep:
+            return {
+                f"Question {self.question_num}": {
+                    "Sweep Matches": self.sweep_pair_matches()
+                }
+            }
+        self.build_graph()
 
-        # Add valid edges based on threshold
-        for (person1, person2), count in co_occurrence_counts.items():
-            self.graph.add_connection(person1, person2, count)
+        results = {"Pair Matches": self.graph.get_edges()}
+        if self.top_neighbors is not None:
+            results["Top Neighbors"] = top_neighbors_from_counts(self.get_co_occurrences(), self.top_neighbors)
+        return {
+            f"Question {self.question_num}": results
+        }
+
+
+class SavedDirectConnections:
+    """ Task 6 results from the co-occurrence counts saved by an earlier run (--save_counts), without the corpus. """
+
+    def __init__(
+            self,
+            question_num: int,
+            counts_path: str,
+            threshold: int = None,
+            thresholds: List[int] = None,
+            top_neighbors: int = None
+    ):
+        """
+        Initialize the SavedDirectConnections class.
+
+        :param question_num: The task reference number.
+        :param counts_path: Path to the co-occurrence counts saved by Task 6.
+        :param threshold: The threshold to use for the direct connections.
+        :param thresholds: Thresholds to sweep, instead of threshold (optional).
+        :param top_neighbors: Also list the top_neighbors people co-occurring most with each person (optional).
+        """
+        self.question_num = question_num
+        self.sweep = thresholds is not None
+        self.thresholds = thresholds or [threshold]
+        self.top_neighbors = top_neighbors
+        if any(threshold is None or threshold < 0 for threshold in self.thresholds):
+            print("Error: Threshold (T) must be provided and non-negative.")
+            sys.exit(1)
+        try:
+            self.co_occurrences = WeightedCSRGraph.load(counts_path)
+        except (OSError, EOFError, ValueError, KeyError) as e:
+            print(f"Error loading co-occurrence counts: {e}")
+            sys.exit(1)
 
     def generate_results(self) -> Dict[str, Any]:
         """ Generates the final results for Task 6. """
-        self.create_nodes_with_aliases()
-        self.add_edges_from_co_occurrences()
-
+        if self.sweep:
+            window_size = self.co_occurrences.info["window_size"]
+            results = {"Sweep Matches": [[window_size, threshold,
+                                          pair_matches_from_counts(self.co_occurrences, threshold)]
+                                         for threshold in self.thresholds]}
+        else:
+            results = {"Pair Matches": pair_matches_from_counts(self.co_occurrences, self.thresholds[0])}
+        if self.top_neighbors is not None:
+            results["Top Neighbors"] = top_neighbors_from_counts(self.co_occurrences, self.top_neighbors)
         return {
-            f"Question {self.question_num}": {
-                "Pair Matches": self.graph.get_edges()
-            }
+            f"Question {self.question_num}": results
         }
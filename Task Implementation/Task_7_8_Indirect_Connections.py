@@ -3,14 +3,110 @@
 # The class uses a graph representation of the direct connections between people to find indirect connections.
 # The class can be used to find indirect connections within a specified distance (Task 7) or of a fixed length (Task 8).
 # The class can also preprocess the data if necessary.
+# The connected components of the graph are labelled once (see Components): a pair of people of different components
+# is answered without a search, a Task 8 pair whose bipartite component forces paths of the other parity than K too,
+# and the BFS distances of people found in several pairs, cut off at the distance asked for, are computed once and kept.
 
 
 import collections
 import json
+import os
 import sys
+from array import array
 from collections import defaultdict
-from typing import Dict, Any, List
-from task_implementation.Task_6_Direct_Connections import DirectConnections, PersonGraph
+from typing import TYPE_CHECKING, Dict, Any, Iterator, List, Set, Tuple
+from Utilities.profiling import profiled
+
+if TYPE_CHECKING:
+    # Task 6 (and the preprocessing it needs) is only imported when the graph is built from the sentences
+    from task_implementation.Task_6_Direct_Connections import DirectConnections
+    # The graph, cache and JSON modules are imported by the methods using them, out of the startup of the module
+    from Utilities.graph import Components, CSRGraph
+
+# From this fixed length, a Task 8 DFS that expands more than DFS_EXPANSION_BUDGET nodes without finding a path
+# gives up and lets a meet-in-the-middle search finish the job
+MEET_IN_THE_MIDDLE_MIN_K = 8
+DFS_EXPANSION_BUDGET = 20000
+
+
+class DistanceMatrix:
+    """ All-pairs shortest distances of a small graph, stored as a flat array of unsigned ints. """
+
+    def __init__(self, names: List[str], distances: array):
+        self.names = names
+        self.index = {name: i for i, name in enumerate(names)}  # {person_name -> row/column in the matrix}
+        self.distances = distances  # Row-major n x n matrix, the maximal value of the typecode means unreachable
+        self.unreachable = (1 << (8 * distances.itemsize)) - 1
+
+    @classmethod
+    @profiled(count=lambda matrix: len(matrix.names))
+    def build(cls, graph: "CSRGraph") -> "DistanceMatrix":
+        """
+        Run a BFS from every node of the graph and store the distances in a compact matrix.
+        :param graph: The graph of people.
+        :return: The distance matrix of the graph.
+        """
+        size = len(graph)
+        # Distances are at most size - 1, so use the smallest type that keeps the maximal value free
+        typecode = 'B' if size < 0xFF else 'H' if size < 0xFFFF else 'I'
+        unreachable = (1 << (8 * array(typecode).itemsize)) - 1
+        distances = array(typecode, [unreachable]) * (size * size)
+
+        for start in range(size):  # Rows and columns follow the node ids of the graph
+            offset = start * size
+            distances[offset + start] = 0
+            frontier, depth = [start], 0
+            while frontier:
+                depth += 1
+                next_frontier = []
+                for node in frontier:
+                    for neighbor in graph.neighbors(node):
+                        if distances[offset + neighbor] == unreachable:
+                            distances[offset + neighbor] = depth
+                            next_frontier.append(neighbor)
+                frontier = next_frontier
+
+        return cls(list(graph.names), distances)
+
+    def distance(self, person1: str, person2: str) -> float:
+        """ O(1) lookup of the shortest distance between two people, infinity if they are not connected. """
+        i, j = self.index.get(person1), self.index.get(person2)
+        if i is None or j is None:
+            return float('inf')
+        distance = self.distances[i * len(self.names) + j]
+        return float('inf') if distance == self.unreachable else distance
+
+    def save(self, path: str, digest: str):
+        """
+        Persist the matrix to a binary file: a JSON header line followed by the raw matrix bytes.
+        :param path: Path of the file to write.
+        :param digest: Digest of the graph the matrix was built from, used to detect stale files.
+        """
+        header = {"digest": digest, "names": self.names, "typecode": self.distances.typecode,
+                  "byteorder": sys.byteorder}
+        with open(path, "wb") as file:
+            file.write(json.dumps(header).encode() + b"\n")
+            self.distances.tofile(file)
+
+    @classmethod
+    def load(cls, path: str, digest: str) -> "DistanceMatrix" or None:
+        """
+        Load a matrix saved by `save`.
+        :param path: Path of the saved matrix.
+        :param digest: Digest of the current graph.
+        :return: The distance matrix, or None if the file is missing or was built from another graph.
+        """
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as file:
+            header = json.loads(file.readline())
+            if header.get("digest") != digest:
+                return None
+            distances = array(header["typecode"])
+            distances.frombytes(file.read())
+        if header["byteorder"] != sys.byteorder:
+            distances.byteswap()
+        return cls(header["names"], distances)
 
 
 class IndirectPaths:
@@ -27,7 +123,12 @@ class IndirectPaths:
             threshold: int = None,
             people_connections_path: str = None,
             maximal_distance: int = None,
-            K: int = None
+            K: int = None,
+            all_pairs: bool = False,
+            walks: bool = False,
+            direct_connections: "DirectConnections" = None,
+            people_pairs: List[List[str]] = None,
+            counts_path: str = None
     ):
         """
         Initialize the IndirectPaths class.
@@ -42,6 +143,13 @@ class IndirectPaths:
         :param people_connections_path: Path to JSON file with list of people pairs to check.
         :param maximal_distance: The maximal allowed distance between two people. (for Task 7)
         :param K: The fixed length of the paths to check. (for Task 8)
+        :param all_pairs: Precompute all-pairs shortest distances and answer Task 7 queries by lookup. When a
+        Task 6 JSON is given, the matrix is persisted next to it and reused by later runs.
+        :param walks: For Task 8, check for walks of length K (people may repeat) instead of simple paths.
+        :param direct_connections: An already initialized Task 6 instance to take the graph from. (Optional)
+        :param people_pairs: The people pairs to check, given directly instead of people_connections_path. (Optional)
+        :param counts_path: Path to the co-occurrence counts saved by Task 6, thresholded with threshold to build
+        the graph without the corpus. (Optional)
 
         """
         # Initialize class attributes
@@ -62,79 +170,143 @@ class IndirectPaths:
             print("Error: Maximal distance must be provided for Task 7 and be a non negative integer.")
             sys.exit(1)
         self.K = K
+        self.walks = walks
         if self.question_num == 8 and (self.K is None or self.K < 0):  # Ensure K is provided for Task 8
             print("Error: K must be provided for Task 8 and be a non negative integer.")
             sys.exit(1)
 
         self.people_pairs = []  # Stores people pairs
 
-        if people_connections_path:
-            with open(people_connections_path, "r") as file:
-                self.people_pairs = json.load(file).get("keys", [])  # Extract only the "keys" list
+        if people_pairs is not None:
+            self.people_pairs = people_pairs
+        elif people_connections_path:
+            from Utilities.serialization import PAIRS_SCHEMA, load_json
+            with open(people_connections_path, "rb") as file:
+                self.people_pairs = load_json(file, PAIRS_SCHEMA).get("keys", [])  # Extract only the "keys" list
         else:
             print("No people connections file provided. Please provide a JSON file with a list of people pairs.")
             sys.exit(1)
 
         # Load graph from Task 6 JSON file if provided
-        if preprocess_path:
+        if preprocess_path and direct_connections is None:
+            from Utilities.cache import cached
             try:
-                with open(preprocess_path, "r") as file:
-                    self.task6_data = json.load(file)
-                    # Build the graph from Task 6 using the adjacency list representation
-                    self.graph = self.build_graph_from_task6()
+                # Reuse the parsed JSON and its CSR graph from an earlier run when the artifact cache is enabled
+                self.task6_data, self.graph = cached("task6_graph", [preprocess_path], {},
+                                                     lambda: self.load_task6_graph(preprocess_path))
             except Exception as e:
                 print(f"Error loading preprocessed file: {e}")
                 sys.exit(1)
 
+        # Or threshold the co-occurrence counts saved by Task 6
+        elif counts_path and direct_connections is None:
+            from task_implementation.Task_6_Direct_Connections import SavedDirectConnections
+            saved_connections = SavedDirectConnections(question_num=6, counts_path=counts_path, threshold=threshold)
+            self.task6_data = saved_connections.generate_results()
+            self.graph = self.build_graph_from_task6()
+
         # Otherwise, reconstruct graph using Task 6
-        elif preprocess_path is None:
-            if None not in (question_num, sentences_path, people_path, stopwords_path, window_size, threshold):
+        else:
+            if direct_connections is None and None in (question_num, sentences_path, people_path, stopwords_path,
+                                                       window_size, threshold):
+                print(
+                    "Invalid input parameters. Make sure you provided: question_num, sentences_path, people_path, "
+                    "stopwords_path, window_size, threshold.")
+                sys.exit(1)
+
+            if direct_connections is None:
+                from task_implementation.Task_6_Direct_Connections import DirectConnections
                 # Initialize the DirectConnections class for Task 6
-                data = DirectConnections(
+                direct_connections = DirectConnections(
                     question_num=6,
                     sentences_path=sentences_path,
                     people_path=people_path,
                     stopwords_path=stopwords_path,
                     window_size=window_size,
                     threshold=threshold)
-                self.task6_data = data.generate_results()
-                # Build a graph like in Task 6 and use adjacency list representation
-                self.graph = self.build_graph_from_task6()
-
-            else:
-                print(
-                    "Invalid input parameters. Make sure you provided: question_num, sentences_path, people_path, "
-                    "stopwords_path, window_size, threshold.")
-                sys.exit(1)
-
-    def build_graph_from_task6(self) -> Dict[str, List[str]]:
-        """ Builds n adjacency list representation of the graph from Task 6's precomputed results.
+            self.task6_data = direct_connections.generate_results()
+            # Use the graph built by Task 6 directly, in its compact CSR representation
+            self.graph = direct_connections.graph.to_csr()
+
+        self.components = None  # Component labels of the graph, see get_components()
+        self.repeated = self.repeated_people()  # The people found in several pairs
+        self.near_distances = {}  # {(node id, depth) -> {node id -> distance} within depth}, see cached_distances()
+        self.distance_matrix = None
+        if all_pairs:
+            self.distance_matrix = self.load_distance_matrix(preprocess_path)
+
+    @profiled()
+    def load_task6_graph(self, preprocess_path: str) -> Tuple[Dict[str, Any], "CSRGraph"]:
+        """ Loads the Task 6 JSON file and builds its graph.
+            :param preprocess_path: Path to the Task 6 graph JSON file.
+            :return: The Task 6 results and the graph."""
+        from Utilities.serialization import PAIR_MATCHES_SCHEMA, load_json
+        with open(preprocess_path, "rb") as file:
+            self.task6_data = load_json(file, PAIR_MATCHES_SCHEMA)
+        # Build the graph from Task 6 using the compact CSR representation
+        return self.task6_data, self.build_graph_from_task6()
+
+    def build_graph_from_task6(self) -> "CSRGraph":
+        """ Builds the CSR representation of the graph from Task 6's precomputed results.
             :param: task6_data: The precomputed results from Task 6.
-            :return: A dictionary representing the graph."""
-
-        # Initialize a temporary graph to store the connections
-        temp_graph = PersonGraph(threshold=0)  # No threshold needed for indirect connections
+            :return: The graph of people with at least one connection."""
 
+        from Utilities.graph import CSRGraph
         # Extract pair matches safely
         pair_matches = self.task6_data.get("Question 6", {}).get("Pair Matches", [])
+        return CSRGraph.from_pair_matches(pair_matches)
 
-        # Add people and connections to the graph
-        for pair in pair_matches:
-            person1 = " ".join(pair[0])
-            person2 = " ".join(pair[1])
-            temp_graph.add_person(person1, [])
-            temp_graph.add_person(person2, [])
-            temp_graph.add_connection(person1, person2, 1)  # Fake count of 1 since edges exist
-
-        # Convert the graph to an adjacency list representation
-        graph = defaultdict(list)
-
-        for node in temp_graph.nodes.values():
-            for neighbor in node.neighbors:
-                graph[node.main_name].append(neighbor.main_name)
-
-        return graph
+    @profiled()
+    def load_distance_matrix(self, preprocess_path: str = None) -> DistanceMatrix:
+        """
+        Load the all-pairs distance matrix saved next to the Task 6 JSON, or build (and save) it.
+        :param preprocess_path: Path to the Task 6 graph JSON file. (Optional)
+        :return: The distance matrix of the graph.
+        """
+        import hashlib
+        pair_matches = self.task6_data.get("Question 6", {}).get("Pair Matches", [])
+        digest = hashlib.sha1(json.dumps(pair_matches, sort_keys=True).encode()).hexdigest()
+        matrix_path = os.path.splitext(preprocess_path)[0] + ".distances" if preprocess_path else None
 
+        if matrix_path:
+            try:
+                distance_matrix = DistanceMatrix.load(matrix_path, digest)
+                if distance_matrix is not None:
+                    return distance_matrix
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Warning: Ignoring unreadable distance matrix at {matrix_path}: {e}", file=sys.stderr)
+
+        distance_matrix = DistanceMatrix.build(self.graph)
+        if matrix_path:
+            try:
+                distance_matrix.save(matrix_path, digest)
+            except OSError as e:
+                print(f"Warning: Could not save the distance matrix to {matrix_path}: {e}", file=sys.stderr)
+        return distance_matrix
+
+    def get_components(self) -> "Components":
+        """ Label the connected components of the graph, once, starting new BFS caches if the graph changed. """
+        if self.components is None or self.components.graph is not self.graph:
+            from Utilities.graph import Components
+            self.components = Components(self.graph)
+            self.near_distances = {}
+        return self.components
+
+    def repeated_people(self, people_pairs: List[List[str]] = None) -> set:
+        """ The people found in several of the pairs (all the pairs if None), whose searches are worth keeping. """
+        counts = collections.Counter(person for pair in (people_pairs if people_pairs is not None
+                                                         else self.people_pairs) for person in pair)
+        return {person for person, count in counts.items() if count > 1}
+
+    def cached_distances(self, node: int, max_depth: int) -> Dict[int, int]:
+        """ The distances from a node id cut off at max_depth (see bounded_distances), computed once. """
+        distances = self.near_distances.get((node, max_depth))
+        if distances is None:
+            distances = self.bounded_distances(self.graph, node, max_depth)
+            self.near_distances[node, max_depth] = distances
+        return distances
+
+    @profiled(count=len)
     def find_indirect_connections(self) -> List[List[bool]]:
         """
         Find indirect connections between nodes within a specified distance depending on the question.
@@ -149,41 +321,124 @@ class IndirectPaths:
                 indirect_matches.append([person1, person2, False])  # Automatically mark as False if graph is empty
             return indirect_matches
 
+        components = self.get_components()
+        repeated = set()
+        if self.question_num == 7 and self.distance_matrix is None:
+            # The people of several pairs of their component, whose BFS cut off at maximal_distance answers all of them
+            index = self.graph.index
+            repeated = self.repeated_people([pair for pair in self.people_pairs if pair[0] in index
+                                             and pair[1] in index and components.connected(index[pair[0]],
+                                                                                           index[pair[1]])])
         for person1, person2 in self.people_pairs:
             if person1 not in self.graph or person2 not in self.graph:
                 indirect_matches.append([person1, person2, False])  # Ensure all pairs appear in the final output
                 continue
 
-            # Perform BFS to find the shortest distance
-            shortest_paths = self.bfs_shortest_paths(person1)
-            distance = shortest_paths.get(person2, float('inf'))  # Default to infinite if no path exists
-
-            if self.question_num == 7:
-                is_connected = 1 <= distance <= self.maximal_distance
+            if self.question_num == 7 and (person1 in repeated or person2 in repeated):
+                source, target = (person1, person2) if person1 in repeated else (person2, person1)
+                distances = self.cached_distances(self.graph.index[source], self.maximal_distance)
+                is_connected = 1 <= distances.get(self.graph.index[target], float('inf')) <= self.maximal_distance
+            elif self.question_num == 7:
+                is_connected = self.within_distance(person1, person2, self.maximal_distance)
             if self.question_num == 8:
+                # Perform BFS to find the shortest distance
+                shortest_paths = self.bfs_shortest_paths(person1)
+                distance = shortest_paths.get(person2, float('inf'))  # Default to infinite if no path exists
                 is_connected = distance == self.K
             indirect_matches.append([person1, person2, is_connected])  # Include boolean value
 
         return indirect_matches
 
     # Task 7 implementation
+    def within_distance(self, person1: str, person2: str, maximal_distance: int) -> bool:
+        """
+        Check whether two different people of the graph are connected by a path of at most maximal_distance.
+        :param person1: The first person.
+        :param person2: The second person.
+        :param maximal_distance: The maximal allowed distance.
+        :return: True if 1 <= distance <= maximal_distance.
+        """
+        if person1 not in self.graph or person2 not in self.graph:
+            return False
+        if self.distance_matrix is not None:
+            distance = self.distance_matrix.distance(person1, person2)  # O(1) lookup
+        elif not self.get_components().connected(self.graph.index[person1], self.graph.index[person2]):
+            return False  # Different components, no search needed
+        else:
+            # Only distances up to maximal_distance matter, so stop the search at that depth
+            distance = self.bidirectional_bfs_distance(person1, person2, maximal_distance)
+        return 1 <= distance <= maximal_distance
+
+    @profiled(count=len)
     def bfs_shortest_paths(self, start_node: str) -> Dict[str, int]:
         """
         Performs BFS to find the shortest path from a start node to all other nodes.
         :param start_node: The node to start the search from.
         :return: Dictionary mapping nodes to their shortest distance from start.
         """
-        queue = collections.deque([(start_node, 0)])  # Initialize the queue to (start_node, distance)
-        distances = {start_node: 0}  # Start node has distance 0 from itself
+        if start_node not in self.graph:
+            return {start_node: 0}
+        start = self.graph.index[start_node]
+        queue = collections.deque([(start, 0)])  # Initialize the queue to (start node id, distance)
+        distances = {start: 0}  # Start node has distance 0 from itself
 
         while queue:  # Continue until all nodes in the queue have been processed
             node, dist = queue.popleft()  # Dequeue the next node and its distance
-            for neighbor in self.graph.get(node, []):  # Iterate over each neighbor of the current node
+            for neighbor in self.graph.neighbors(node):  # Iterate over each neighbor of the current node
                 if neighbor not in distances:  # If the neighbor wasn't visited yet
                     distances[neighbor] = dist + 1  # Update the distance from the start_node to the neighbor
                     queue.append((neighbor, dist + 1))  # Add neighbor to queue with updated distance
 
-        return distances  # Return the dictionary of shortest distances from the start node
+        # Return the dictionary of shortest distances from the start node, by name
+        return {self.graph.names[node]: dist for node, dist in distances.items()}
+
+    @profiled()
+    def bidirectional_bfs_distance(self, start_node: str, end_node: str, max_depth: int) -> float:
+        """
+        Performs a bidirectional BFS between two nodes, cut off at a maximal depth.
+        Each round expands the smaller of the two frontiers by one full level, so the search only explores
+        the neighborhoods of both ends instead of the whole connected component.
+        :param start_node: The node to start the search from.
+        :param end_node: The node to reach.
+        :param max_depth: The maximal distance of interest.
+        :return: The shortest distance between the nodes, or infinity if it is greater than max_depth.
+        """
+        if start_node == end_node:
+            return 0
+        if start_node not in self.graph or end_node not in self.graph:
+            return float('inf')
+
+        start, end = self.graph.index[start_node], self.graph.index[end_node]
+        # Distances of the visited node ids from each end, and the frontier (last expanded level) of each side
+        start_distances, end_distances = {start: 0}, {end: 0}
+        start_frontier, end_frontier = [start], [end]
+        start_depth = end_depth = 0
+
+        # Visited sets are disjoint while no meeting was found, so the distance is > start_depth + end_depth
+        while start_frontier and end_frontier and start_depth + end_depth < max_depth:
+            if len(start_frontier) <= len(end_frontier):  # Always expand the smaller frontier
+                frontier, distances, other_distances = start_frontier, start_distances, end_distances
+                depth = start_depth
+            else:
+                frontier, distances, other_distances = end_frontier, end_distances, start_distances
+                depth = end_depth
+
+            next_frontier = []
+            for node in frontier:
+                for neighbor in self.graph.neighbors(node):
+                    if neighbor in distances:  # Already reached from this side
+                        continue
+                    if neighbor in other_distances:  # Both searches met, this is the shortest path
+                        return depth + 1 + other_distances[neighbor]
+                    distances[neighbor] = depth + 1
+                    next_frontier.append(neighbor)
+
+            if frontier is start_frontier:
+                start_frontier, start_depth = next_frontier, start_depth + 1
+            else:
+                end_frontier, end_depth = next_frontier, end_depth + 1
+
+        return float('inf')  # No path within max_depth
 
     def generate_results_task_7(self) -> Dict[str, Any]:
         """ Generates the final results for Task 7. """
@@ -202,45 +457,243 @@ class IndirectPaths:
         }
 
     # Task 8 implementation
-    def bfs_exact_paths(self, start_node: str, end_node: str) -> bool:
+    @staticmethod
+    def bounded_distances(graph: "CSRGraph", source: int, max_depth: int) -> Dict[int, int]:
         """
-        Perform BFS to check if there exists a path of exactly length K between start_node and end_node.
+        BFS distances from a node id, cut off at max_depth.
+        :return: {node id -> distance} for the nodes reached within max_depth only, so its size does not depend on
+        the size of the graph.
+        """
+        distances = {source: 0}
+        frontier = [source]
+        for depth in range(1, max_depth + 1):
+            next_frontier = []
+            for node in frontier:
+                for neighbor in graph.neighbors(node):
+                    if neighbor not in distances:
+                        distances[neighbor] = depth
+                        next_frontier.append(neighbor)
+            if not next_frontier:
+                break
+            frontier = next_frontier
+        return distances
+
+    @profiled()
+    def dfs_exact_paths(self, start_node: str, end_node: str) -> bool:
+        """
+        Check if there exists a simple path of exactly length K between start_node and end_node.
+        Uses a backtracking DFS with a single visited bitmap, pruning every branch from which end_node can no longer
+        be reached in the remaining steps. For long paths, a DFS that runs out of budget hands over to a
+        meet-in-the-middle search.
         :return: True if a path of exactly length K exists, otherwise False.
         """
-
         if start_node not in self.graph or end_node not in self.graph:
             return False  # If nodes do not exist in the graph, return False
-
-        queue = collections.deque([(start_node, 0, {start_node})])  # (current node, depth, visited set)
-
-        while queue:  # Continue until all nodes in the queue have been processed
-            # Dequeue the next node, depth, and visited set
-            node, depth, visited = queue.popleft()  # Added visited to set to prevent revisiting nodes and infinite
-            # loops
-
-            if depth == self.K:
-                if node == end_node:  # If we reached the end node
-                    return True  # Found exact-length path
-                continue  # Do not explore further if we reached K steps
-
-            if depth < self.K:
-                for neighbor in self.graph.get(node, []):  # Iterate over each neighbor of the current node
-                    if neighbor not in visited:  # Prevent revisiting nodes in the same path
-                        queue.append(
-                            (neighbor, depth + 1, visited | {neighbor}))  # Add neighbor with updated visited set
+        if self.K == 0 or start_node == end_node:
+            return self.K == 0 and start_node == end_node  # A simple path never returns to its start node
+
+        graph = self.graph
+        start, end = graph.index[start_node], graph.index[end_node]
+        components = self.get_components()
+        if not components.connected(start, end) or not components.parity_allows(start, end, self.K):
+            return False  # No path at all, or only paths of the other parity than K in a bipartite component
+        if self.K >= components.sizes[components.labels[start]]:
+            return False  # A simple path of length K visits K + 1 distinct nodes of the component
+
+        # Lower bounds on the number of steps still needed to reach end_node, used for pruning
+        if end_node in self.repeated:
+            end_distances = self.cached_distances(end, self.K)
+        else:
+            end_distances = self.bounded_distances(graph, end, self.K)
+        if start not in end_distances:
+            return False
+
+        # A DFS usually finds an existing path quickly, but has to exhaust all paths to prove there is none
+        budget = DFS_EXPANSION_BUDGET if self.K >= MEET_IN_THE_MIDDLE_MIN_K else None
+
+        visited = bytearray(len(graph))  # Nodes on the current path
+        visited[start] = 1
+        stack = [(start, iter(graph.neighbors(start)))]  # The current path, with the neighbors left to try at each node
+        far = self.K + 1  # The distance of the nodes end_distances does not hold
+
+        while stack:
+            if budget is not None:
+                budget -= 1
+                if budget < 0:
+                    return self.meet_in_the_middle_exact_paths(start, end, end_distances)
+            node, neighbors = stack[-1]
+            remaining = self.K - len(stack)  # Steps left after moving to a neighbor
+            for neighbor in neighbors:
+                if visited[neighbor]:
+                    continue
+                if neighbor == end:
+                    if remaining == 0:
+                        return True  # Found exact-length path
+                    continue  # end_node can only be the last node of the path
+                if end_distances.get(neighbor, far) > remaining:
+                    continue  # end_node is out of reach from this neighbor
+                visited[neighbor] = 1
+                stack.append((neighbor, iter(graph.neighbors(neighbor))))
+                break
+            else:  # All neighbors were tried, backtrack
+                visited[node] = 0
+                stack.pop()
 
         return False  # No valid path found
 
+    @profiled()
+    def meet_in_the_middle_exact_paths(self, start: int, end: int, end_distances: Dict[int, int]) -> bool:
+        """
+        Meet-in-the-middle search for a simple path of exactly length K.
+        All pruned half paths of length K // 2 from the start are grouped by their last node, then the remaining
+        half paths from the end are matched against them, requiring that the two halves only share the middle node.
+        :return: True if a path of exactly length K exists, otherwise False.
+        """
+        start_length = self.K // 2
+        end_length = self.K - start_length
+        start_distances = self.bounded_distances(self.graph, start, self.K)
+
+        # {middle node -> inner nodes of every half path from start that ends at it}, each set of inner nodes once
+        start_halves = defaultdict(set)
+        for middle, inner in self.simple_half_paths(start, end, start_length, end_distances):
+            start_halves[middle].add(inner)
+
+        half_indexes = {}  # {middle node -> see half_path_index}, for the middle nodes reached from the end
+        checked = set()  # (middle node, inner nodes) of the half paths from the end already matched
+        for middle, inner in self.simple_half_paths(end, start, end_length, start_distances, targets=start_halves):
+            if (middle, inner) in checked:
+                continue
+            checked.add((middle, inner))
+            if middle not in half_indexes:
+                half_indexes[middle] = self.half_path_index(start_halves[middle])
+            all_halves, node_halves = half_indexes[middle]
+            blocked = 0  # The start halves sharing a node with this half
+            for node in inner:
+                blocked |= node_halves.get(node, 0)
+            if blocked != all_halves:
+                return True
+        return False
+
+    @staticmethod
+    def half_path_index(halves: Set[frozenset]) -> Tuple[int, Dict[int, int]]:
+        """
+        Number half paths and map each of their nodes to the half paths holding it, so that the half paths disjoint
+        from a set of nodes are found with one OR per node rather than by comparing every half path.
+        :param halves: The inner nodes of each half path.
+        :return: The bitset of all the half paths, and {node -> bitset of the half paths holding it}.
+        """
+        holders = defaultdict(list)  # {node -> numbers of the half paths holding it}
+        for number, inner in enumerate(halves):
+            for node in inner:
+                holders[node].append(number)
+        node_halves = {}
+        for node, numbers in holders.items():
+            bits = bytearray((len(halves) + 7) // 8)
+            for number in numbers:
+                bits[number >> 3] |= 1 << (number & 7)
+            node_halves[node] = int.from_bytes(bits, "little")
+        return (1 << len(halves)) - 1, node_halves
+
+    def simple_half_paths(self, source: int, other_end: int, length: int, other_distances: Dict[int, int],
+                          targets: Dict[int, Any] = None) -> Iterator[Tuple[int, frozenset]]:
+        """
+        Yield (last node, inner nodes) for every simple path of the given length from source, avoiding other_end
+        and pruning nodes that are too far from other_end to complete a path of length K. The inner nodes are
+        those between source and the last node.
+        :param targets: If provided, only paths ending at one of these nodes are yielded.
+        """
+        graph = self.graph
+        far = self.K + 1  # The distance of the nodes other_distances does not hold
+        path = []  # The inner nodes of the current path, in order
+        on_path = {source}
+        stack = [iter(graph.neighbors(source))]  # The neighbors left to try at source and at each node of path
+        while stack:
+            depth = len(stack)  # Depth of the neighbors
+            for neighbor in stack[-1]:
+                if neighbor in on_path or neighbor == other_end or other_distances.get(neighbor, far) > self.K - depth:
+                    continue
+                if depth == length:
+                    if targets is None or neighbor in targets:
+                        yield neighbor, frozenset(path)
+                    continue
+                path.append(neighbor)
+                on_path.add(neighbor)
+                stack.append(iter(graph.neighbors(neighbor)))
+                break
+            else:
+                stack.pop()
+                if path:
+                    on_path.discard(path.pop())
+
+    @profiled(count=len)
     def find_fixed_length_paths(self) -> list[list[bool]]:
         """
         Find whether each pair of people is connected by exactly length K.
         :return: A sorted list of results.
         """
         result = []
-        # Check each pair of people for a fixed-length path using the BFS algorithm
+        # Check each pair of people for a fixed-length path using the DFS algorithm
         for person1, person2 in self.people_pairs:
             person1, person2 = sorted([person1, person2])  # Ensure sorted order
-            connection_exists = self.bfs_exact_paths(start_node=person1, end_node=person2)
+            connection_exists = self.dfs_exact_paths(start_node=person1, end_node=person2)
+            result.append([person1, person2, connection_exists])  # connection_exists is a boolean
+
+        # Sort the results alphabetically
+        result.sort()
+        return result
+
+    @staticmethod
+    def boolean_matrix_product(left: List[int], right: List[int]) -> List[int]:
+        """
+        Multiply two boolean matrices whose rows are stored as bitmasks.
+        Row i of the product is the OR of the rows of `right` selected by the set bits of row i of `left`.
+        """
+        product = []
+        for row in left:
+            product_row = 0
+            while row:
+                lowest_bit = row & -row
+                product_row |= right[lowest_bit.bit_length() - 1]
+                row ^= lowest_bit
+            product.append(product_row)
+        return product
+
+    @profiled()
+    def walk_matrix(self) -> List[int]:
+        """
+        Raise the boolean adjacency matrix to the power K by repeated squaring.
+        :return: The rows of the matrix as bitmasks, bit j of row i is set if there is a walk of length K from i to j.
+        """
+        power = [sum(1 << neighbor for neighbor in self.graph.neighbors(node)) for node in range(len(self.graph))]
+        result = [1 << node for node in range(len(self.graph))]  # Identity matrix, the walks of length 0
+
+        exponent = self.K
+        while exponent:
+            if exponent & 1:
+                result = self.boolean_matrix_product(result, power)
+            exponent >>= 1
+            if exponent:
+                power = self.boolean_matrix_product(power, power)
+        return result
+
+    @profiled(count=len)
+    def find_fixed_length_walks(self) -> list[list[bool]]:
+        """
+        Find whether each pair of people is connected by a walk of exactly length K, all pairs at once.
+        :return: A sorted list of results.
+        """
+        result = []
+        index = self.graph.index
+        components = self.get_components()
+        # Walks only join people of the same component, with the parity of their colors in a bipartite component
+        candidates = [person1 in index and person2 in index
+                      and components.connected(index[person1], index[person2])
+                      and components.parity_allows(index[person1], index[person2], self.K)
+                      for person1, person2 in self.people_pairs]
+        walks = self.walk_matrix() if any(candidates) and self.K is not None else []
+        for (person1, person2), candidate in zip(self.people_pairs, candidates):
+            person1, person2 = sorted([person1, person2])  # Ensure sorted order
+            connection_exists = candidate and bool(walks[index[person1]] >> index[person2] & 1)
             result.append([person1, person2, connection_exists])  # connection_exists is a boolean
 
         # Sort the results alphabetically
@@ -249,7 +702,7 @@ class IndirectPaths:
 
     def generate_results_task_8(self) -> Dict[str, Any]:
         """ Generates the final results for Task 8. """
-        fixed_length_matches = self.find_fixed_length_paths()
+        fixed_length_matches = self.find_fixed_length_walks() if self.walks else self.find_fixed_length_paths()
         return {
             f"Question {self.question_num}": {
                 "Pair Matches": fixed_length_matches
@@ -7,8 +7,9 @@
 import sys
 import collections
 from typing import List, Dict, Any
-from itertools import combinations
 from Utilities.helper import preprocess_init
+from Utilities.profiling import profiled
+from Utilities.progress import track
 
 
 class SentenceGraph:
@@ -28,16 +29,27 @@ class SentenceGraph:
 
         self.sentences.append(sentence)
 
+    @profiled()
     def build_graph(self):
         """Creates edges between sentences that share at least `threshold` words."""
 
-        for i, j in combinations(range(len(self.sentences)), 2):  # Generate all pairs of sentences
-            common_words = set(self.sentences[i]) & set(self.sentences[j])  # Set intersection based on shared words
-            if len(common_words) >= self.threshold:  # Add an edge if the shared word count is at least the threshold
-                # Add an edge between the two sentences
-                self.graph[i].add(j)
-                self.graph[j].add(i)
-
+        n = len(self.sentences)
+        progress = track("Task 9 sentence pairs", n * (n - 1) // 2, "pairs")
+        pairs_scored = 0
+        word_sets = [set(sentence) for sentence in self.sentences]  # Built once instead of once per pair
+        for i in range(n):  # Generate all pairs of sentences, in the order of itertools.combinations
+            words = word_sets[i]
+            for j in range(i + 1, n):
+                common_words = words & word_sets[j]  # Set intersection based on shared words
+                if len(common_words) >= self.threshold:  # Add an edge if the shared word count reaches the threshold
+                    # Add an edge between the two sentences
+                    self.graph[i].add(j)
+                    self.graph[j].add(i)
+            pairs_scored += n - 1 - i
+            progress.update(pairs_scored, connected_sentences=len(self.graph))
+        progress.finish(pairs_scored, connected_sentences=len(self.graph))
+
+    @profiled(count=len)
     def find_groups(self) -> List[List[str]]:
         """Finds groups of connected sentences using BFS.
             :Returns: a list of groups of sentences. Each group is a list of sentences. """
@@ -63,7 +75,7 @@ class SentenceGraph:
 
 class SentenceClustering:
     def __init__(self, question_num: int, sentences_path: str = None, stopwords_path: str = None,
-                 threshold: int = None, preprocess_path: str = None):
+                 threshold: int = None, preprocess_path: str = None, data: Dict[str, Any] = None):
         """
         Initialize the SentenceClustering class.
 
@@ -72,6 +84,7 @@ class SentenceClustering:
         :param stopwords_path: Path to the stopwords file.
         :param threshold: Minimum number of shared words required for sentence connection.
         :param preprocess_path: Path to preprocessed JSON file (if available).
+        :param data: Already preprocessed data, as returned by preprocess_init (optional).
         """
         self.question_num = question_num
         self.threshold = threshold
@@ -80,7 +93,8 @@ class SentenceClustering:
             sys.exit(1)
 
         # Load the preprocessed sentences weather from a preprocessed file or preprocess it from raw data
-        data = preprocess_init(preprocess_path, sentences_path, None, stopwords_path)
+        if data is None:
+            data = preprocess_init(preprocess_path, sentences_path, None, stopwords_path)
         self.sentences = data.get("Processed Sentences", [])  # List of preprocessed sentences
 
     def generate_results(self) -> Dict[str, Any]:
@@ -0,0 +1,251 @@
+# Description: Boolean and proximity queries over the Task 4 postings index.
+# A query combines K-seqs with AND, OR, NOT and WITHIN n, e.g.
+#   "harry potter" AND (hogwarts OR "ron weasley") AND NOT voldemort
+#   dumbledore WITHIN 2 snape
+# A K-seq is a word or a quoted sequence of words, which may hold "*" wildcards (e.g. "harry *", dumble*); terms
+# written next to each other are combined with AND.
+# Operators bind from tightest to loosest: NOT, WITHIN, AND, OR. "A WITHIN n B" matches the sentences containing A
+# that are at most n sentences away from a sentence containing B in the corpus (WITHIN 0 is the same sentence).
+# Queries are evaluated over the increasing sentence ids of the postings. Intersections start from the smallest
+# operand and filter its ids through the other operands, smallest first (adaptive intersection): an operand much
+# larger than the remaining candidates is searched for each candidate, jumping through the skip pointers of a
+# compressed posting or galloping (exponential then binary search) through the list computed for a sub-query,
+# while an operand of comparable size is decoded once into a set.
+
+import re
+from bisect import bisect_left
+from typing import List, Tuple
+from Utilities.postings import PostingCursor, PostingsIndex
+
+TOKEN_PATTERN = re.compile(r'\s*(?:(\()|(\))|"([^"]*)"|([^\s()"]+))')
+OPERATORS = {"AND", "OR", "NOT", "WITHIN"}
+GALLOP_RATIO = 32  # Operands this many times larger than the candidates are searched instead of decoded
+
+
+class QuerySyntaxError(ValueError):
+    """ A query that cannot be parsed. """
+
+
+def tokenize(query: str) -> List[Tuple[str, str]]:
+    """ Split a query into (kind, text) tokens, kind being "(", ")", "phrase", "operator" or "word". """
+    tokens = []
+    position = 0
+    query = query.strip()
+    while position < len(query):
+        match = TOKEN_PATTERN.match(query, position)
+        if match is None:
+            raise QuerySyntaxError(f"Unterminated quote in query: {query!r}")
+        opening, closing, phrase, word = match.groups()
+        if opening or closing:
+            tokens.append((opening or closing, opening or closing))
+        elif phrase is not None:
+            tokens.append(("phrase", phrase))
+        elif word in OPERATORS:
+            tokens.append(("operator", word))
+        else:
+            tokens.append(("word", word))
+        position = match.end()
+    return tokens
+
+
+class QueryParser:
+    """ Recursive descent parser of the query language, producing nested tuples. """
+
+    def __init__(self, query: str):
+        self.query = query
+        self.tokens = tokenize(query)
+        self.position = 0
+
+    def peek(self) -> Tuple[str, str] or None:
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def take(self) -> Tuple[str, str]:
+        token = self.peek()
+        if token is None:
+            raise QuerySyntaxError(f"Unexpected end of query: {self.query!r}")
+        self.position += 1
+        return token
+
+    def parse(self) -> tuple:
+        """
+        Parse the whole query.
+        :return: ("term", k-seq) | ("and", [nodes]) | ("or", [nodes]) | ("not", node) | ("within", n, node, node)
+        """
+        if not self.tokens:
+            raise QuerySyntaxError("Empty query.")
+        node = self.parse_or()
+        if self.peek() is not None:
+            raise QuerySyntaxError(f"Unexpected {self.peek()[1]!r} in query: {self.query!r}")
+        return node
+
+    def parse_or(self) -> tuple:
+        children = [self.parse_and()]
+        while self.peek() == ("operator", "OR"):
+            self.take()
+            children.append(self.parse_and())
+        return children[0] if len(children) == 1 else ("or", children)
+
+    def parse_and(self) -> tuple:
+        children = [self.parse_within()]
+        while True:
+            token = self.peek()
+            if token == ("operator", "AND"):
+                self.take()
+            elif token is None or token[0] == ")" or token == ("operator", "OR"):
+                break
+            children.append(self.parse_within())  # Explicit or implicit AND
+        return children[0] if len(children) == 1 else ("and", children)
+
+    def parse_within(self) -> tuple:
+        node = self.parse_unary()
+        while self.peek() == ("operator", "WITHIN"):
+            self.take()
+            distance = self.take()
+            if distance[0] != "word" or not distance[1].isdigit():
+                raise QuerySyntaxError(f"WITHIN needs a number of sentences in query: {self.query!r}")
+            node = ("within", int(distance[1]), node, self.parse_unary())
+        return node
+
+    def parse_unary(self) -> tuple:
+        token = self.take()
+        if token == ("operator", "NOT"):
+            return "not", self.parse_unary()
+        if token[0] == "(":
+            node = self.parse_or()
+            if self.take()[0] != ")":
+                raise QuerySyntaxError(f"Missing ')' in query: {self.query!r}")
+            return node
+        if token[0] in ("word", "phrase"):
+            k_seq = " ".join(token[1].lower().split())
+            if not k_seq:
+                raise QuerySyntaxError(f"Empty phrase in query: {self.query!r}")
+            return "term", k_seq
+        raise QuerySyntaxError(f"Unexpected {token[1]!r} in query: {self.query!r}")
+
+
+def parse_query(query: str) -> tuple:
+    """ Parse a query, see QueryParser.parse. Raises QuerySyntaxError. """
+    return QueryParser(query).parse()
+
+
+def positive_terms(node: tuple) -> List[str]:
+    """ The K-seqs of a parsed query that a match contains (those not under a NOT), for ranking. """
+    kind = node[0]
+    if kind == "term":
+        return [node[1]]
+    if kind in ("and", "or"):
+        return [term for child in node[1] for term in positive_terms(child)]
+    if kind == "within":
+        return positive_terms(node[2]) + positive_terms(node[3])
+    return []
+
+
+class ListCursor:
+    """ Forward iteration over a sorted list of ids, reaching an id by galloping. """
+
+    def __init__(self, ids: List[int]):
+        self.ids = ids
+        self.index = 0  # Position of the next id to consider
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def decode(self) -> List[int]:
+        return self.ids
+
+    def next_geq(self, target: int) -> int or None:
+        """ Advance to the first id greater than or equal to target, None if there is none. """
+        ids = self.ids
+        low = self.index
+        if low >= len(ids):
+            return None
+        if ids[low] < target:
+            # Double the step until an id reaches the target, then search the last step
+            step = 1
+            while low + step < len(ids) and ids[low + step] < target:
+                low += step
+                step *= 2
+            low = bisect_left(ids, target, low + 1, min(low + step + 1, len(ids)))
+            if low >= len(ids):
+                self.index = low
+                return None
+        self.index = low
+        return ids[low]
+
+
+class QueryEvaluator:
+    """ Evaluates parsed queries over a PostingsIndex. """
+
+    def __init__(self, index: PostingsIndex):
+        self.index = index
+
+    def cursor(self, node: tuple) -> PostingCursor or ListCursor:
+        """ A cursor over the ids matching a node, reading the compressed posting directly for a term. """
+        if node[0] == "term" and "*" not in node[1]:
+            return self.index.cursor(node[1]) or ListCursor([])
+        return ListCursor(self.evaluate(node))
+
+    def evaluate(self, node: tuple) -> List[int]:
+        """ The increasing ids of the sentences matching a node. """
+        kind = node[0]
+        if kind == "term":
+            return self.index.pattern_ids(node[1]) if "*" in node[1] else self.index.sentence_ids_of(node[1])
+        if kind == "or":
+            return sorted(set().union(*(self.evaluate(child) for child in node[1])))
+        if kind == "not":
+            return self.evaluate_and([], [node[1]])
+        if kind == "and":
+            positive = [child for child in node[1] if child[0] != "not"]
+            negative = [child[1] for child in node[1] if child[0] == "not"]
+            return self.evaluate_and(positive, negative)
+        return self.evaluate_within(*node[1:])
+
+    def evaluate_and(self, positive: List[tuple], negative: List[tuple]) -> List[int]:
+        """ The ids matching every positive node and none of the negative nodes (all ids if no positive node). """
+        if positive:
+            cursors = sorted((self.cursor(child) for child in positive), key=len)  # Smallest operand first
+            candidates = cursors[0].decode()
+            for cursor in cursors[1:]:
+                candidates = filter_ids(candidates, cursor, keep=True)
+        else:
+            candidates = list(range(len(self.index.sentences)))
+        for child in negative:
+            candidates = filter_ids(candidates, self.cursor(child), keep=False)
+        return candidates
+
+    def evaluate_within(self, distance: int, first: tuple, second: tuple) -> List[int]:
+        """ The ids matching first, at a corpus position at most distance sentences away from one matching second. """
+        first_ids = set(self.evaluate(first))
+        second_ids = set(self.evaluate(second))
+        if not first_ids or not second_ids:
+            return []
+        sentence_at = self.index.sentence_at
+        second_positions = [position for position, sentence_id in enumerate(sentence_at) if sentence_id in second_ids]
+        matches = set()
+        for position, sentence_id in enumerate(sentence_at):
+            if sentence_id in first_ids and sentence_id not in matches:
+                nearest = bisect_left(second_positions, position - distance)
+                if nearest < len(second_positions) and second_positions[nearest] <= position + distance:
+                    matches.add(sentence_id)
+        return sorted(matches)
+
+    def search(self, query: str) -> List[Tuple[str, ...]]:
+        """ The sentences matching a query, in order of first appearance. Raises QuerySyntaxError. """
+        sentences = self.index.sentences
+        return [sentences[sentence_id] for sentence_id in self.evaluate(parse_query(query))]
+
+
+def filter_ids(candidates: List[int], cursor: PostingCursor or ListCursor, keep: bool) -> List[int]:
+    """
+    Filter sorted candidate ids by their presence in the ids of an operand.
+    :param candidates: The increasing candidate ids.
+    :param cursor: A cursor at the start of the operand.
+    :param keep: Keep the candidates present in the operand (AND), or those absent from it (AND NOT).
+    :return: The remaining candidates, in increasing order.
+    """
+    if not candidates:
+        return candidates
+    if len(cursor) > GALLOP_RATIO * len(candidates):
+        return [sentence_id for sentence_id in candidates if (cursor.next_geq(sentence_id) == sentence_id) == keep]
+    members = set(cursor.decode())
+    return [sentence_id for sentence_id in candidates if (sentence_id in members) == keep]
@@ -0,0 +1,176 @@
+# Description: Content-addressed cache of preprocessed data and derived structures.
+# Entries are keyed by hashes of the input files' contents plus the parameters that shaped them, so any change
+# in the inputs produces a new key. The cache is shared by parallel jobs: entries are written to a temporary
+# file and atomically renamed into place, and the least recently used entries are evicted under a size cap.
+# hashlib, pickle, tempfile and fcntl are only imported when a cache is used, to keep the startup of uncached runs
+# short.
+
+import json
+import os
+import sys
+from typing import Any, Callable, Dict, List
+
+CACHE_VERSION = 5  # Bump when the layout of a cached structure changes
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+ENTRY_SUFFIX = ".pkl"
+
+
+class ArtifactCache:
+    """
+    A directory of pickled artifacts with LRU eviction.
+    The cache directory must only be writable by trusted users, since entries are unpickled when read.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Initialize the ArtifactCache class.
+        :param cache_dir: Directory holding the cache entries, created if missing.
+        :param max_bytes: Maximal total size of the entries, older entries are evicted beyond it.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.file_digests: Dict[tuple, str] = {}  # {(path, size, mtime) -> content digest}, per process
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def file_digest(self, path: str) -> str or None:
+        """
+        Hash the content of a file, reusing the hash while the file's size and modification time are unchanged.
+        :return: The hex digest, or None if the file cannot be read.
+        """
+        try:
+            stat = os.stat(path)
+            stamp = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+            if stamp not in self.file_digests:
+                import hashlib
+                digest = hashlib.sha256()
+                with open(path, "rb") as file:
+                    for chunk in iter(lambda: file.read(1 << 20), b""):
+                        digest.update(chunk)
+                self.file_digests[stamp] = digest.hexdigest()
+            return self.file_digests[stamp]
+        except OSError:
+            return None
+
+    def make_key(self, kind: str, paths: List[str], params: Dict[str, Any] = None) -> str or None:
+        """
+        Build the key of an artifact.
+        :param kind: The kind of artifact, e.g. "preprocess".
+        :param paths: The input files the artifact is computed from (None entries are allowed).
+        :param params: The parameters the artifact depends on, must be JSON serializable.
+        :return: The key, or None if the artifact has no input file or an input file cannot be read.
+        """
+        if not any(paths):
+            return None
+        import hashlib
+        digest = hashlib.sha256(f"{CACHE_VERSION}:{kind}".encode())
+        for path in paths:
+            file_digest = self.file_digest(path) if path else "-"
+            if file_digest is None:
+                return None  # Let the caller report the missing file
+            digest.update(file_digest.encode())
+        digest.update(json.dumps(params or {}, sort_keys=True).encode())
+        return digest.hexdigest()
+
+    def entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ENTRY_SUFFIX)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """ Load an entry and mark it as recently used, or return default if it is missing or unreadable. """
+        import pickle
+        path = self.entry_path(key)
+        try:
+            with open(path, "rb") as file:
+                value = pickle.load(file)
+        except FileNotFoundError:
+            return default
+        except Exception as e:
+            print(f"Warning: Ignoring unreadable cache entry {path}: {e}", file=sys.stderr)
+            return default
+        try:
+            os.utime(path)  # The modification time is the last access time used for LRU eviction
+        except OSError:
+            pass  # Evicted by another process meanwhile
+        return value
+
+    def put(self, key: str, value: Any):
+        """ Store an entry atomically, then evict old entries if the cache grew beyond its size cap. """
+        import pickle
+        import tempfile
+        try:
+            file_descriptor, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            try:
+                with os.fdopen(file_descriptor, "wb") as file:
+                    pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(temp_path, self.entry_path(key))  # Readers see either no entry or the whole entry
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+        except OSError as e:
+            print(f"Warning: Could not write cache entry {key}: {e}", file=sys.stderr)
+            return
+        self.evict()
+
+    def evict(self):
+        """ Delete the least recently used entries until the cache fits in max_bytes. """
+        try:
+            import fcntl  # Used to serialize evictions between processes, not available on Windows
+        except ImportError:
+            fcntl = None
+        with open(os.path.join(self.cache_dir, ".lock"), "a") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)  # Released when the file is closed
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(ENTRY_SUFFIX):
+                    try:
+                        stat = os.stat(os.path.join(self.cache_dir, name))
+                        entries.append((stat.st_mtime_ns, stat.st_size, name))
+                    except FileNotFoundError:
+                        continue  # Deleted by another process
+
+            total_size = sum(size for _, size, _ in entries)
+            for _, size, name in sorted(entries):
+                if total_size <= self.max_bytes:
+                    break
+                try:
+                    os.unlink(os.path.join(self.cache_dir, name))
+                except FileNotFoundError:
+                    pass
+                total_size -= size
+
+
+active_cache: ArtifactCache or None = None  # The cache used by the tasks, None when caching is disabled
+MISSING = object()
+
+
+def configure_cache(cache_dir: str or None, max_bytes: int = DEFAULT_MAX_BYTES) -> ArtifactCache or None:
+    """
+    Enable the cache for this process (or disable it when cache_dir is None).
+    :param cache_dir: Directory holding the cache entries.
+    :param max_bytes: Maximal total size of the entries.
+    :return: The active cache.
+    """
+    global active_cache
+    active_cache = ArtifactCache(cache_dir, max_bytes) if cache_dir else None
+    return active_cache
+
+
+def cached(kind: str, paths: List[str], params: Dict[str, Any], compute: Callable[[], Any]) -> Any:
+    """
+    Return an artifact from the active cache, or compute and store it.
+    :param kind: The kind of artifact.
+    :param paths: The input files the artifact is computed from.
+    :param params: The parameters the artifact depends on.
+    :param compute: Computes the artifact on a cache miss.
+    :return: The artifact.
+    """
+    cache = active_cache
+    key = cache.make_key(kind, paths, params) if cache else None
+    if key is None:
+        return compute()
+
+    value = cache.get(key, MISSING)
+    if value is MISSING:
+        value = compute()
+        cache.put(key, value)
+    return value
@@ -0,0 +1,242 @@
+# Description: Compact graph representation shared by Tasks 6, 7 and 8.
+# Task 6 produces the graph of people and Tasks 7 and 8 search it, both through integer node ids.
+# WeightedCSRGraph also keeps the Task 6 co-occurrence count of each edge, and can be saved to a binary file.
+# Components labels the connected components of a graph and tells which are bipartite, to prune Task 7 and 8 queries.
+
+import json
+import sys
+from array import array
+from typing import Dict, Iterable, List, Tuple
+from Utilities.profiling import profiled
+
+
+class CSRGraph:
+    """
+    Undirected graph in compressed sparse row (CSR) form.
+    Nodes are integer ids into a sorted names table, and the neighbors of node i are
+    targets[offsets[i]:offsets[i + 1]], in increasing id order.
+    """
+
+    def __init__(self, names: List[str], offsets: array, targets: array):
+        self.names = names  # {node id -> person name}
+        self.index: Dict[str, int] = {name: i for i, name in enumerate(names)}  # {person name -> node id}
+        self.offsets = offsets  # len(names) + 1 positions into targets
+        self.targets = targets  # Concatenated neighbor lists, each edge appears once per endpoint
+        self.make_views()
+
+    def make_views(self):
+        """ Read-only views of the arrays, whose slices share the memory of the arrays instead of copying it. """
+        self.target_view = memoryview(self.targets).toreadonly()
+
+    def __getstate__(self) -> Dict:
+        return {key: value for key, value in self.__dict__.items() if not isinstance(value, memoryview)}
+
+    def __setstate__(self, state: Dict):
+        self.__dict__.update(state)
+        self.make_views()
+
+    @classmethod
+    @profiled(count=len)
+    def from_edges(cls, edges: Iterable[Tuple[str, str]]) -> "CSRGraph":
+        """
+        Build the graph from undirected edges between named nodes. Self loops and duplicate edges are dropped.
+        Only nodes with at least one edge are part of the graph.
+        :param edges: Pairs of node names.
+        :return: The CSR graph.
+        """
+        edge_set = {tuple(sorted(edge)) for edge in edges if edge[0] != edge[1]}
+        names = sorted({name for edge in edge_set for name in edge})
+        index = {name: i for i, name in enumerate(names)}
+
+        neighbors = [[] for _ in names]
+        for name1, name2 in edge_set:
+            neighbors[index[name1]].append(index[name2])
+            neighbors[index[name2]].append(index[name1])
+
+        offsets = array('I', [0])
+        targets = array('I')
+        for node_neighbors in neighbors:
+            targets.extend(sorted(node_neighbors))
+            offsets.append(len(targets))
+
+        return cls(names, offsets, targets)
+
+    @classmethod
+    def from_pair_matches(cls, pair_matches: List[List[List[str]]]) -> "CSRGraph":
+        """
+        Build the graph from Task 6 "Pair Matches", where each name is a list of words.
+        :param pair_matches: List of [person1, person2] pairs.
+        :return: The CSR graph.
+        """
+        return cls.from_edges((" ".join(pair[0]), " ".join(pair[1])) for pair in pair_matches)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.index
+
+    def neighbors(self, node: int) -> memoryview:
+        """ The neighbor ids of a node id, without copying them (the searches call this for every node they visit). """
+        return self.target_view[self.offsets[node]:self.offsets[node + 1]]
+
+    def degree(self, node: int) -> int:
+        """ The number of neighbors of a node id. """
+        return self.offsets[node + 1] - self.offsets[node]
+
+    def edges(self) -> List[Tuple[int, int]]:
+        """ Each undirected edge once, as (smaller id, larger id). """
+        return [(node, neighbor) for node in range(len(self.names))
+                for neighbor in self.neighbors(node) if node < neighbor]
+
+
+class WeightedCSRGraph(CSRGraph):
+    """
+    CSRGraph whose edges carry a count, weights[j] being the weight of the edge to targets[j].
+    Task 6 keeps its co-occurrence counts in this form, so that any threshold, the strongest neighbors of a person
+    or a weighted traversal can be computed from the counts, saved once, without reading the corpus again.
+    """
+
+    def __init__(self, names: List[str], offsets: array, targets: array, weights: array, info: Dict = None):
+        self.weights = weights  # Unsigned 32-bit weight of each entry of targets
+        self.info = info or {}  # Properties of the counts (e.g. the Task 6 window size), saved with them
+        super().__init__(names, offsets, targets)
+
+    def make_views(self):
+        super().make_views()
+        self.weight_view = memoryview(self.weights).toreadonly()
+
+    @classmethod
+    @profiled(count=len)
+    def from_counts(cls, counts: Dict[Tuple[str, str], int], info: Dict = None) -> "WeightedCSRGraph":
+        """
+        Build the graph from weighted undirected edges, {(name1, name2) -> weight}, each pair given once.
+        Self loops and edges of weight 0 are dropped.
+        """
+        counts = {pair: count for pair, count in counts.items() if count > 0 and pair[0] != pair[1]}
+        names = sorted({name for pair in counts for name in pair})
+        index = {name: i for i, name in enumerate(names)}
+
+        neighbors = [[] for _ in names]
+        for (name1, name2), count in counts.items():
+            neighbors[index[name1]].append((index[name2], count))
+            neighbors[index[name2]].append((index[name1], count))
+
+        offsets = array('I', [0])
+        targets = array('I')
+        weights = array('I')
+        for node_neighbors in neighbors:
+            node_neighbors.sort()
+            targets.extend(neighbor for neighbor, _ in node_neighbors)
+            weights.extend(count for _, count in node_neighbors)
+            offsets.append(len(targets))
+
+        return cls(names, offsets, targets, weights, info)
+
+    def neighbor_weights(self, node: int) -> memoryview:
+        """ The weights of the edges to the neighbors of a node id, in the order of neighbors(node). """
+        return self.weight_view[self.offsets[node]:self.offsets[node + 1]]
+
+    def weighted_edges(self) -> List[Tuple[str, str, int]]:
+        """ Each undirected edge once, as (smaller name, larger name, weight). """
+        return [(self.names[node], self.names[neighbor], weight) for node in range(len(self.names))
+                for neighbor, weight in zip(self.neighbors(node), self.neighbor_weights(node)) if node < neighbor]
+
+    def edges_at_least(self, threshold: int) -> List[Tuple[str, str]]:
+        """ The edges of weight at least threshold, as (smaller name, larger name). """
+        return [(name1, name2) for name1, name2, weight in self.weighted_edges() if weight >= threshold]
+
+    def top_neighbors(self, node: int, count: int) -> List[Tuple[int, int]]:
+        """ The count neighbors of a node id with the largest weights, as (neighbor id, weight), heaviest first. """
+        pairs = zip(self.neighbors(node), self.neighbor_weights(node))
+        return sorted(pairs, key=lambda pair: -pair[1])[:count]  # Stable: equal weights by neighbor id
+
+    def save(self, path: str):
+        """
+        Persist the graph to a binary file: a JSON header line followed by the raw offsets, targets and weights.
+        :param path: Path of the file to write.
+        """
+        header = {"names": self.names, "info": self.info, "edges": len(self.targets), "byteorder": sys.byteorder}
+        with open(path, "wb") as file:
+            file.write(json.dumps(header).encode() + b"\n")
+            for values in (self.offsets, self.targets, self.weights):
+                values.tofile(file)
+
+    @classmethod
+    def load(cls, path: str) -> "WeightedCSRGraph":
+        """ Load a graph saved by `save`. Raises OSError, EOFError, ValueError or KeyError if it cannot be read. """
+        with open(path, "rb") as file:
+            header = json.loads(file.readline())
+            arrays = []
+            for length in (len(header["names"]) + 1, header["edges"], header["edges"]):
+                values = array('I')
+                values.fromfile(file, length)  # EOFError if the file is truncated
+                arrays.append(values)
+        if header["byteorder"] != sys.byteorder:
+            for values in arrays:
+                values.byteswap()
+        return cls(header["names"], *arrays, header["info"])
+
+
+class Components:
+    """
+    The connected components of a CSRGraph, labelled with union-find over its edges.
+    The union-find also keeps the parity of the path from each node to the root of its set, which tells whether each
+    component is bipartite: an edge between two nodes of the same parity closes an odd cycle. In a bipartite
+    component, every path between two nodes has the parity of their colors.
+    """
+
+    @profiled()
+    def __init__(self, graph: CSRGraph):
+        self.graph = graph
+        size = len(graph)
+        parent = list(range(size))
+        parity = bytearray(size)  # Parity of the path from each node to its parent
+        set_sizes = [1] * size
+        odd_cycle = bytearray(size)  # Whether the set of each root holds an odd cycle
+
+        def find(node: int) -> Tuple[int, int]:
+            """ The root of the set of a node and the parity of the path to it, compressing the path. """
+            path = []
+            while parent[node] != node:
+                path.append(node)
+                node = parent[node]
+            root, root_parity = node, 0
+            for node in reversed(path):  # Nearest to the root first
+                root_parity ^= parity[node]
+                parent[node], parity[node] = root, root_parity
+            return root, parity[path[0]] if path else 0
+
+        for node1, node2 in graph.edges():
+            root1, parity1 = find(node1)
+            root2, parity2 = find(node2)
+            if root1 == root2:
+                if parity1 == parity2:
+                    odd_cycle[root1] = 1
+                continue
+            if set_sizes[root1] < set_sizes[root2]:
+                root1, root2 = root2, root1
+            parent[root2], parity[root2] = root1, parity1 ^ parity2 ^ 1  # The edge joins nodes of opposite parities
+            set_sizes[root1] += set_sizes[root2]
+            odd_cycle[root1] |= odd_cycle[root2]
+
+        labels = {}  # {root -> component id}, in order of the smallest node of each component
+        self.labels = array('I', bytes(4 * size))  # {node id -> component id}
+        self.colors = bytearray(size)  # {node id -> parity of the path to the root of its component}
+        for node in range(size):
+            root, self.colors[node] = find(node)
+            self.labels[node] = labels.setdefault(root, len(labels))
+        self.count = len(labels)
+        self.sizes = array('I', bytes(4 * self.count))  # {component id -> number of nodes}
+        self.bipartite = bytearray(self.count)  # {component id -> whether the component has no odd cycle}
+        for root, component in labels.items():
+            self.sizes[component] = set_sizes[root]
+            self.bipartite[component] = not odd_cycle[root]
+
+    def connected(self, node1: int, node2: int) -> bool:
+        """ Whether two node ids are in the same component. """
+        return self.labels[node1] == self.labels[node2]
+
+    def parity_allows(self, node1: int, node2: int, length: int) -> bool:
+        """ Whether a path of the given length may join two node ids of the same component, judging by parity. """
+        return not self.bipartite[self.labels[node1]] or (self.colors[node1] ^ self.colors[node2]) == length % 2
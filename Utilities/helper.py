@@ -3,13 +3,15 @@
 
 from typing import List, Dict, Any
 from collections import defaultdict
-import json
 import os
 import sys
-from task_implementation.Task_1_Preprocessing import Preprocessing
+from Utilities.cache import cached
+from Utilities.profiling import profiled
+from Utilities.serialization import PREPROCESSED_SCHEMA, load_json
 
 
 # Used in Tasks: 2, 3, 4, 5, 6, 9
+@profiled(count=lambda data: len(data.get("Processed Sentences", [])))
 def preprocess_init(preprocess_path: str = None,
                     sentences_path: str = None,
                     people_path: str = None,
@@ -22,6 +24,18 @@ def preprocess_init(preprocess_path: str = None,
     :param stopwords_path: Path to the stopwords CSV file.
     :return: a list containing processed sentences and/or processed names.
     """
+    # Reuse the result of an earlier run on the same files when the artifact cache is enabled
+    return cached("preprocess", [preprocess_path, sentences_path, people_path, stopwords_path], {},
+                  lambda: load_or_preprocess(preprocess_path, sentences_path, people_path, stopwords_path))
+
+
+def load_or_preprocess(preprocess_path: str = None,
+                       sentences_path: str = None,
+                       people_path: str = None,
+                       stopwords_path: str = None) -> dict[str, list[list[str]] | list[list[list[str]]]]:
+    """
+    Load the preprocessed JSON file, or preprocess the raw files (see preprocess_init).
+    """
 
     # Load from preprocessed JSON if provided
     if preprocess_path:
@@ -30,8 +44,8 @@ def preprocess_init(preprocess_path: str = None,
             print(f"Error: The preprocessed file at {preprocess_path} is missing or empty.")
             sys.exit(1)
         try:
-            with open(preprocess_path, "r") as file:
-                preprocess = json.load(file)
+            with open(preprocess_path, "rb") as file:
+                preprocess = load_json(file, PREPROCESSED_SCHEMA)
                 return {
                     "Processed Sentences": preprocess.get("Question 1", {}).get("Processed Sentences", []),
                     "Processed Names": preprocess.get("Question 1", {}).get("Processed Names", [])
@@ -40,7 +54,8 @@ def preprocess_init(preprocess_path: str = None,
             print(f"Error loading preprocessed file: {e}")
             sys.exit(1)
 
-    # Preprocess from raw data using Preprocessing class
+    # Preprocess from raw data using Preprocessing class, only imported then (tasks usually start from its JSON)
+    from task_implementation.Task_1_Preprocessing import Preprocessing
     preprocessor = Preprocessing(sentences_path=sentences_path,
                                  people_path=people_path,
                                  stopwords_path=stopwords_path)
@@ -55,6 +70,7 @@ def preprocess_init(preprocess_path: str = None,
 
 
 # Used in Task 4, 5 and 9
+@profiled(count=len)
 def map_n_grams(sentences: List[List[str]], N: int or None) -> defaultdict[Any, set]:
     """
     Map n-grams (word sequences) to the sentences they appear in.
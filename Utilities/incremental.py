@@ -0,0 +1,290 @@
+# Description: Incremental corpus, updated with new sentences instead of being rebuilt.
+# The corpus keeps the processed sentences together with the structures derived from them: the Task 2 sequence
+# counts, the Task 4 search postings, the Task 6 mention table and co-occurrence counts. Appending sentences
+# only processes the new rows of the sentences file and the co-occurrence windows that touch them, so an update
+# costs time proportional to the new data.
+# The state file saved between runs is a pickled snapshot of the corpus followed by one record per update, holding
+# the new processed sentences and their mentions, so saving an update only writes the new data. Loading is still
+# proportional to the whole corpus: every structure is unpickled, then the records are replayed (without the mention
+# search). Once the records would outweigh the snapshot, a new snapshot is written instead, which keeps the replay
+# shorter than the snapshot and the bytes written per update proportional to its data, amortized.
+
+import csv
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+from typing import Dict, Any, List
+from task_implementation.Task_1_Preprocessing import Preprocessing, check_file_validity, clean_text
+from task_implementation.Task_2_Counting_Seq import add_sequence_counts, format_sequence_counts
+from task_implementation.Task_4_Search_Engine import SearchEngine
+from task_implementation.Task_6_Direct_Connections import PersonGraph, count_co_occurrences, find_mentions
+from Utilities.postings import PostingsIndex
+from Utilities.raw_text import read_records
+
+STATE_VERSION = 7  # Bump when the layout of the saved state changes
+
+
+def file_digest(path: str or None) -> str or None:
+    """ Hash the content of a file, None if no file is given. """
+    if not path:
+        return None
+    with open(path, "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+class IncrementalCorpus:
+    """ A growing sentences file and the structures derived from it, updated in place. """
+
+    def __init__(
+            self,
+            sentences_path: str,
+            people_path: str = None,
+            stopwords_path: str = None,
+            N: int = None,
+            window_size: int = None
+    ):
+        """
+        Initialize the IncrementalCorpus class, with no sentences read yet (see update).
+
+        :param sentences_path: Path to the sentences CSV file, which new rows are appended to.
+        :param people_path: Path to the people CSV file, needed for the mention table and co-occurrences (optional).
+        :param stopwords_path: Path to the stopwords file.
+        :param N: Maximum size of the sequences to count, no counts are kept if None (optional).
+        :param window_size: Size of the co-occurrence windows, no co-occurrences are kept if None (optional).
+        """
+        if not sentences_path or not stopwords_path:
+            print("Error: A sentences file and a stopwords file must be provided to build an incremental corpus.")
+            sys.exit(1)
+        if N is not None and N < 1:
+            print("Error: N value must be greater than 0.")
+            sys.exit(1)
+        if window_size is not None and window_size < 0:
+            print("Error: Window size (K) must be non-negative.")
+            sys.exit(1)
+        check_file_validity("sentences_path", sentences_path)
+
+        self.version = STATE_VERSION
+        self.sentences_path = sentences_path
+        self.people_path = people_path
+        self.stopwords_path = stopwords_path
+        self.N = N
+        self.window_size = window_size
+
+        # People and stopwords are fixed, a change in them requires rebuilding the corpus
+        preprocessor = Preprocessing(people_path=people_path, stopwords_path=stopwords_path)
+        self.stopwords = preprocessor.stopwords
+        self.processed_people = preprocessor.preprocess_people() if people_path else []
+        self.input_digests = {"people": file_digest(people_path), "stopwords": file_digest(stopwords_path)}
+        self.graph = PersonGraph(threshold=0)  # Only the nodes are used, to find mentions
+        self.graph.add_people(self.processed_people)
+
+        self.offset = 0  # Bytes of the sentences file already read, up to the end of a complete record
+        self.processed_sentences: List[List[str]] = []
+        self.sequence_counts: Dict[str, Dict[tuple, int]] = {}  # {"<size>_seq" -> {sequence -> count}}
+        self.postings = PostingsIndex()  # {n-gram -> sentences containing it}, the Task 4 index
+        self.people_in_sentences: List[List[str]] = []  # The mention table
+        self.co_occurrence_counts: Dict[tuple, int] = {}  # {(person1, person2) -> number of shared windows}
+
+        # The state file this corpus was loaded from or saved to, see save()
+        self.state_path = None
+        self.state_bytes = 0  # Its size, up to the end of its last update record
+        self.snapshot_bytes = 0  # The size of its snapshot, before the update records
+        self.saved_sentences = 0  # The number of sentences it holds
+        self.saved_offset = 0  # The offset it holds
+
+    def read_new_rows(self) -> List[str]:
+        """
+        Read the rows appended to the sentences file since the last read.
+        A record is only read once it is terminated by a line break, so a record being written (even in the middle
+        of a quoted line break) is read by the next update.
+        :return: The raw sentences of the new rows.
+        """
+        rows = []
+        offset = self.offset
+        try:
+            if os.path.getsize(self.sentences_path) < self.offset:
+                print(f"Error: The sentences file at {self.sentences_path} shrank since the last update. "
+                      f"Rebuild the incremental corpus.")
+                sys.exit(1)
+            for row, _, end in read_records(self.sentences_path, start=self.offset, complete_only=True):
+                if 'sentence' not in row:
+                    print(f"Error: The sentences file at {self.sentences_path} has no 'sentence' column.")
+                    sys.exit(1)
+                rows.append(row['sentence'] or "")  # A short row has no sentence, skipped as empty
+                offset = end
+        except (OSError, UnicodeDecodeError, csv.Error) as e:
+            print(f"Error loading sentences file: {e}")
+            sys.exit(1)
+
+        self.offset = offset  # The end of the last complete record
+        return rows
+
+    def append_rows(self, rows: List[str]) -> int:
+        """
+        Preprocess raw sentences and append them to the corpus.
+        :param rows: The raw sentences, as in the sentences file.
+        :return: The number of appended sentences (empty sentences are skipped, as in Task 1).
+        """
+        sentences = []
+        for row in rows:
+            sentence = clean_text(row, self.stopwords)
+            if sentence:  # Skip empty sentences
+                sentences.append(sentence.split())
+        self.append_sentences(sentences)
+        return len(sentences)
+
+    def append_sentences(self, sentences: List[List[str]], mentions: List[List[str]] = None):
+        """
+        Append processed sentences and extend every derived structure with them.
+        :param sentences: The processed sentences.
+        :param mentions: The people mentioned in each of them, found with find_mentions if None (optional).
+        """
+        first_new = len(self.processed_sentences)
+        self.processed_sentences.extend(sentences)
+
+        if self.N:
+            add_sequence_counts(self.sequence_counts, sentences, self.N)
+
+        for sentence in sentences:
+            self.postings.add_sentence(sentence)  # Postings are compacted when the state is saved
+
+        if self.processed_people:
+            self.people_in_sentences.extend(find_mentions(self.graph.nodes, sentences) if mentions is None
+                                            else mentions)
+            if self.window_size:
+                # Windows ending before the new sentences were counted already
+                count_co_occurrences(self.co_occurrence_counts, self.people_in_sentences, self.window_size,
+                                     first_window=max(0, first_new - self.window_size + 1))
+
+    def update(self) -> int:
+        """
+        Append the new rows of the sentences file.
+        :return: The number of appended sentences.
+        """
+        return self.append_rows(self.read_new_rows())
+
+    def data(self) -> Dict[str, Any]:
+        """ The corpus in the format of preprocess_init, usable by every task. """
+        return {"Processed Sentences": self.processed_sentences, "Processed Names": self.processed_people}
+
+    def sequence_count_results(self, question_num: int = 2) -> Dict[str, Any]:
+        """ The Task 2 results, from the maintained sequence counts. """
+        if not self.N:
+            print("Error: The incremental corpus was built without --maxk, it keeps no sequence counts.")
+            sys.exit(1)
+        return {
+            f"Question {question_num}": {
+                f"{self.N}-Seq Counts": format_sequence_counts(self.sequence_counts, self.N)
+            }
+        }
+
+    def search_results(self, k_seq_path: str, question_num: int = 4) -> Dict[str, Any]:
+        """ The Task 4 results for the queries of the K-seq JSON file, from the maintained postings. """
+        search_engine = SearchEngine(question_num=question_num, k_seq_path=k_seq_path, data=self.data())
+        search_engine.sentence_index = self.postings
+        return search_engine.generate_results()
+
+    def pair_match_results(self, threshold: int, question_num: int = 6) -> Dict[str, Any]:
+        """ The Task 6 results for the given threshold, from the maintained co-occurrence counts. """
+        if not self.processed_people or self.window_size is None:
+            print("Error: The incremental corpus was built without a names file or --windowsize, "
+                  "it keeps no co-occurrence counts.")
+            sys.exit(1)
+        if threshold is None or threshold < 0:
+            print("Error: Threshold (T) must be provided and non-negative.")
+            sys.exit(1)
+
+        pair_matches = []
+        # Same edge cases as Task 6: no edges if window size is 0 or threshold is greater than the number of sentences
+        if self.window_size and not (threshold > len(self.processed_sentences) and self.window_size > 1):
+            pair_matches = sorted([person1.split(), person2.split()]
+                                  for (person1, person2), count in self.co_occurrence_counts.items()
+                                  if count >= threshold)
+        return {
+            f"Question {question_num}": {
+                "Pair Matches": pair_matches
+            }
+        }
+
+    def save(self, state_path: str):
+        """
+        Save the corpus. The sentences appended since it was loaded from (or saved to) this state file are appended
+        to it as an update record, unless the records would outweigh the snapshot or the file changed meanwhile.
+        :param state_path: Path of the state file.
+        """
+        state_path = os.path.abspath(state_path)
+        if self.offset == self.saved_offset and len(self.processed_sentences) == self.saved_sentences \
+                and state_path == self.state_path:
+            return  # Nothing new to save
+        record = pickle.dumps((self.offset, self.processed_sentences[self.saved_sentences:],
+                               self.people_in_sentences[self.saved_sentences:]), protocol=pickle.HIGHEST_PROTOCOL)
+        try:
+            unchanged = os.path.getsize(state_path) == self.state_bytes
+        except OSError:
+            unchanged = False
+        if state_path != self.state_path or not unchanged \
+                or self.state_bytes - self.snapshot_bytes + len(record) > self.snapshot_bytes:
+            self.save_snapshot(state_path)
+            return
+        # A record cut by an interrupted update is dropped when loading, its rows are then read again
+        with open(state_path, "ab") as file:
+            file.write(record)
+        self.state_bytes += len(record)
+        self.saved_sentences, self.saved_offset = len(self.processed_sentences), self.offset
+
+    def save_snapshot(self, state_path: str):
+        """ Save the whole corpus atomically, so an interrupted update leaves the previous state intact. """
+        directory = os.path.dirname(state_path)
+        file_descriptor, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(file_descriptor, "wb") as file:
+                pickle.dump(self, file, protocol=pickle.HIGHEST_PROTOCOL)
+                size = file.tell()
+            os.replace(temp_path, state_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        self.state_path, self.state_bytes, self.snapshot_bytes = state_path, size, size
+        self.saved_sentences, self.saved_offset = len(self.processed_sentences), self.offset
+
+    @classmethod
+    def load(cls, state_path: str) -> "IncrementalCorpus":
+        """
+        Load a saved corpus and replay its update records, checking that its people and stopwords files did not change.
+        The state file must only be writable by trusted users, since it is unpickled.
+        """
+        records = []
+        try:
+            with open(state_path, "rb") as file:
+                corpus = pickle.load(file)
+                snapshot_bytes = state_bytes = file.tell()
+                while True:
+                    try:
+                        records.append(pickle.load(file))
+                    except Exception:
+                        break  # The end of the file, or a last record cut by an interrupted update
+                    state_bytes = file.tell()
+        except Exception as e:
+            print(f"Error loading incremental corpus state: {e}")
+            sys.exit(1)
+        if not isinstance(corpus, cls) or getattr(corpus, "version", None) != STATE_VERSION:
+            print(f"Error: {state_path} is not an incremental corpus state of this version. Rebuild it.")
+            sys.exit(1)
+        try:
+            digests = {"people": file_digest(corpus.people_path), "stopwords": file_digest(corpus.stopwords_path)}
+        except OSError as e:
+            print(f"Error: Could not read the files of the incremental corpus: {e}")
+            sys.exit(1)
+        if digests != corpus.input_digests:
+            print("Error: The people or stopwords file changed since the incremental corpus was built. Rebuild it.")
+            sys.exit(1)
+
+        for offset, sentences, mentions in records:
+            corpus.append_sentences(sentences, mentions)
+            corpus.offset = offset
+        corpus.state_path = os.path.abspath(state_path)
+        corpus.state_bytes, corpus.snapshot_bytes = state_bytes, snapshot_bytes
+        corpus.saved_sentences, corpus.saved_offset = len(corpus.processed_sentences), corpus.offset
+        return corpus
@@ -0,0 +1,166 @@
+# Description: Streaming writer of the task results.
+# The results are written piece by piece instead of being converted to one JSON string first, so the output of
+# large tasks never exists twice in memory. The indented output is byte for byte the output of
+# json.dumps(result, indent=4); a compact form and an NDJSON form (one JSON object per line) are also available.
+
+import json
+import sys
+from typing import Dict, Any, TextIO
+from Utilities.serialization import dumps_json
+
+BUFFER_CHARS = 1 << 16  # Characters collected before each write to the file
+
+
+class ResultWriter:
+    """ Writes the results of one or more tasks as a single JSON object, or as NDJSON lines. """
+
+    def __init__(self, file: TextIO, indent: int or None = 4, ndjson: bool = False):
+        """
+        Initialize the ResultWriter class.
+        :param file: The text file to write to.
+        :param indent: The indentation of the JSON output, None for compact output.
+        :param ndjson: Write one compact JSON object per line instead of a single JSON object. Each line holds
+        a single element of a result list, as {"Question N": {"<field>": [element]}}, so concatenating the
+        lists of all the lines of a field gives the field of the JSON output back. Empty lists get one line.
+        """
+        self.file = file
+        self.indent = None if ndjson else indent
+        self.ndjson = ndjson
+        self.buffer = []
+        self.buffered = 0  # Characters in the buffer
+        self.entries = 0  # Top level entries written so far
+        self.closed = False
+
+    def emit(self, text: str):
+        """ Buffer text, writing the buffer to the file once it is large enough. """
+        self.buffer.append(text)
+        self.buffered += len(text)
+        if self.buffered >= BUFFER_CHARS:
+            self.flush()
+
+    def flush(self):
+        self.file.write("".join(self.buffer))
+        self.buffer = []
+        self.buffered = 0
+
+    def encode_leaf(self, value: Any, level: int) -> str:
+        """ Encode a value that holds no nested list or dictionary, in one call to json. """
+        if self.indent is None:
+            return dumps_json(value)
+        text = json.dumps(value, indent=self.indent)
+        return text.replace("\n", "\n" + " " * (self.indent * level)) if level else text
+
+    def stream(self, value: Any, level: int):
+        """ Write a value nested at the given level, recursing into lists and dictionaries that hold containers. """
+        if isinstance(value, dict):
+            items = value.items()
+            is_leaf = not any(isinstance(item, (list, tuple, dict)) for item in value.values())
+        elif isinstance(value, (list, tuple)):
+            items = value
+            is_leaf = not any(isinstance(item, (list, tuple, dict)) for item in value)
+        else:
+            is_leaf = True
+        if is_leaf or not value:
+            self.emit(self.encode_leaf(value, level))
+            return
+
+        is_dict = isinstance(value, dict)
+        self.emit("{" if is_dict else "[")
+        for i, item in enumerate(items):
+            self.emit(self.separator(i, level + 1))
+            if is_dict:
+                key, item = item
+                self.emit(json.dumps(str(key)) + (": " if self.indent is not None else ":"))
+            self.stream(item, level + 1)
+        self.emit(self.separator(None, level))
+        self.emit("}" if is_dict else "]")
+
+    def separator(self, position: int or None, level: int) -> str:
+        """ The text before an item at position (or before the closing bracket if position is None). """
+        comma = "," if position else ""
+        if self.indent is None:
+            return comma
+        return comma + "\n" + " " * (self.indent * level)
+
+    def write(self, result: Dict[str, Any]):
+        """
+        Write the results of a task, {"Question N": {...}}, as entries of the output object.
+        :param result: The task results.
+        """
+        if self.ndjson:
+            for question, fields in result.items():
+                self.write_lines(question, fields)
+            return
+
+        for key, value in result.items():
+            opening = "{" if self.entries == 0 else ""
+            self.emit(opening + self.separator(self.entries, 1))
+            self.emit(json.dumps(str(key)) + (": " if self.indent is not None else ":"))
+            self.stream(value, 1)
+            self.entries += 1
+
+    def write_lines(self, question: str, fields: Any):
+        """ Write the NDJSON lines of a single question. """
+        if not isinstance(fields, dict):
+            self.emit(dumps_json({question: fields}) + "\n")
+            return
+        for field, value in fields.items():
+            if isinstance(value, list) and value:
+                for element in value:
+                    self.emit(dumps_json({question: {field: [element]}}) + "\n")
+            else:
+                self.emit(dumps_json({question: {field: value}}) + "\n")
+
+    def close(self):
+        """ Finish the output object and flush everything to the file. """
+        if self.closed:
+            return
+        self.closed = True
+        if not self.ndjson:
+            if self.entries == 0:
+                self.emit("{}")
+            else:
+                self.emit(self.separator(None, 0) + "}")
+            self.emit("\n")
+        self.flush()
+        self.file.flush()
+
+    def __enter__(self) -> "ResultWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class OutputFile:
+    """ Opens the output file of the results (or standard output), and its ResultWriter. """
+
+    def __init__(self, path: str = None, compact: bool = False, ndjson: bool = False):
+        """
+        Initialize the OutputFile class.
+        :param path: Path of the output file, None for standard output.
+        :param compact: Write compact JSON instead of indented JSON.
+        :param ndjson: Write NDJSON lines, see ResultWriter.
+        """
+        self.path = path
+        self.compact = compact
+        self.ndjson = ndjson
+        self.file = None
+        self.writer = None
+
+    def __enter__(self) -> ResultWriter:
+        try:
+            self.file = open(self.path, "w") if self.path else sys.stdout
+        except OSError as e:
+            print(f"Error: Could not open the output file: {e}")
+            sys.exit(1)
+        self.writer = ResultWriter(self.file, indent=None if self.compact else 4, ndjson=self.ndjson)
+        return self.writer
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.writer.close()
+        if self.file is not sys.stdout:
+            self.file.close()
+        else:
+            self.file.flush()
@@ -0,0 +1,187 @@
+# Description: Runs several tasks in a single process.
+# The tasks are resolved into a dependency DAG of shared stages (preprocessing, then the Task 6 graph),
+# every stage is computed once in memory, and the results of all the requested tasks are merged.
+# Every task is created (checking its inputs) before the first result is written, so that a bad input of a later
+# task stops the run before any output, instead of leaving a truncated JSON object.
+
+import sys
+from argparse import Namespace
+from typing import Callable, Dict, Any, Iterator, List
+from Utilities.helper import preprocess_init
+from Utilities.raw_text import OFFSETS_SUFFIX, RawSentences
+from task_implementation.Task_2_Counting_Seq import SequenceCounter
+from task_implementation.Task_3_Counting_Person import PersonMentionCounter
+from task_implementation.Task_4_Search_Engine import SearchEngine
+from task_implementation.Task_5_Contexts import PersonContexts
+from task_implementation.Task_6_Direct_Connections import DirectConnections
+from task_implementation.Task_7_8_Indirect_Connections import IndirectPaths
+from task_implementation.Task_9_Grouping_Sentences import SentenceClustering
+
+# Stages each stage depends on
+STAGE_DEPENDENCIES = {
+    "preprocess": [],
+    "graph": ["preprocess"],
+}
+
+# Stages each task consumes
+TASK_DEPENDENCIES = {
+    1: ["preprocess"],
+    2: ["preprocess"],
+    3: ["preprocess"],
+    4: ["preprocess"],
+    5: ["preprocess"],
+    6: ["graph"],
+    7: ["graph"],
+    8: ["graph"],
+    9: ["preprocess"],
+}
+
+# Options of a single task, which the tasks run together do not support: {option -> its default}
+SINGLE_TASK_OPTIONS = {
+    "all_pairs": False,
+    "top_neighbors": None,
+    "counts": None,
+    "save_counts": False,
+    "raw_offsets": False,
+    "shards": None,
+    "shard_count": 1,
+    "shard_processes": False,
+}
+
+
+def parse_tasks(tasks: str) -> List[int]:
+    """
+    Parse a comma separated list of task numbers, e.g. "2,3,5,6,7".
+    :param tasks: The task list from the command line.
+    :return: The task numbers, without duplicates and in ascending order.
+    """
+    try:
+        task_numbers = sorted({int(task) for task in tasks.split(",") if task.strip()})
+    except ValueError:
+        print("Error: --tasks must be a comma separated list of task numbers, e.g. 2,3,5,6,7.")
+        sys.exit(1)
+    if not task_numbers or any(task not in TASK_DEPENDENCIES for task in task_numbers):
+        print("Invalid task number. Please specify tasks between 1 and 9.")
+        sys.exit(1)
+    return task_numbers
+
+
+def plan_stages(tasks: List[int]) -> List[str]:
+    """
+    Resolve the stages needed by the tasks, in dependency order.
+    :param tasks: The task numbers to run.
+    :return: The stage names, each stage after the stages it depends on.
+    """
+    ordered = []
+
+    def visit(stage: str):
+        if stage not in ordered:
+            for dependency in STAGE_DEPENDENCIES[stage]:
+                visit(dependency)
+            ordered.append(stage)
+
+    for task in tasks:
+        for stage in TASK_DEPENDENCIES[task]:
+            visit(stage)
+    return ordered
+
+
+class Pipeline:
+    """ Runs a list of tasks in one process, sharing the intermediate results between them. """
+
+    def __init__(self, tasks: List[int], args: Namespace):
+        """
+        Initialize the Pipeline class.
+        :param tasks: The task numbers to run.
+        :param args: The command line arguments, shared by all the tasks.
+        """
+        unsupported = [f"--{option}" for option, default in SINGLE_TASK_OPTIONS.items()
+                       if getattr(args, option, default) != default]
+        if unsupported:
+            print(f"Error: {', '.join(unsupported)} cannot be used with --tasks, run the task alone with -t.")
+            sys.exit(1)
+        self.tasks = tasks
+        self.args = args
+        self.stages: Dict[str, Any] = {}  # {stage name -> computed intermediate}
+        self.task_runs = None  # The function computing the results of each task, see prepare()
+
+    def run_stage(self, stage: str):
+        """ Compute a stage, assuming the stages it depends on were computed already. """
+        args = self.args
+        if stage == "preprocess":
+            self.stages[stage] = preprocess_init(args.preprocessed, args.sentences, args.names, args.removewords)
+        elif stage == "graph":
+            direct_connections = DirectConnections(question_num=6,
+                                                   window_size=args.windowsize,
+                                                   threshold=args.threshold,
+                                                   data=self.stages["preprocess"])
+            direct_connections.build_graph()
+            self.stages[stage] = direct_connections
+
+    def prepare_task(self, task: int) -> Callable[[], Dict[str, Any]]:
+        """
+        Create a single task on the shared stages, which checks its parameters and reads its input files.
+        :return: The function computing the results of the task.
+        """
+        args = self.args
+        data = self.stages.get("preprocess")
+
+        if task == 1:
+            # The preprocessing stage already holds the Task 1 results
+            return lambda: {f"Question {task}": {"Processed Sentences": data.get("Processed Sentences", []),
+                                                 "Processed Names": data.get("Processed Names", [])}}
+        if task == 2:
+            return SequenceCounter(question_num=task, N=args.maxk, data=data).generate_results
+        if task == 3:
+            return PersonMentionCounter(question_num=task, data=data).generate_results
+        if task == 4:
+            raw_offsets_path = None
+            if args.raw_text:
+                if not args.preprocessed:
+                    print("Error: --raw_text needs the preprocessed file (-p) written by Task 1 with --raw_offsets.")
+                    sys.exit(1)
+                raw_offsets_path = args.preprocessed + OFFSETS_SUFFIX
+                RawSentences(raw_offsets_path).close()  # Stops now if the offsets file is missing or stale
+            return SearchEngine(question_num=task, k_seq_path=args.qsek_query_path, data=data,
+                                top_k=args.top_k, raw_offsets_path=raw_offsets_path).generate_results
+        if task == 5:
+            return PersonContexts(question_num=task, N=args.maxk, data=data).generate_results
+        if task == 6:
+            return self.stages["graph"].generate_results
+        if task in (7, 8):
+            indirect_paths = IndirectPaths(question_num=task,
+                                           people_connections_path=args.pairs,
+                                           maximal_distance=args.maximal_distance,
+                                           K=args.fixed_length,
+                                           walks=args.walks,
+                                           direct_connections=self.stages["graph"])
+            if task == 7:
+                return indirect_paths.generate_results_task_7
+            return indirect_paths.generate_results_task_8
+        return SentenceClustering(question_num=task, threshold=args.threshold, data=data).generate_results
+
+    def prepare(self):
+        """ Compute every stage once, then create every task, so that a bad input stops the run before any output. """
+        for stage in plan_stages(self.tasks):
+            self.run_stage(stage)
+        self.task_runs = [self.prepare_task(task) for task in self.tasks]
+
+    def results(self) -> Iterator[Dict[str, Any]]:
+        """
+        Prepare the tasks (unless prepare() was called already), then run them one by one.
+        :return: The results of each task, as soon as the task finishes.
+        """
+        if self.task_runs is None:
+            self.prepare()
+        for task_run in self.task_runs:
+            yield task_run()
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Compute every stage once, then run all the tasks.
+        :return: The results of all the tasks, merged into one dictionary.
+        """
+        results = {}
+        for task_result in self.results():
+            results.update(task_result)
+        return results
@@ -0,0 +1,500 @@
+# Description: Compressed postings index of the Task 4 search engine.
+# Every distinct sentence gets an integer id (in order of first appearance) and each n-gram maps to the increasing
+# ids of the sentences containing it. A posting of a single sentence is stored as the id itself; longer postings
+# are PostingList objects holding the gaps between consecutive ids as varints (7 bits per byte, the high bit set on
+# every byte but the last of a number), with a skip pointer every SKIP_INTERVAL ids so that a search for an id
+# (see PostingCursor) jumps over whole blocks instead of decoding them. The index also records the id of the
+# sentence at each position of the corpus, for proximity queries, and for ranking (see ranking.py) the length of
+# each sentence and the number of occurrences of an n-gram in the few sentences where it is repeated.
+# The n-grams themselves, which took far more memory as str dict keys than their postings, are kept in a front
+# coded term dictionary per number of words (see TermDictionary) next to an array of the posting of each; the
+# n-grams of sentences added since are kept in a dict until merged in (see merge_terms), e.g. before a wildcard
+# search or a pickle. An n-gram is found by binary search over the first n-gram of each block, then a scan of it.
+# Wildcard K-seqs ("harry *", "dumble*") are matched against the term dictionary of their length: the n-grams
+# starting with the text before the first "*" are found by binary search, so a trailing wildcard costs
+# O(log V + matches); a wildcard earlier in the pattern filters that range word by word.
+
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+SKIP_INTERVAL = 64  # Ids between two skip pointers
+BLOCK_SIZE = 16  # Terms of a front coded block of the term dictionary, the first one kept whole
+
+
+def n_grams_of(sentence: List[str], N: int or None) -> Iterator[str]:
+    """
+    The n-grams of a sentence, as generated by map_n_grams.
+    :param sentence: The sentence, a list of words.
+    :param N: Maximal length of the n-grams, all lengths if None or 0.
+    :return: The n-grams, as space separated words (an n-gram repeated in the sentence is generated again).
+    """
+    words = " ".join(sentence).split()
+    if not N:
+        for k in range(len(words)):
+            for i in range(k + 1, len(words) + 1):
+                yield " ".join(words[k:i])
+    else:
+        for k in range(1, N + 1):
+            for i in range(len(words) - k + 1):
+                yield " ".join(words[i:i + k])
+
+
+def write_varint(value: int, data: bytearray):
+    """ Append a non-negative number as a varint. """
+    while value > 0x7F:
+        data.append((value & 0x7F) | 0x80)
+        value >>= 7
+    data.append(value)
+
+
+def read_varint(data: bytes, offset: int) -> Tuple[int, int]:
+    """ The varint at an offset, and the offset right after it. """
+    value = 0
+    shift = 0
+    byte = data[offset]
+    while byte & 0x80:
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        offset += 1
+        byte = data[offset]
+    return value | (byte << shift), offset + 1
+
+
+class PostingList:
+    """ Increasing sentence ids, delta and varint encoded, with skip pointers. """
+
+    __slots__ = ("data", "count", "last", "skip_ids", "skip_offsets")
+
+    def __init__(self):
+        self.data = bytearray()  # The varint gaps, the first one from 0 (bytes once compacted)
+        self.count = 0
+        self.last = 0  # The last id, the base of the next gap
+        self.skip_ids = None  # array of every SKIP_INTERVAL-th id, created once the list is that long
+        self.skip_offsets = None  # Offset in data right after each of skip_ids
+
+    def append(self, sentence_id: int):
+        """ Add an id, greater than all the ids of the list. """
+        gap = sentence_id - self.last
+        data = self.data
+        if type(data) is bytes:
+            data = self.data = bytearray(data)
+        while gap > 0x7F:
+            data.append((gap & 0x7F) | 0x80)
+            gap >>= 7
+        data.append(gap)
+        self.last = sentence_id
+        self.count += 1
+        if self.count % SKIP_INTERVAL == 0:
+            if self.skip_ids is None:
+                self.skip_ids = array('I')
+                self.skip_offsets = array('I')
+            self.skip_ids.append(sentence_id)
+            self.skip_offsets.append(len(data))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self) -> Iterator[int]:
+        current = 0
+        value = 0
+        shift = 0
+        for byte in self.data:
+            if byte & 0x80:
+                value |= (byte & 0x7F) << shift
+                shift += 7
+            else:
+                current += value | (byte << shift)
+                yield current
+                value = 0
+                shift = 0
+
+    def compact(self):
+        """ Drop the spare capacity of the buffers, until the next append. """
+        self.data = bytes(self.data)
+
+    def __getstate__(self) -> tuple:
+        return bytes(self.data), self.count, self.last, self.skip_ids, self.skip_offsets
+
+    def __setstate__(self, state: tuple):
+        self.data, self.count, self.last, self.skip_ids, self.skip_offsets = state
+
+
+class PostingCursor:
+    """ Forward iteration over a posting (a PostingList or a single id), with jumps to an id through the skips. """
+
+    def __init__(self, posting: PostingList or int):
+        if isinstance(posting, int):
+            posting = single_posting(posting)
+        self.posting = posting
+        self.offset = 0  # Offset in data of the next gap to decode
+        self.index = 0  # Number of ids decoded (or skipped) so far
+        self.current = -1  # The last decoded id, -1 before the first one
+
+    def __len__(self) -> int:
+        return self.posting.count
+
+    def decode(self) -> List[int]:
+        """ All the ids of the posting, whatever the position of the cursor. """
+        return list(self.posting)
+
+    def next(self) -> int or None:
+        """ The next id, or None at the end of the posting. """
+        if self.index >= self.posting.count:
+            return None
+        data = self.posting.data
+        offset = self.offset
+        base = self.current if self.index else 0  # The first gap is from 0
+        value = 0
+        shift = 0
+        byte = data[offset]
+        while byte & 0x80:
+            value |= (byte & 0x7F) << shift
+            shift += 7
+            offset += 1
+            byte = data[offset]
+        self.offset = offset + 1
+        self.index += 1
+        self.current = base + (value | (byte << shift))
+        return self.current
+
+    def next_geq(self, target: int) -> int or None:
+        """
+        Advance to the first id greater than or equal to target.
+        :param target: The id to reach, ids before the current position are not considered.
+        :return: That id, or None if the posting has no such id.
+        """
+        if self.current >= target:
+            return self.current
+        skip_ids = self.posting.skip_ids
+        if skip_ids is not None:
+            block = bisect_left(skip_ids, target) - 1  # The last skip pointer before the target
+            if block >= 0 and skip_ids[block] > self.current:
+                self.current = skip_ids[block]
+                self.offset = self.posting.skip_offsets[block]
+                self.index = (block + 1) * SKIP_INTERVAL
+        value = self.next()
+        while value is not None and value < target:
+            value = self.next()
+        return value
+
+
+def single_posting(sentence_id: int) -> PostingList:
+    """ A PostingList holding one id. """
+    posting = PostingList()
+    posting.append(sentence_id)
+    return posting
+
+
+class TermDictionary:
+    """
+    Sorted distinct terms, front coded: each block of BLOCK_SIZE terms keeps its first term whole (in heads, searched
+    by bisection) and each next term as the number of leading UTF-8 bytes it shares with the term before it and the
+    rest of its bytes, both lengths as varints.
+    """
+
+    __slots__ = ("heads", "data", "offsets", "count")
+
+    def __init__(self, terms: Iterable[str] = ()):
+        """
+        Initialize the TermDictionary class.
+        :param terms: The terms, sorted and distinct.
+        """
+        self.heads: List[bytes] = []  # The first term of each block
+        self.offsets = array('I')  # {block -> offset in data of its second term}
+        data = bytearray()
+        from_bytes = int.from_bytes
+        count = 0
+        previous = b""
+        for term in terms:
+            encoded = term.encode()
+            if count % BLOCK_SIZE:
+                # The leading bytes shared with the previous term, from the highest bit where they differ
+                size = min(len(previous), len(encoded))
+                difference = from_bytes(previous[:size], "big") ^ from_bytes(encoded[:size], "big")
+                shared = size - (difference.bit_length() + 7 >> 3)
+                length = len(encoded) - shared
+                if shared < 0x80 and length < 0x80:  # Both lengths fit a byte, as for nearly every term
+                    data.append(shared)
+                    data.append(length)
+                else:
+                    write_varint(shared, data)
+                    write_varint(length, data)
+                data += encoded[shared:]
+            else:
+                self.heads.append(encoded)
+                self.offsets.append(len(data))
+            previous = encoded
+            count += 1
+        self.count = count
+        self.data = bytes(data)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def block_terms(self, block: int) -> List[bytes]:
+        """ The terms of a block, decoded. """
+        data = self.data
+        offset = self.offsets[block]
+        end = self.offsets[block + 1] if block + 1 < len(self.offsets) else len(data)
+        term = self.heads[block]
+        terms = [term]
+        while offset < end:
+            shared, offset = read_varint(data, offset)
+            length, offset = read_varint(data, offset)
+            term = term[:shared] + data[offset:offset + length]
+            offset += length
+            terms.append(term)
+        return terms
+
+    def find(self, term: str) -> int or None:
+        """ The position of a term in the sorted terms, None if it is not one of them. """
+        encoded = term.encode()
+        block = bisect_right(self.heads, encoded) - 1
+        if block < 0:
+            return None
+        if self.heads[block] == encoded:
+            return block * BLOCK_SIZE
+        for position, candidate in enumerate(self.block_terms(block)):
+            if candidate >= encoded:
+                return block * BLOCK_SIZE + position if candidate == encoded else None
+        return None
+
+    def bisect(self, term: str) -> int:
+        """ The position of the first term greater than or equal to a term (which need not be one of them). """
+        encoded = term.encode()
+        block = bisect_right(self.heads, encoded) - 1
+        if block < 0:
+            return 0
+        for position, candidate in enumerate(self.block_terms(block)):
+            if candidate >= encoded:
+                return block * BLOCK_SIZE + position
+        return min((block + 1) * BLOCK_SIZE, self.count)
+
+    def terms(self, start: int = 0, end: int = None) -> List[str]:
+        """ The terms from position start to end (excluded), sorted. """
+        end = self.count if end is None else end
+        terms = []
+        for block in range(start // BLOCK_SIZE, (end - 1) // BLOCK_SIZE + 1 if end > start else 0):
+            first = block * BLOCK_SIZE
+            terms.extend(term.decode() for term in self.block_terms(block)[max(start - first, 0):end - first])
+        return terms
+
+    def __getstate__(self) -> tuple:
+        return self.heads, self.data, self.offsets, self.count
+
+    def __setstate__(self, state: tuple):
+        self.heads, self.data, self.offsets, self.count = state
+
+
+class PostingsIndex:
+    """ Maps n-grams to the distinct sentences they appear in, like map_n_grams, with compressed postings. """
+
+    def __init__(self, N: int = None):
+        """
+        Initialize the PostingsIndex class.
+        :param N: Maximal length of the indexed n-grams, all lengths if None.
+        """
+        self.N = N
+        self.sentences: List[Tuple[str, ...]] = []  # {sentence id -> sentence}
+        self.sentence_ids: Dict[Tuple[str, ...], int] = {}  # {sentence -> sentence id}
+        # The posting of an n-gram is kept as a code: the sentence id of a posting of one sentence, or -1 - the
+        # position of its PostingList in posting_lists
+        self.terms: Dict[int, TermDictionary] = {}  # {number of words -> sorted n-grams}, see merge_terms()
+        self.codes: Dict[int, array] = {}  # {number of words -> {position in terms -> posting code}}
+        self.new_terms: Dict[str, int] = {}  # {n-gram -> posting code}, for the n-grams not in terms yet
+        self.posting_lists: List[PostingList] = []  # The postings of several sentences
+        self.sentence_at = array('I')  # {position in the corpus -> sentence id}, repeated sentences included
+        self.sentence_lengths = array('I')  # {sentence id -> number of words}
+        self.repeats: Dict[str, Dict[int, int]] = {}  # {n-gram -> {sentence id -> occurrences}}, only above one
+
+    @classmethod
+    def from_sentences(cls, sentences: List[List[str]], N: int = None) -> "PostingsIndex":
+        index = cls(N)
+        for sentence in sentences:
+            index.add_sentence(sentence)
+        index.compact()
+        return index
+
+    def compact(self):
+        """ Merge the new n-grams into the term dictionaries and shrink the postings to their exact size, once no
+        more sentences are expected for a while. """
+        self.merge_terms()
+        for posting in self.posting_lists:
+            posting.compact()
+
+    def merge_terms(self):
+        """ Move the n-grams of new_terms into the sorted term dictionaries of their lengths. """
+        if not self.new_terms:
+            return
+        by_length: Dict[int, List[str]] = {}
+        for n_gram in self.new_terms:
+            by_length.setdefault(n_gram.count(" ") + 1, []).append(n_gram)
+        for length, n_grams in by_length.items():
+            n_grams.sort()
+            codes = array('i', map(self.new_terms.__getitem__, n_grams))
+            if length in self.terms:  # Merge the two sorted lists of n-grams and their codes
+                old_n_grams, old_codes = self.terms[length].terms(), self.codes[length]
+                merged_n_grams, merged_codes = [], array('i')
+                i = j = 0
+                while i < len(old_n_grams) or j < len(n_grams):
+                    if j == len(n_grams) or (i < len(old_n_grams) and old_n_grams[i] < n_grams[j]):
+                        merged_n_grams.append(old_n_grams[i])
+                        merged_codes.append(old_codes[i])
+                        i += 1
+                    else:
+                        merged_n_grams.append(n_grams[j])
+                        merged_codes.append(codes[j])
+                        j += 1
+                n_grams, codes = merged_n_grams, merged_codes
+            self.terms[length] = TermDictionary(n_grams)
+            self.codes[length] = codes
+        self.new_terms = {}
+
+    def __getstate__(self) -> Dict[str, Any]:
+        self.compact()  # Pickled (e.g. cached) indexes hold no new_terms
+        return self.__dict__
+
+    def locate(self, n_gram: str) -> Tuple[array, int] or None:
+        """ The codes of the term dictionary holding an n-gram and its position there, None if it holds none. """
+        length = n_gram.count(" ") + 1
+        terms = self.terms.get(length)
+        if terms is None:
+            return None
+        position = terms.find(n_gram)
+        return None if position is None else (self.codes[length], position)
+
+    def code_of(self, n_gram: str) -> int or None:
+        """ The posting code of an n-gram, None if it is not indexed. """
+        code = self.new_terms.get(n_gram)
+        if code is None and self.terms:
+            location = self.locate(n_gram)
+            if location is not None:
+                code = location[0][location[1]]
+        return code
+
+    def posting(self, n_gram: str) -> PostingList or int or None:
+        """ The posting of an n-gram: a PostingList, the id of its only sentence, or None if it is not indexed. """
+        code = self.code_of(n_gram)
+        if code is None or code >= 0:
+            return code
+        return self.posting_lists[-1 - code]
+
+    def add_sentence(self, sentence: List[str]):
+        """ Index the next sentence of the corpus, only recording its position if the same sentence was indexed. """
+        key = tuple(sentence)
+        if key in self.sentence_ids:
+            self.sentence_at.append(self.sentence_ids[key])
+            return
+        sentence_id = len(self.sentences)
+        self.sentence_at.append(sentence_id)
+        self.sentences.append(key)
+        self.sentence_ids[key] = sentence_id
+        self.sentence_lengths.append(len(" ".join(sentence).split()))
+
+        new_terms = self.new_terms
+        posting_lists = self.posting_lists
+        for n_gram in n_grams_of(sentence, self.N):
+            code = new_terms.get(n_gram)
+            location = None
+            if code is None and self.terms:
+                location = self.locate(n_gram)
+                if location is not None:
+                    code = location[0][location[1]]
+            if code is None:
+                new_terms[n_gram] = sentence_id
+            elif code >= 0:
+                if code != sentence_id:
+                    posting = single_posting(code)
+                    posting.append(sentence_id)
+                    posting_lists.append(posting)
+                    if location is None:
+                        new_terms[n_gram] = -len(posting_lists)
+                    else:
+                        location[0][location[1]] = -len(posting_lists)
+                else:
+                    self.count_repeat(n_gram, sentence_id)
+            else:
+                posting = posting_lists[-1 - code]
+                if posting.last != sentence_id:
+                    posting.append(sentence_id)
+                else:
+                    self.count_repeat(n_gram, sentence_id)
+
+    def count_repeat(self, n_gram: str, sentence_id: int):
+        """ Record another occurrence of an n-gram in the sentence being indexed. """
+        counts = self.repeats.setdefault(n_gram, {})
+        counts[sentence_id] = counts.get(sentence_id, 1) + 1
+
+    def __len__(self) -> int:
+        return len(self.new_terms) + sum(len(terms) for terms in self.terms.values())
+
+    def __contains__(self, n_gram: str) -> bool:
+        return self.code_of(n_gram) is not None
+
+    def n_grams(self) -> Iterator[str]:
+        """ Every indexed n-gram, those of each length sorted. """
+        self.merge_terms()
+        for length in sorted(self.terms):
+            yield from self.terms[length].terms()
+
+    def document_frequency(self, n_gram: str) -> int:
+        """ The number of distinct sentences containing an n-gram. """
+        posting = self.posting(n_gram)
+        if posting is None:
+            return 0
+        return 1 if isinstance(posting, int) else posting.count
+
+    def sentence_ids_of(self, n_gram: str) -> List[int]:
+        """ The increasing ids of the sentences containing an n-gram (none if it is not indexed). """
+        posting = self.posting(n_gram)
+        if posting is None:
+            return []
+        if isinstance(posting, int):
+            return [posting]
+        return list(posting)
+
+    def cursor(self, n_gram: str) -> PostingCursor or None:
+        """ A cursor over the ids of the sentences containing an n-gram, None if it is not indexed. """
+        posting = self.posting(n_gram)
+        return PostingCursor(posting) if posting is not None else None
+
+    def sorted_terms(self, length: int) -> List[str]:
+        """ The indexed n-grams of a number of words, sorted (the term dictionary, decoded). """
+        self.merge_terms()
+        return self.terms[length].terms() if length in self.terms else []
+
+    def expand(self, pattern: str) -> List[str]:
+        """
+        The indexed n-grams matching a wildcard pattern.
+        :param pattern: Space separated words, "*" in a word matching any characters, e.g. "harry *" or "dumble*".
+        :return: The matching n-grams, sorted (the n-gram itself if the pattern has no wildcard and is indexed).
+        """
+        words = pattern.split()
+        if "*" not in pattern:
+            return [" ".join(words)] if " ".join(words) in self else []
+        pattern = " ".join(words)
+        self.merge_terms()
+        terms = self.terms.get(len(words))
+        if terms is None:
+            return []
+        prefix = pattern[:pattern.index("*")]
+        start = terms.bisect(prefix)
+        end = terms.bisect(prefix[:-1] + chr(ord(prefix[-1]) + 1)) if prefix else len(terms)
+        if pattern.index("*") == len(pattern) - 1:
+            return terms.terms(start, end)  # Every n-gram of the range starts with the prefix and has the right length
+        matcher = re.compile(r"[^ ]*".join(re.escape(part) for part in pattern.split("*")))
+        return [n_gram for n_gram in terms.terms(start, end) if matcher.fullmatch(n_gram)]
+
+    def pattern_ids(self, pattern: str) -> List[int]:
+        """ The increasing ids of the sentences containing an n-gram matching a wildcard pattern, see expand. """
+        n_grams = self.expand(pattern)
+        if len(n_grams) == 1:
+            return self.sentence_ids_of(n_grams[0])
+        return sorted(set().union(*(self.sentence_ids_of(n_gram) for n_gram in n_grams)))
+
+    def lookup(self, n_gram: str) -> List[Tuple[str, ...]]:
+        """ The sentences containing an n-gram, in order of first appearance. """
+        sentences = self.sentences
+        return [sentences[sentence_id] for sentence_id in self.sentence_ids_of(n_gram)]
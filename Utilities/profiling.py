@@ -0,0 +1,169 @@
+# Description: Per-stage timing and memory instrumentation, enabled with --profile.
+# Stages are functions decorated with @profiled (or blocks wrapped in profile_stage). While profiling is enabled,
+# each stage records its number of calls, wall time, CPU time, peak memory allocated during the stage (tracemalloc)
+# and the number of items it produced. Times and peaks are inclusive of the nested stages.
+# While profiling is disabled, a stage costs one global lookup per call, and tracemalloc (or threading) is not even
+# imported.
+# Each thread nests its own stages (the shards of a sharded Task 4 search run in threads), but CPU times and memory
+# peaks are measured for the whole process, so those of stages running in parallel threads include each other.
+# The tracemalloc peak is reset when a stage starts: the peak reached so far is first kept by every running stage,
+# of every thread, and by the run-wide peak of the report.
+
+import functools
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List
+
+active_profiler = None  # The Profiler of this process, None when profiling is disabled
+tracemalloc = None  # Imported when profiling is enabled
+
+
+class StageFrame:
+    """ A running stage: its start measurements and the highest allocation peak seen during it. """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.process_time()
+        self.memory_start = tracemalloc.get_traced_memory()[0]
+        self.peak = self.memory_start  # Absolute peak of traced memory during the stage
+
+
+class Profiler:
+    """ Collects the measurements of the stages. """
+
+    def __init__(self):
+        import threading
+        self.stages: Dict[str, Dict[str, Any]] = {}  # {stage name -> totals}, in order of first call
+        self.lock = threading.Lock()  # Guards the totals, updated by the stages of every thread
+        self.local = threading.local()  # The stack of running stages of each thread
+        self.running = set()  # The running stages of every thread, which keep the peak before it is reset
+        self.max_peak = 0  # The peak of traced memory over the whole run
+        self.start = time.perf_counter()
+
+    @property
+    def stack(self) -> List[StageFrame]:
+        """ The running stages of the current thread, innermost last. """
+        stack = getattr(self.local, "stack", None)
+        if stack is None:
+            stack = self.local.stack = []
+        return stack
+
+    def keep_peak(self):
+        """ Keep the current peak in the running stages and the run-wide peak, before a reset (lock held). """
+        peak = tracemalloc.get_traced_memory()[1]
+        self.max_peak = max(self.max_peak, peak)
+        for frame in self.running:
+            frame.peak = max(frame.peak, peak)
+
+    def enter(self, name: str) -> StageFrame:
+        with self.lock:
+            # The peak is reset for the new stage, the enclosing stages keep the peak reached so far
+            self.keep_peak()
+            tracemalloc.reset_peak()
+            frame = StageFrame(name)
+            self.running.add(frame)
+        self.stack.append(frame)
+        return frame
+
+    def exit(self, frame: StageFrame, items: int or None):
+        wall = time.perf_counter() - frame.wall_start
+        cpu = time.process_time() - frame.cpu_start
+        stack = self.stack
+        stack.pop()
+
+        with self.lock:
+            self.keep_peak()
+            self.running.discard(frame)
+            stage = self.stages.setdefault(frame.name, {"calls": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0,
+                                                        "peak_allocated_mb": 0.0, "items": None})
+            stage["calls"] += 1
+            stage["wall_seconds"] += wall
+            stage["cpu_seconds"] += cpu
+            stage["peak_allocated_mb"] = max(stage["peak_allocated_mb"],
+                                             (frame.peak - frame.memory_start) / 2 ** 20)
+            if items is not None:
+                stage["items"] = (stage["items"] or 0) + items
+
+    def report(self) -> Dict[str, Any]:
+        """ The measurements of every stage, as a JSON serializable dictionary. """
+        stages = []
+        for name, stage in self.stages.items():
+            stages.append({"stage": name,
+                           "calls": stage["calls"],
+                           "wall_seconds": round(stage["wall_seconds"], 6),
+                           "cpu_seconds": round(stage["cpu_seconds"], 6),
+                           "peak_allocated_mb": round(stage["peak_allocated_mb"], 3),
+                           "items": stage["items"]})
+        return {"total_wall_seconds": round(time.perf_counter() - self.start, 6),
+                "peak_traced_mb": round(max(self.max_peak, tracemalloc.get_traced_memory()[1]) / 2 ** 20, 3),
+                "stages": stages}
+
+
+def profiled(name: str = None, count: Callable[[Any], int] = None) -> Callable:
+    """
+    Decorator making a function a profiled stage.
+    :param name: The stage name, the qualified name of the function by default.
+    :param count: Computes the number of items of the function result (optional).
+    :return: The decorator.
+    """
+
+    def decorator(function: Callable) -> Callable:
+        stage_name = name or function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            profiler = active_profiler
+            if profiler is None:
+                return function(*args, **kwargs)
+            frame = profiler.enter(stage_name)
+            items = None
+            try:
+                result = function(*args, **kwargs)
+                items = count(result) if count is not None else None
+                return result
+            finally:
+                profiler.exit(frame, items)
+
+        return wrapper
+
+    return decorator
+
+
+@contextmanager
+def profile_stage(name: str):
+    """ Profile a block of code as a stage. """
+    profiler = active_profiler
+    if profiler is None:
+        yield
+        return
+    frame = profiler.enter(name)
+    try:
+        yield
+    finally:
+        profiler.exit(frame, None)
+
+
+@contextmanager
+def profiling(report_path: str = None):
+    """
+    Enable profiling for the enclosed code, then write the JSON report (also when the code exits with an error).
+    :param report_path: File receiving the report, standard error if None or "-".
+    """
+    import json
+    global active_profiler, tracemalloc
+    import tracemalloc
+    tracemalloc.start()
+    active_profiler = Profiler()
+    try:
+        yield active_profiler
+    finally:
+        report = active_profiler.report()
+        active_profiler = None
+        tracemalloc.stop()
+        if report_path and report_path != "-":
+            with open(report_path, "w") as file:
+                json.dump(report, file, indent=4)
+        else:
+            print(json.dumps(report, indent=4), file=sys.stderr)
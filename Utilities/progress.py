@@ -0,0 +1,139 @@
+# Description: Progress and throughput reporting for long runs, enabled with --progress.
+# The main loops of Tasks 5, 6 and 9 report how many items (sentences, windows, sentence pairs) they processed.
+# While reporting is enabled, a line with the progress, the rate, extra counters and the ETA is written to standard
+# error (or a JSON object per report to a metrics file) at most once every REPORT_INTERVAL seconds. The clock is
+# only read every few items, as many as the measured rate allows between two reports, so the cost of an update is
+# one comparison. While reporting is disabled, the loops get a tracker that does nothing.
+
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, TextIO
+
+REPORT_INTERVAL = 2.0  # Seconds between two reports of a stage
+CHECKS_PER_INTERVAL = 20  # Clock readings per report interval, once the rate is known
+
+active_reporter = None  # The ProgressReporter of this process, None when progress reporting is disabled
+
+
+class ProgressTracker:
+    """ The progress of one loop, see ProgressReporter.track. """
+
+    def __init__(self, reporter: "ProgressReporter", stage: str, total: int or None, unit: str):
+        self.reporter = reporter
+        self.stage = stage
+        self.total = total
+        self.unit = unit
+        self.start = time.perf_counter()
+        self.last_report = self.start
+        self.step = 1  # Number of items between two clock readings
+        self.next_check = 1  # Number of processed items at which the clock is read next
+
+    def update(self, done: int, **counters: int):
+        """
+        Record the progress of the loop, reporting it if the report interval elapsed.
+        :param done: Number of items processed so far.
+        :param counters: Other totals to report, e.g. pairs=1200.
+        """
+        if done < self.next_check:
+            return
+        now = time.perf_counter()
+        # Read the clock again after about REPORT_INTERVAL / CHECKS_PER_INTERVAL seconds at the current rate,
+        # growing the step at most twofold, since the first rates are measured over very few items
+        rate = done / max(now - self.start, 1e-9)
+        self.step = max(1, min(int(rate * REPORT_INTERVAL / CHECKS_PER_INTERVAL), 2 * self.step))
+        self.next_check = done + self.step
+        if now - self.last_report >= REPORT_INTERVAL:
+            self.last_report = now
+            self.reporter.report(self, done, now, counters)
+
+    def finish(self, done: int, **counters: int):
+        """ Report the final totals of the loop. """
+        self.reporter.report(self, done, time.perf_counter(), counters, final=True)
+
+
+class NullTracker:
+    """ The tracker of the loops while progress reporting is disabled. """
+
+    def update(self, done: int, **counters: int):
+        pass
+
+    def finish(self, done: int, **counters: int):
+        pass
+
+
+NULL_TRACKER = NullTracker()
+
+
+class ProgressReporter:
+    """ Writes the progress reports of the loops, as text lines or as JSON lines (metrics file). """
+
+    def __init__(self, file: TextIO, as_json: bool = False):
+        """
+        Initialize the ProgressReporter class.
+        :param file: The stream receiving the reports.
+        :param as_json: Write one JSON object per report instead of a human readable line.
+        """
+        self.file = file
+        self.as_json = as_json
+
+    def track(self, stage: str, total: int = None, unit: str = "items") -> ProgressTracker:
+        return ProgressTracker(self, stage, total, unit)
+
+    def report(self, tracker: ProgressTracker, done: int, now: float, counters: Dict[str, int], final: bool = False):
+        elapsed = now - tracker.start
+        rate = done / elapsed if elapsed > 0 else 0.0
+        eta = (tracker.total - done) / rate if tracker.total is not None and rate > 0 else None
+        if self.as_json:
+            import json
+            metrics: Dict[str, Any] = {"stage": tracker.stage, "done": done, "total": tracker.total,
+                                       "unit": tracker.unit, "elapsed_seconds": round(elapsed, 3),
+                                       "rate_per_second": round(rate, 1),
+                                       "eta_seconds": round(eta, 1) if eta is not None else None,
+                                       "final": final, **counters}
+            self.file.write(json.dumps(metrics) + "\n")
+        else:
+            line = f"[progress] {tracker.stage}: {done}"
+            if tracker.total is not None:
+                line += f"/{tracker.total} {tracker.unit} ({100 * done / max(tracker.total, 1):.1f}%)"
+            else:
+                line += f" {tracker.unit}"
+            line += f", {rate:.1f} {tracker.unit}/s"
+            line += "".join(f", {value} {name}" for name, value in counters.items())
+            if final:
+                line += f", done in {elapsed:.1f}s"
+            elif eta is not None:
+                line += f", ETA {eta:.0f}s"
+            self.file.write(line + "\n")
+        self.file.flush()
+
+
+def track(stage: str, total: int = None, unit: str = "items") -> ProgressTracker or NullTracker:
+    """
+    Start tracking a loop.
+    :param stage: Name of the loop in the reports.
+    :param total: Number of items the loop will process, for the percentage and ETA (optional).
+    :param unit: What the items are, e.g. "sentences".
+    :return: The tracker, whose update method the loop calls with its number of processed items.
+    """
+    reporter = active_reporter
+    if reporter is None:
+        return NULL_TRACKER
+    return reporter.track(stage, total, unit)
+
+
+@contextmanager
+def reporting_progress(metrics_path: str = None):
+    """
+    Enable progress reporting for the enclosed code.
+    :param metrics_path: File receiving one JSON object per report, standard error (as text lines) if None or "-".
+    """
+    global active_reporter
+    file = open(metrics_path, "w") if metrics_path and metrics_path != "-" else None
+    active_reporter = ProgressReporter(file or sys.stderr, as_json=file is not None)
+    try:
+        yield active_reporter
+    finally:
+        active_reporter = None
+        if file is not None:
+            file.close()
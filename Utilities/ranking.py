@@ -0,0 +1,162 @@
+# Description: BM25 ranking of the Task 4 search results, for --top_k.
+# Each distinct sentence is a document. A sentence matching K-seqs t scores
+#   sum over t of idf(t) * tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / average length))
+# with tf the occurrences of t in the sentence and idf(t) = ln(1 + (N - df + 0.5) / (df + 0.5)), N sentences of which
+# df contain t. The lengths, document frequencies (the posting sizes) and occurrences are recorded by the index, so
+# scoring a sentence is a few array lookups, and a heap of size k keeps the best sentences: only those k sentences
+# are decoded, sorted and written. A single K-seq still scores each of its matches (O(matches * log k)).
+# Several K-seqs are scored one after the other, by decreasing upper bound of their score (from their idf, their
+# largest occurrence count and the smallest length norm). Once the bounds of the K-seqs left fall below the k-th
+# best score so far, no new sentence can enter the k best: only the sentences that can still reach it are scored
+# further, through the skips of the postings when they are few (max-score early termination).
+# An index shard ranks its sentences with the statistics (N, average length, df) of the whole collection of shards
+# when they are given (see CollectionStatistics), so that the scores of the shards can be merged.
+
+import heapq
+import math
+from array import array
+from typing import Dict, Iterable, List, Tuple
+from Utilities.postings import PostingsIndex
+
+K1 = 1.2  # Saturation of the term frequency
+B = 0.75  # Strength of the length normalization
+GALLOP_RATIO = 32  # Postings this many times longer than the sentences still ranked are searched instead of decoded
+BOUND_MARGIN = 1e-9  # Relative slack of the score bounds, for the rounding of their sums
+
+
+class CollectionStatistics:
+    """ The BM25 statistics of a collection of sentences, possibly spread over several index shards. """
+
+    def __init__(self, sentence_count: int, total_length: int, document_frequencies: Dict[str, int]):
+        """
+        Initialize the CollectionStatistics class.
+        :param sentence_count: Number of distinct sentences of the collection (N).
+        :param total_length: Number of words of those sentences.
+        :param document_frequencies: {n-gram -> number of sentences containing it}, for the n-grams of the queries.
+        """
+        self.sentence_count = sentence_count
+        self.total_length = total_length
+        self.document_frequencies = document_frequencies
+
+    @staticmethod
+    def combine(shard_statistics: List["CollectionStatistics"]) -> "CollectionStatistics":
+        """ The statistics of the union of shards (a sentence found in several shards counts once per shard). """
+        document_frequencies = {}
+        for statistics in shard_statistics:
+            for n_gram, frequency in statistics.document_frequencies.items():
+                document_frequencies[n_gram] = document_frequencies.get(n_gram, 0) + frequency
+        return CollectionStatistics(sum(statistics.sentence_count for statistics in shard_statistics),
+                                    sum(statistics.total_length for statistics in shard_statistics),
+                                    document_frequencies)
+
+
+class Bm25Ranker:
+    """ Selects the best sentences of an index for K-seqs. """
+
+    def __init__(self, index: PostingsIndex):
+        self.index = index
+        self.norms = array('d')  # {sentence id -> K1 * (1 - B + B * length / average length)}
+        self.min_norm = 0.0  # The smallest norm, which bounds the score of any sentence
+        self.average_length = None  # The average length of the norms
+        self.total_length = (0, 0)  # (number of sentences, their number of words) when last summed
+
+    def statistics(self, n_grams: Iterable[str]) -> CollectionStatistics:
+        """ The statistics of the index alone, for K-seqs. """
+        index = self.index
+        if self.total_length[0] != len(index.sentences):
+            self.total_length = (len(index.sentences), sum(index.sentence_lengths))
+        return CollectionStatistics(len(index.sentences), self.total_length[1],
+                                    {n_gram: index.document_frequency(n_gram) for n_gram in n_grams})
+
+    def refresh(self, average_length: float):
+        """ Compute the length normalization of every sentence, again if the average or the sentences changed. """
+        if average_length != self.average_length or len(self.norms) != len(self.index.sentences):
+            self.norms = array('d', (K1 * (1 - B + B * length / average_length)
+                                     for length in self.index.sentence_lengths))
+            self.min_norm = min(self.norms, default=0.0)
+            self.average_length = average_length
+
+    def top_k(self, n_grams: Iterable[str], k: int, candidates: List[int] = None) -> List[int]:
+        """ The ids of the best sentences for K-seqs, see top_k_scored. """
+        return [sentence_id for _, sentence_id in self.top_k_scored(n_grams, k, candidates)]
+
+    def top_k_scored(self, n_grams: Iterable[str], k: int, candidates: List[int] = None,
+                     statistics: CollectionStatistics = None) -> List[Tuple[float, int]]:
+        """
+        The best sentences for K-seqs.
+        :param n_grams: The K-seqs to score, as indexed n-grams.
+        :param k: Number of sentences to return.
+        :param candidates: Increasing ids of the sentences to rank, the sentences containing any of the K-seqs if None.
+        :param statistics: The statistics of the collection the index is a shard of, those of the index if None.
+        :return: The (score, id) of the k best sentences, best first (the first in the corpus first on equal scores).
+        """
+        n_grams = [n_gram for n_gram in dict.fromkeys(n_grams) if n_gram in self.index]
+        if statistics is None:
+            statistics = self.statistics(n_grams)
+        self.refresh(statistics.total_length / statistics.sentence_count if statistics.sentence_count else 1.0)
+        norms = self.norms
+        repeats = self.index.repeats
+
+        def idf(n_gram: str) -> float:
+            frequency = statistics.document_frequencies.get(n_gram, 0)
+            return math.log(1 + (statistics.sentence_count - frequency + 0.5) / (frequency + 0.5))
+
+        if len(n_grams) == 1 and candidates is None:
+            # The ranking of a single K-seq does not depend on its idf, which only scales the k best scores
+            counts = repeats.get(n_grams[0], {})
+
+            def score(sentence_id: int) -> float:
+                tf = counts.get(sentence_id, 1)
+                return tf / (tf + norms[sentence_id])
+
+            weight = idf(n_grams[0]) * (K1 + 1)
+            best = heapq.nlargest(k, self.index.sentence_ids_of(n_grams[0]), key=score)  # Stable on equal scores
+            return [(weight * score(sentence_id), sentence_id) for sentence_id in best]
+
+        terms = []  # (upper bound of the score, weight, occurrence counts, n-gram), highest bound first
+        for n_gram in n_grams:
+            weight = idf(n_gram) * (K1 + 1)
+            counts = repeats.get(n_gram, {})
+            max_tf = max(counts.values(), default=1)
+            terms.append((weight * max_tf / (max_tf + self.min_norm), weight, counts, n_gram))
+        terms.sort(key=lambda term: -term[0])
+        remaining = sum(term[0] for term in terms)  # The bound of the scores of the K-seqs left
+
+        scores = dict.fromkeys(candidates, 0.0) if candidates is not None else {}
+        admit = candidates is None  # Whether sentences not scored yet can still enter the k best
+        ranked = None  # The increasing ids of the sentences that can still enter the k best, once known
+        scored = 0  # Postings scored since the k-th best score was last computed
+        for bound, weight, counts, n_gram in terms:
+            if 0 < k < len(scores) and scored >= len(scores):
+                # The k-th best score so far (scores only grow), computed again once the postings scored since
+                # outnumber the sentences, which keeps its cost below that of the scoring
+                threshold = heapq.nlargest(k, scores.values())[-1]
+                scored = 0
+                if remaining * (1 + BOUND_MARGIN) < threshold:
+                    admit = False
+                    kept = [sentence_id for sentence_id in (ranked if ranked is not None else sorted(scores))
+                            if (scores[sentence_id] + remaining) * (1 + BOUND_MARGIN) >= threshold]
+                    if ranked is None or len(kept) < len(ranked):
+                        scores = {sentence_id: scores[sentence_id] for sentence_id in kept}
+                    ranked = kept
+            remaining -= bound
+
+            if ranked is not None and len(ranked) * GALLOP_RATIO < self.index.document_frequency(n_gram):
+                cursor = self.index.cursor(n_gram)  # Jump to the sentences still ranked through the skips
+                for sentence_id in ranked:
+                    found = cursor.next_geq(sentence_id)
+                    if found is None:
+                        break
+                    if found == sentence_id:
+                        tf = counts.get(sentence_id, 1)
+                        scores[sentence_id] += weight * tf / (tf + norms[sentence_id])
+                scored += len(ranked)
+                continue
+            sentence_ids = self.index.sentence_ids_of(n_gram)
+            scored += len(sentence_ids)
+            for sentence_id in sentence_ids:
+                if admit or sentence_id in scores:
+                    tf = counts.get(sentence_id, 1)
+                    scores[sentence_id] = scores.get(sentence_id, 0.0) + weight * tf / (tf + norms[sentence_id])
+        best = heapq.nlargest(k, scores, key=lambda sentence_id: (scores[sentence_id], -sentence_id))
+        return [(scores[sentence_id], sentence_id) for sentence_id in best]
@@ -0,0 +1,134 @@
+# Description: Byte offsets of the original sentences of a corpus, to return their raw text without re-parsing it.
+# With --raw_offsets, Task 1 writes <output>.offsets next to its JSON output: a JSON header line (the sentences file,
+# its size and modification time, the column of the sentences) padded to a multiple of 8 bytes, then the start and
+# end byte offsets of the CSV record of each processed sentence, as unsigned 64-bit integers in native byte order.
+# RawSentences maps that file and the sentences file (mmap) and only decodes the records whose text is requested,
+# so the raw text of h hits costs O(h), whatever the size of the corpus.
+
+import csv
+import io
+import json
+import mmap
+import os
+import sys
+from array import array
+from typing import Dict, Iterator, List, Tuple
+
+OFFSETS_SUFFIX = ".offsets"  # Appended to the path of the Task 1 output
+
+
+class LineOffsets:
+    """ The decoded lines of a binary file, counting the bytes read so far (csv reads one line at a time). """
+
+    def __init__(self, file, complete_lines: bool = False):
+        self.file = file
+        self.offset = file.tell()
+        self.complete_lines = complete_lines  # End before a last line with no line break, still being written
+        self.exhausted = False
+
+    def __iter__(self) -> "LineOffsets":
+        return self
+
+    def __next__(self) -> str:
+        line = self.file.readline()
+        if not line or (self.complete_lines and not line.endswith(b"\n")):
+            self.exhausted = True
+            raise StopIteration
+        text = line.decode("utf-8-sig" if self.offset == 0 else "utf-8")  # Without the BOM of the file, if any
+        self.offset += len(line)
+        return text
+
+
+def read_records(path: str, start: int = 0,
+                 complete_only: bool = False) -> Iterator[Tuple[Dict[str, str or None], int, int]]:
+    """
+    Read a CSV file with a header, like csv.DictReader, with the byte offsets of each record.
+    :param path: Path to the CSV file.
+    :param start: Offset of the first record to read, the header is still read from the start of the file (optional).
+    :param complete_only: Stop before a record not terminated by a line break yet, being written (optional).
+    :return: The rows, each with the start and end offsets of its record (quoted line breaks included).
+    Missing values of short rows are None, as with csv.DictReader.
+    """
+    with open(path, "rb") as file:
+        lines = LineOffsets(file, complete_lines=complete_only)
+        reader = csv.reader(lines)
+        header = next(reader, [])
+        if complete_only and lines.exhausted:
+            return  # No complete record after the header
+        if start > lines.offset:
+            file.seek(start)
+            lines.offset = start
+        start = lines.offset
+        for values in reader:
+            if complete_only and lines.exhausted:
+                return  # The end of the file in the middle of a record, still being written
+            if values:  # Blank lines are skipped, as by csv.DictReader
+                row = dict(zip(header, values))
+                row.update((key, None) for key in header[len(values):])
+                yield row, start, lines.offset
+            start = lines.offset
+
+
+def write_offsets(offsets_path: str, sentences_path: str, column: str, offsets: array):
+    """
+    Write the offsets file of a corpus.
+    :param offsets_path: The file to write, the Task 1 output path followed by OFFSETS_SUFFIX.
+    :param sentences_path: The sentences CSV file the offsets point into.
+    :param column: The column of the sentences in that file.
+    :param offsets: array('Q') of the start and end offsets of the record of each processed sentence.
+    """
+    stat = os.stat(sentences_path)
+    header = json.dumps({"sentences_path": os.path.abspath(sentences_path), "size": stat.st_size,
+                         "mtime_ns": stat.st_mtime_ns, "column": column, "byteorder": sys.byteorder,
+                         "count": len(offsets) // 2}).encode()
+    header += b" " * (-(len(header) + 1) % 8) + b"\n"  # The offsets start at a multiple of 8 bytes
+    with open(offsets_path, "wb") as file:
+        file.write(header)
+        offsets.tofile(file)
+
+
+class RawSentences:
+    """ The original text of the processed sentences of a corpus, read through its offsets file. """
+
+    def __init__(self, offsets_path: str):
+        """
+        Initialize the RawSentences class, mapping the offsets file and the sentences file.
+        :param offsets_path: The offsets file written by Task 1 with --raw_offsets.
+        """
+        try:
+            with open(offsets_path, "rb") as file:
+                self.offsets_map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            data_start = self.offsets_map.find(b"\n") + 1
+            header = json.loads(self.offsets_map[:data_start])
+            stat = os.stat(header["sentences_path"])
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error: Cannot read the sentence offsets at {offsets_path}: {e}. Run Task 1 with --raw_offsets.")
+            sys.exit(1)
+        if (stat.st_size, stat.st_mtime_ns) != (header["size"], header["mtime_ns"]) \
+                or header["byteorder"] != sys.byteorder:
+            print(f"Error: The sentences file at {header['sentences_path']} changed since its offsets were recorded. "
+                  f"Run Task 1 with --raw_offsets again.")
+            sys.exit(1)
+        self.count = header["count"]
+        self.offsets = memoryview(self.offsets_map)[data_start:data_start + 16 * self.count].cast('Q')
+        with open(header["sentences_path"], "rb") as file:
+            self.columns = next(csv.reader([file.readline().decode()]), [])
+            self.sentences_map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.column = self.columns.index(header["column"]) if header["column"] in self.columns else 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def text(self, position: int) -> str:
+        """ The original text of the processed sentence at a position of the corpus. """
+        start, end = self.offsets[2 * position], self.offsets[2 * position + 1]
+        values = next(csv.reader(io.StringIO(self.sentences_map[start:end].decode())), [])
+        return values[self.column] if self.column < len(values) else ""
+
+    def texts(self, positions: List[int]) -> List[str]:
+        return [self.text(position) for position in positions]
+
+    def close(self):
+        self.offsets.release()
+        self.offsets_map.close()
+        self.sentences_map.close()
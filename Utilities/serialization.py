@@ -0,0 +1,122 @@
+# Description: Pluggable JSON backend for the task input and output files.
+# orjson or msgspec are used when installed, and the standard json module otherwise. msgspec also decodes
+# against the expected schema of a file (e.g. a Task 1 or Task 6 JSON), validating it while decoding.
+# The backend can be forced with the TEXT_ANALYZER_JSON environment variable (orjson, msgspec or json).
+# The backends are imported on first use (importing orjson alone takes longer than most task runs on small inputs),
+# and documents smaller than SMALL_DOCUMENT_BYTES are decoded with the json module until a backend is imported.
+# Which backends are installed is only looked up then, so small runs do not even import importlib.util.
+
+import json
+import os
+from typing import Any, Callable, Dict, List
+
+orjson = None  # The optional backend modules, imported by select_backend
+msgspec = None
+
+# Schemas of the JSON files read by the tasks, used for typed decoding
+PREPROCESSED_SCHEMA = Dict[str, Dict[str, List[List[Any]]]]  # Task 1 results
+PAIR_MATCHES_SCHEMA = Dict[str, Dict[str, List[List[List[str]]]]]  # Task 6 results
+KEYS_SCHEMA = Dict[str, List[List[str]]]  # K-seq queries
+PAIRS_SCHEMA = Dict[str, List[List[str]]]  # People pairs of Tasks 7 and 8
+
+# Decoding errors of every backend are raised as json.JSONDecodeError (orjson's error already subclasses it)
+DecodeError = json.JSONDecodeError
+
+
+def stdlib_loads(data: bytes or str, schema: Any = None) -> Any:
+    return json.loads(data)
+
+
+def stdlib_dumps(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"))
+
+
+def orjson_loads(data: bytes or str, schema: Any = None) -> Any:
+    return orjson.loads(data)
+
+
+def orjson_dumps(value: Any) -> str:
+    return orjson.dumps(value).decode()
+
+
+def msgspec_loads(data: bytes or str, schema: Any = None) -> Any:
+    try:
+        if schema is not None:
+            try:
+                return msgspec.json.decode(data, type=schema)
+            except msgspec.ValidationError:
+                pass  # Valid JSON of another shape, let the caller handle it as with the other backends
+        return msgspec.json.decode(data)
+    except msgspec.DecodeError as e:
+        raise DecodeError(str(e), data if isinstance(data, str) else "", 0) from e
+
+
+def msgspec_dumps(value: Any) -> str:
+    return msgspec.json.encode(value).decode()
+
+
+BACKENDS: Dict[str, tuple] = {"orjson": (orjson_loads, orjson_dumps), "msgspec": (msgspec_loads, msgspec_dumps),
+                               "json": (stdlib_loads, stdlib_dumps)}  # {name -> (loads, dumps)}
+PREFERENCE = ["orjson", "msgspec", "json"]  # Fastest first
+installed: List[str] or None = None  # The installed backends in order of PREFERENCE, see installed_backends()
+SMALL_DOCUMENT_BYTES = 1 << 20  # Below this, importing a backend costs more than it saves on decoding
+backend_name: str or None = None  # None until the first use of a backend (or a large document)
+loads_function: Callable = stdlib_loads
+dumps_function: Callable = stdlib_dumps
+
+
+def installed_backends() -> List[str]:
+    """ The names of the installed backends, fastest first, looked up (without importing them) on the first call. """
+    global installed
+    if installed is None:
+        import importlib.util
+        installed = [name for name in PREFERENCE if name == "json" or importlib.util.find_spec(name) is not None]
+    return installed
+
+
+def select_backend(name: str = None) -> str:
+    """
+    Choose the JSON backend of this process, importing it.
+    :param name: orjson, msgspec or json; the fastest installed backend if None.
+    :return: The name of the selected backend, the fastest installed one if the requested one is not.
+    """
+    global backend_name, loads_function, dumps_function, orjson, msgspec
+    if name not in installed_backends():
+        name = installed_backends()[0]
+    if name == "orjson":
+        import orjson
+    elif name == "msgspec":
+        import msgspec.json
+    backend_name = name
+    loads_function, dumps_function = BACKENDS[name]
+    return name
+
+
+def loads_json(data: bytes or str, schema: Any = None) -> Any:
+    """
+    Decode a JSON document.
+    :param data: The document.
+    :param schema: The expected type of the document, e.g. PAIR_MATCHES_SCHEMA (optional).
+    :return: The decoded value, made of dicts, lists, strings and numbers whatever the backend.
+    """
+    if backend_name is None:
+        if len(data) < SMALL_DOCUMENT_BYTES:
+            return stdlib_loads(data, schema)
+        select_backend()
+    return loads_function(data, schema)
+
+
+def load_json(file, schema: Any = None) -> Any:
+    """ Decode the JSON document of an open file, see loads_json. """
+    return loads_json(file.read(), schema)
+
+
+def dumps_json(value: Any) -> str:
+    """ Encode a value as compact JSON. Non ASCII characters may be written as is, depending on the backend. """
+    if backend_name is None:
+        select_backend()
+    return dumps_function(value)
+
+
+if os.environ.get("TEXT_ANALYZER_JSON"):
+    select_backend(os.environ["TEXT_ANALYZER_JSON"])
@@ -0,0 +1,208 @@
+# Description: Long-running query server.
+# The corpus is preprocessed and the search index, person contexts and graph of people are built once at startup,
+# then K-seq searches, person context lookups and connectivity checks are answered over a local TCP socket.
+# The protocol is newline delimited JSON: each request line is a query object, or {"batch": [query, ...]} to send
+# many queries in one round trip, and each response line is the answer (or {"batch": [answer, ...]}).
+
+import asyncio
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List
+from task_implementation.Task_4_Search_Engine import SearchEngine
+from task_implementation.Task_5_Contexts import PersonContexts
+from task_implementation.Task_7_8_Indirect_Connections import IndirectPaths
+from Utilities.boolean_query import QuerySyntaxError
+from Utilities.serialization import dumps_json, loads_json
+
+DEFAULT_HOST = "127.0.0.1"
+MAX_LINE_BYTES = 16 * 1024 * 1024  # Longest accepted request line
+
+
+class QueryError(Exception):
+    """ An invalid query, reported back to the client instead of stopping the server. """
+
+
+class QueryServer:
+    """ Answers queries on engines that were built once, from an asyncio server or directly. """
+
+    def __init__(
+            self,
+            search_engine: SearchEngine = None,
+            person_contexts: PersonContexts = None,
+            indirect_paths: IndirectPaths = None,
+            maximal_distance: int = None,
+            workers: int = 4
+    ):
+        """
+        Initialize the QueryServer class.
+
+        :param search_engine: Answers "kseq" queries. (Optional)
+        :param person_contexts: Answers "contexts" queries. (Optional)
+        :param indirect_paths: Answers "connected" queries. (Optional)
+        :param maximal_distance: Default maximal distance of "connected" queries that do not give one. (Optional)
+        :param workers: Number of threads answering queries, so the event loop keeps accepting clients.
+        """
+        self.search_engine = search_engine
+        self.indirect_paths = indirect_paths
+        self.maximal_distance = maximal_distance
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+
+        # Build everything up front: queries only read these structures, so the threads can share them
+        if search_engine is not None:
+            search_engine.get_sentence_index()
+        self.contexts = None  # {person name -> k-seqs}
+        if person_contexts is not None:
+            self.contexts = {name: k_seqs for name, k_seqs in person_contexts.contexts_and_k_seqs()}
+
+    @staticmethod
+    def top_k_of(query: Dict[str, Any]) -> int or None:
+        """ The optional "top_k" of a search query, the number of best ranked sentences to return. """
+        top_k = query.get("top_k")
+        if top_k is not None and (not isinstance(top_k, int) or isinstance(top_k, bool) or top_k < 1):
+            raise QueryError('"top_k" must be a positive number of sentences.')
+        return top_k
+
+    def answer(self, query: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Answer a single query.
+        :param query: {"op": "ping" | "kseq" | "query" | "contexts" | "connected", ...}, see the README for the fields.
+        :return: The answer, in the same format as the matching task results.
+        """
+        if not isinstance(query, dict):
+            raise QueryError("A query must be a JSON object.")
+        op = query.get("op")
+
+        if op == "ping":
+            return {"ok": True}
+
+        if op == "kseq":
+            if self.search_engine is None:
+                raise QueryError("K-seq search is not available, start the server with a sentences file.")
+            keys = query.get("keys")
+            if not isinstance(keys, list) or not all(isinstance(key, list) and all(isinstance(word, str)
+                                                                                  for word in key) for key in keys):
+                raise QueryError('"kseq" queries need a list of "keys", each a list of words.')
+            search_index = self.search_engine.search(keys, self.top_k_of(query))
+            return {"K-Seq Matches": [[k_seq, search_index[k_seq]] for k_seq in sorted(search_index)]}
+
+        if op == "query":
+            if self.search_engine is None:
+                raise QueryError("Boolean queries are not available, start the server with a sentences file.")
+            queries = query.get("queries")
+            if not isinstance(queries, list) or not all(isinstance(text, str) for text in queries):
+                raise QueryError('"query" queries need a list of query strings in "queries".')
+            try:
+                query_index = self.search_engine.boolean_search(queries, self.top_k_of(query))
+            except QuerySyntaxError as e:
+                raise QueryError(str(e))
+            return {"Query Matches": [[text, query_index[text]] for text in sorted(query_index)]}
+
+        if op == "contexts":
+            if self.contexts is None:
+                raise QueryError("Person contexts are not available, start the server with a names file and --maxk.")
+            names = query.get("names")
+            if names is None:
+                names = list(self.contexts)
+            if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+                raise QueryError('"contexts" queries need a list of "names".')
+            return {"Person Contexts and K-Seqs": [[name, self.contexts[name]]
+                                                  for name in sorted(set(names)) if name in self.contexts]}
+
+        if op == "connected":
+            if self.indirect_paths is None:
+                raise QueryError("Connectivity queries are not available, start the server with a graph.")
+            pairs = query.get("pairs")
+            maximal_distance = query.get("maximal_distance", self.maximal_distance)
+            if not isinstance(pairs, list) or any(not isinstance(pair, list) or len(pair) != 2
+                                                  or not all(isinstance(person, str) for person in pair)
+                                                  for pair in pairs):
+                raise QueryError('"connected" queries need a list of [person1, person2] "pairs".')
+            if not isinstance(maximal_distance, int) or maximal_distance < 0:
+                raise QueryError('"connected" queries need a non negative "maximal_distance".')
+            pair_matches = sorted([*sorted(pair),
+                                   self.indirect_paths.within_distance(pair[0], pair[1], maximal_distance)]
+                                  for pair in pairs)
+            return {"Pair Matches": pair_matches}
+
+        raise QueryError(f"Unknown op: {op!r}.")
+
+    def answer_batch(self, queries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Answer many queries, each repeated query once.
+        :param queries: The queries.
+        :return: The answers in the order of the queries, {"error": message} for invalid ones.
+        """
+        answers = {}  # {canonical query JSON -> answer}
+        results = []
+        for query in queries:
+            key = json.dumps(query, sort_keys=True)
+            if key not in answers:
+                try:
+                    answers[key] = self.answer(query)
+                except QueryError as e:
+                    answers[key] = {"error": str(e)}
+                except Exception as e:  # A failing query must not cost the other queries or the connection
+                    answers[key] = {"error": f"The query failed: {type(e).__name__}: {e}"}
+            results.append(answers[key])
+        return results
+
+    def handle_line(self, line: bytes) -> Dict[str, Any]:
+        """ Decode a request line and answer it. """
+        try:
+            request = loads_json(line)
+        except ValueError:
+            return {"error": "The request is not valid JSON."}
+        if isinstance(request, dict) and "batch" in request:
+            if not isinstance(request["batch"], list):
+                return {"error": '"batch" must be a list of queries.'}
+            return {"batch": self.answer_batch(request["batch"])}
+        return self.answer_batch([request])[0]
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """ Answer the request lines of a client until it disconnects. """
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:  # Line longer than MAX_LINE_BYTES
+                    writer.write(dumps_json({"error": "The request is too long."}).encode() + b"\n")
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                response = await loop.run_in_executor(self.executor, self.handle_line, line)
+                writer.write(dumps_json(response).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass  # The client went away
+        finally:
+            writer.close()
+
+    async def start(self, host: str = DEFAULT_HOST, port: int = 0) -> asyncio.AbstractServer:
+        """
+        Start listening for clients.
+        :param host: The address to listen on, the loopback interface by default.
+        :param port: The port to listen on, 0 picks a free port (see server.sockets[0].getsockname()).
+        :return: The asyncio server.
+        """
+        return await asyncio.start_server(self.handle_client, host, port, limit=MAX_LINE_BYTES)
+
+    def serve_forever(self, host: str = DEFAULT_HOST, port: int = 0):
+        """ Serve clients until interrupted. """
+
+        async def run():
+            server = await self.start(host, port)
+            address = server.sockets[0].getsockname()
+            print(f"Serving on {address[0]}:{address[1]}", file=sys.stderr, flush=True)
+            async with server:
+                await server.serve_forever()
+
+        try:
+            asyncio.run(run())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.executor.shutdown()
@@ -1,7 +1,11 @@
+import os
+import random
+import tempfile
 import unittest
 from unittest.mock import patch, mock_open
 from collections import defaultdict
-from task_implementation.Task_4_Search_Engine import SearchEngine
+from task_implementation.Task_4_Search_Engine import SearchEngine, ShardedSearchEngine
+from Utilities.postings import PostingsIndex
 import json
 
 
@@ -35,11 +39,11 @@ class TestSearchEngine(unittest.TestCase):
             ["harry", "visited", "hogwarts"]
         ]
     })
-    @patch("task_implementation.Task_4_Search_Engine.map_n_grams", return_value=defaultdict(list, {
-        "harry potter": [["harry", "potter", "was", "here"]],
-        "hogwarts": [["welcome", "to", "hogwarts"], ["harry", "visited", "hogwarts"]]
-    }))
-    def test_build_search_index(self, mock_map_n_grams, mock_preprocess_init, mock_file, mock_getsize, mock_exists):
+    @patch("task_implementation.Task_4_Search_Engine.PostingsIndex.from_sentences",
+           return_value=PostingsIndex.from_sentences([["harry", "potter", "was", "here"],
+                                                      ["welcome", "to", "hogwarts"],
+                                                      ["harry", "visited", "hogwarts"]]))
+    def test_build_search_index(self, mock_from_sentences, mock_preprocess_init, mock_file, mock_getsize, mock_exists):
         engine = SearchEngine(
             question_num=4,
             sentences_path="fake_sentences.csv",
@@ -57,6 +61,39 @@ class TestSearchEngine(unittest.TestCase):
 
         self.assertEqual(dict(result), expected)
 
+    @patch("os.path.exists", return_value=True)
+    @patch("os.path.getsize", return_value=100)
+    @patch("task_implementation.Task_4_Search_Engine.open", new_callable=mock_open,
+           read_data='{"keys": [["harry", "*"], ["hog*"], ["dumble*"]]}')
+    @patch("task_implementation.Task_4_Search_Engine.preprocess_init", return_value={
+        "Processed Sentences": [
+            ["harry", "potter", "was", "here"],
+            ["welcome", "to", "hogwarts"],
+            ["harry", "visited", "hogwarts"]
+        ]
+    })
+    @patch("task_implementation.Task_4_Search_Engine.PostingsIndex.from_sentences",
+           return_value=PostingsIndex.from_sentences([["harry", "potter", "was", "here"],
+                                                      ["welcome", "to", "hogwarts"],
+                                                      ["harry", "visited", "hogwarts"]]))
+    def test_wildcard_k_seqs(self, mock_from_sentences, mock_preprocess_init, mock_file, mock_getsize, mock_exists):
+        engine = SearchEngine(
+            question_num=4,
+            sentences_path="fake_sentences.csv",
+            stopwords_path="fake_stopwords.txt",
+            preprocess_path="fake_preprocessed.json",
+            k_seq_path="fake_k_seq.json"
+        )
+
+        result = engine.build_search_index()
+
+        expected = {
+            "harry *": [["harry", "potter", "was", "here"], ["harry", "visited", "hogwarts"]],
+            "hog*": [["harry", "visited", "hogwarts"], ["welcome", "to", "hogwarts"]]
+        }
+
+        self.assertEqual(dict(result), expected)
+
     @patch("os.path.exists", return_value=True)
     @patch("os.path.getsize", return_value=100)
     @patch("task_implementation.Task_4_Search_Engine.open", new_callable=mock_open,
@@ -68,11 +105,11 @@ class TestSearchEngine(unittest.TestCase):
             ["harry", "visited", "hogwarts"]
         ]
     })
-    @patch("task_implementation.Task_4_Search_Engine.map_n_grams", return_value=defaultdict(list, {
-        "harry potter": [["harry", "potter", "was", "here"]],
-        "hogwarts": [["harry", "visited", "hogwarts"], ["welcome", "to", "hogwarts"]]
-    }))
-    def test_no_matches(self, mock_map_n_grams, mock_preprocess_init, mock_file, mock_getsize, mock_exists):
+    @patch("task_implementation.Task_4_Search_Engine.PostingsIndex.from_sentences",
+           return_value=PostingsIndex.from_sentences([["harry", "potter", "was", "here"],
+                                                      ["welcome", "to", "hogwarts"],
+                                                      ["harry", "visited", "hogwarts"]]))
+    def test_no_matches(self, mock_from_sentences, mock_preprocess_init, mock_file, mock_getsize, mock_exists):
         engine = SearchEngine(
             question_num=4,
             sentences_path="fake_sentences.csv",
@@ -94,11 +131,11 @@ class TestSearchEngine(unittest.TestCase):
             ["harry", "visited", "hogwarts"]
         ]
     })
-    @patch("task_implementation.Task_4_Search_Engine.map_n_grams", return_value=defaultdict(set, {
-        "harry potter": {("harry", "potter", "was", "here")},
-        "hogwarts": {("harry", "visited", "hogwarts"), ("welcome", "to", "hogwarts")}
-    }))
-    def test_empty_k_seq(self, mock_map_n_grams, mock_preprocess_init, mock_file, mock_getsize, mock_exists):
+    @patch("task_implementation.Task_4_Search_Engine.PostingsIndex.from_sentences",
+           return_value=PostingsIndex.from_sentences([["harry", "potter", "was", "here"],
+                                                      ["welcome", "to", "hogwarts"],
+                                                      ["harry", "visited", "hogwarts"]]))
+    def test_empty_k_seq(self, mock_from_sentences, mock_preprocess_init, mock_file, mock_getsize, mock_exists):
         engine = SearchEngine(
             question_num=4,
             sentences_path="fake_sentences.csv",
@@ -114,6 +151,23 @@ class TestSearchEngine(unittest.TestCase):
         }
         self.assertEqual(result, expected)
 
+    def test_batch_search_matches_per_k_seq_sort(self):
+        rng = random.Random(0)
+        words = ["harry", "ron", "hermione", "snape", "dobby", "hagrid"]
+        sentences = [[rng.choice(words) for _ in range(rng.randint(1, 5))] for _ in range(300)]
+        engine = SearchEngine(k_seq_list={"keys": []}, data={"Processed Sentences": sentences})
+        # Rare K-seqs are sorted by rank, frequent ones read from the alphabetical order, repeats answered once
+        k_seqs = [["harry"], ["ron", "dobby"], ["snape", "snape", "hagrid"], ["harry"], ["nobody"], ["h*"]]
+        index = engine.get_sentence_index()
+        expected = {}
+        for k_seq in k_seqs:
+            k_seq_text = " ".join(k_seq)
+            sentence_ids = index.pattern_ids(k_seq_text)
+            if sentence_ids:
+                expected[k_seq_text] = sorted((list(index.sentences[sentence_id]) for sentence_id in sentence_ids),
+                                              key=lambda x: " ".join(x))
+        self.assertEqual(engine.search(k_seqs), expected)
+
     @patch("os.path.exists", return_value=True)
     @patch("builtins.open", new_callable=mock_open, read_data='["harry", "potter"]')
     @patch("utils.helper.preprocess_init", return_value={
@@ -154,5 +208,95 @@ class TestSearchEngine(unittest.TestCase):
         self.assertEqual(cm.exception.code, 1)
 
 
+
+class TestShardedSearchEngine(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(1)
+        words = ["harry", "ron", "hermione", "snape", "dobby", "hagrid"]
+        sentences = {}  # Distinct sentences, so that the shards count each sentence once, as one index does
+        while len(sentences) < 300:
+            sentences[tuple(rng.choice(words) for _ in range(rng.randint(1, 6)))] = None
+        sentences = [list(sentence) for sentence in sentences]
+        self.corpora = [sentences[:150], sentences[150:]]
+        self.work_dir = tempfile.TemporaryDirectory()
+        self.corpus_paths = []
+        for number, corpus in enumerate(self.corpora):
+            path = os.path.join(self.work_dir.name, f"corpus{number}.json")
+            with open(path, "w") as file:
+                json.dump({"Question 1": {"Processed Sentences": corpus, "Processed Names": []}}, file)
+            self.corpus_paths.append(path)
+        self.k_seq_list = {"keys": [["harry"], ["ron", "dobby"], ["h*"], ["nobody"]],
+                           "queries": ["snape AND NOT ron", "hagrid WITHIN 0 dobby"]}
+
+    def tearDown(self):
+        self.work_dir.cleanup()
+
+    def test_shards_match_one_index(self):
+        for top_k in (None, 3):
+            expected = SearchEngine(k_seq_list=self.k_seq_list, top_k=top_k,
+                                    data={"Processed Sentences": self.corpora[0] + self.corpora[1]}).generate_results()
+            for shard_count, processes in ((1, False), (3, False), (2, True)):
+                engine = ShardedSearchEngine(k_seq_list=self.k_seq_list, corpus_paths=self.corpus_paths,
+                                             top_k=top_k, shard_count=shard_count, processes=processes)
+                try:
+                    self.assertEqual(engine.generate_results(), expected)
+                finally:
+                    engine.close()
+
+    def test_each_corpus_loaded_once(self):
+        import task_implementation.Task_4_Search_Engine as search_module
+        from Utilities.cache import configure_cache
+        configure_cache(os.path.join(self.work_dir.name, "cache"))
+        try:
+            for built in (6, 0):  # The second engine reads the index of every shard from the cache
+                with patch.object(search_module, "preprocess_init", wraps=search_module.preprocess_init) as load, \
+                        patch.object(PostingsIndex, "from_sentences", wraps=PostingsIndex.from_sentences) as build:
+                    engine = ShardedSearchEngine(k_seq_list=self.k_seq_list, corpus_paths=self.corpus_paths,
+                                                 shard_count=3)
+                try:
+                    self.assertEqual(load.call_count, 2)
+                    self.assertEqual(build.call_count, built)
+                    self.assertEqual([len(shard.data["Processed Sentences"]) for shard in engine.shards], [50] * 6)
+                    self.assertEqual(engine.shards[4].data["Processed Sentences"], self.corpora[1][50:100])
+                finally:
+                    engine.close()
+        finally:
+            configure_cache(None)
+
+
+class TestRawText(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.TemporaryDirectory()
+        self.sentences_path = os.path.join(self.work_dir.name, "sentences.csv")
+        self.stopwords_path = os.path.join(self.work_dir.name, "stopwords.csv")
+        with open(self.sentences_path, "w") as file:
+            file.write('sentence\n"Harry, said Ron."\nThe end!\n"Harry said\nRon"\n...\nThe END\n')
+        with open(self.stopwords_path, "w") as file:
+            file.write("the\n")
+
+    def tearDown(self):
+        self.work_dir.cleanup()
+
+    def test_original_sentences(self):
+        from task_implementation.Task_1_Preprocessing import Preprocessing
+        from Utilities.raw_text import write_offsets
+        processor = Preprocessing(sentences_path=self.sentences_path, stopwords_path=self.stopwords_path,
+                                  record_offsets=True)
+        sentences = processor.preprocess_sentences()
+        offsets_path = os.path.join(self.work_dir.name, "output.json.offsets")
+        write_offsets(offsets_path, self.sentences_path, "sentence", processor.sentence_offsets)
+
+        engine = SearchEngine(k_seq_list={"keys": [["harry", "said"], ["end"]], "queries": ["ron AND NOT said"]},
+                              data={"Processed Sentences": sentences}, raw_offsets_path=offsets_path)
+        results = engine.generate_results()["Question 4"]
+        self.assertEqual(results["K-Seq Matches"], [["end", [["end"]]],
+                                                    ["harry said", [["harry", "said", "ron"]]]])
+        # A repeated sentence is read at its first position in the corpus
+        self.assertEqual(results["K-Seq Original Sentences"], [["end", ["The end!"]],
+                                                               ["harry said", ["Harry, said Ron."]]])
+        self.assertEqual(results["Query Original Sentences"], [["ron AND NOT said", []]])
+
 if __name__ == "__main__":
     unittest.main()
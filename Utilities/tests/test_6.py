@@ -1,6 +1,10 @@
+import os
+import random
+import tempfile
 import unittest
 from unittest.mock import patch
-from task_implementation.Task_6_Direct_Connections import DirectConnections, PersonNode
+from task_implementation.Task_6_Direct_Connections import DirectConnections, PersonNode, \
+    SavedDirectConnections
 
 
 class TestDirectConnections(unittest.TestCase):
@@ -161,6 +165,49 @@ class TestDirectConnections(unittest.TestCase):
         }
         self.assertEqual(result, expected)
 
+    def test_sweep_matches_single_runs(self):
+        rng = random.Random(0)
+        names = ["harry", "ron", "hermione", "snape", "dobby"]
+        sentences = [rng.sample(names + ["the", "castle", "wand"], rng.randint(0, 3)) or ["nothing"]
+                     for _ in range(60)]
+        data = {"Processed Sentences": sentences, "Processed Names": [[[name], []] for name in names]}
+        window_sizes, thresholds = [3, 0, 1, 7], [0, 2, 5, 61]
+
+        result = DirectConnections(question_num=6, data=data, window_sizes=window_sizes,
+                                   thresholds=thresholds).generate_results()
+        expected = [[window_size, threshold,
+                     DirectConnections(question_num=6, data=data, window_size=window_size,
+                                       threshold=threshold).generate_results()["Question 6"]["Pair Matches"]]
+                    for window_size in window_sizes for threshold in thresholds]
+        self.assertEqual(result, {"Question 6": {"Sweep Matches": expected}})
+        self.assertTrue(any(matches for _, _, matches in expected))
+
+    def test_saved_counts(self):
+        data = {"Processed Sentences": [['harry', 'ron'], ['snape'], ['harry', 'ron', 'snape'], ['dobby'], ['harry']],
+                "Processed Names": [[[name], []] for name in ["harry", "ron", "snape", "dobby"]]}
+        dc = DirectConnections(question_num=6, data=data, window_size=2, threshold=1, top_neighbors=2)
+        result = dc.generate_results()["Question 6"]
+        self.assertEqual(result["Top Neighbors"][0], [['dobby'], [[['harry'], 2], [['ron'], 1]]])
+        self.assertEqual(result["Top Neighbors"][1], [['harry'], [[['ron'], 3], [['snape'], 3]]])
+
+        with tempfile.TemporaryDirectory() as work_dir:
+            counts_path = os.path.join(work_dir, "task6.counts")
+            dc.save_counts(counts_path)
+            for threshold in (0, 2, 3, 6):
+                expected = DirectConnections(question_num=6, data=data, window_size=2,
+                                             threshold=threshold).generate_results()
+                saved = SavedDirectConnections(question_num=6, counts_path=counts_path, threshold=threshold)
+                self.assertEqual(saved.generate_results(), expected)
+            saved = SavedDirectConnections(question_num=6, counts_path=counts_path, thresholds=[1, 3], top_neighbors=2)
+            saved_result = saved.generate_results()["Question 6"]
+        self.assertEqual(saved_result["Top Neighbors"], result["Top Neighbors"])
+        self.assertEqual(saved_result["Sweep Matches"][0], [2, 1, result["Pair Matches"]])
+
+    def test_sweep_invalid_window_size(self):
+        with self.assertRaises(SystemExit):
+            DirectConnections(question_num=6, data={"Processed Sentences": [['harry']], "Processed Names": []},
+                              window_sizes=[1, 2], threshold=1)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,6 +1,10 @@
+import os
+import random
+import tempfile
 import unittest
 from unittest.mock import patch, mock_open
-from task_implementation.Task_7_8_Indirect_Connections import IndirectPaths
+from task_implementation.Task_7_8_Indirect_Connections import IndirectPaths, DistanceMatrix
+from Utilities.graph import CSRGraph
 
 
 class TestIndirectPaths(unittest.TestCase):
@@ -245,6 +249,224 @@ class TestIndirectPaths(unittest.TestCase):
         }
         self.assertEqual(result, expected)
 
+    @patch('builtins.open', new_callable=mock_open, read_data='{"keys": []}')
+    @patch('task_implementation.Task_6_Direct_Connections.preprocess_init', return_value={
+        "Processed Sentences": [],
+        "Processed Names": []
+    })
+    def test_bidirectional_bfs_distance(self, mock_preprocess, mock_file):
+        indirect_paths = IndirectPaths(
+            question_num=7,
+            sentences_path="fake_sentences.csv",
+            people_path="fake_people.csv",
+            stopwords_path="fake_stopwords.txt",
+            window_size=0,
+            threshold=1,
+            people_connections_path="fake_people_connections.json",
+            maximal_distance=2
+        )
+        # a - b - c - d - e chain with a shortcut b - d, and an isolated f - g edge
+        indirect_paths.graph = CSRGraph.from_edges([("a", "b"), ("b", "c"), ("b", "d"), ("c", "d"), ("d", "e"),
+                                                    ("f", "g")])
+
+        for start in "abcdefg":
+            distances = indirect_paths.bfs_shortest_paths(start)
+            for end in "abcdefg":
+                expected = distances.get(end, float('inf'))
+                self.assertEqual(indirect_paths.bidirectional_bfs_distance(start, end, 10), expected)
+
+        self.assertEqual(indirect_paths.bidirectional_bfs_distance("a", "e", 3), 3)
+        self.assertEqual(indirect_paths.bidirectional_bfs_distance("a", "e", 2), float('inf'))
+        self.assertEqual(indirect_paths.bidirectional_bfs_distance("a", "f", 10), float('inf'))
+
+    def test_distance_matrix_build_save_load(self):
+        graph = CSRGraph.from_edges([("a", "b"), ("b", "c"), ("d", "e")])
+        matrix = DistanceMatrix.build(graph)
+
+        self.assertEqual(matrix.distances.typecode, 'B')
+        self.assertEqual(matrix.distance("a", "a"), 0)
+        self.assertEqual(matrix.distance("a", "c"), 2)
+        self.assertEqual(matrix.distance("c", "a"), 2)
+        self.assertEqual(matrix.distance("a", "d"), float('inf'))
+        self.assertEqual(matrix.distance("a", "unknown"), float('inf'))
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "graph.distances")
+            matrix.save(path, digest="abc")
+            loaded = DistanceMatrix.load(path, digest="abc")
+            self.assertEqual(loaded.names, matrix.names)
+            self.assertEqual(loaded.distances, matrix.distances)
+            self.assertIsNone(DistanceMatrix.load(path, digest="other graph"))
+
+    def test_graph_from_saved_counts(self):
+        from task_implementation.Task_6_Direct_Connections import DirectConnections
+        data = {"Processed Sentences": [["harry", "ron"], ["ron", "snape"], ["harry", "ron"], ["snape", "dobby"]],
+                "Processed Names": [[[name], []] for name in ["harry", "ron", "snape", "dobby"]]}
+        pairs = [["harry", "snape"], ["harry", "dobby"], ["ron", "dobby"]]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            counts_path = os.path.join(tmp_dir, "task6.counts")
+            DirectConnections(question_num=6, data=data, window_size=1, threshold=1).save_counts(counts_path)
+            for threshold in (1, 2):
+                direct_connections = DirectConnections(question_num=6, data=data, window_size=1, threshold=threshold)
+                expected = IndirectPaths(question_num=7, maximal_distance=2, people_pairs=pairs,
+                                         direct_connections=direct_connections).generate_results_task_7()
+                result = IndirectPaths(question_num=7, maximal_distance=2, people_pairs=pairs, threshold=threshold,
+                                       counts_path=counts_path).generate_results_task_7()
+                self.assertEqual(result, expected)
+                if threshold == 1:
+                    self.assertEqual(result["Question 7"]["Pair Matches"],
+                                     [["dobby", "harry", False], ["dobby", "ron", True], ["harry", "snape", True]])
+
+    @patch('builtins.open', new_callable=mock_open, read_data='{"keys": []}')
+    @patch('task_implementation.Task_6_Direct_Connections.preprocess_init', return_value={
+        "Processed Sentences": [],
+        "Processed Names": []
+    })
+    def test_exact_paths_on_cycle(self, mock_preprocess, mock_file):
+        indirect_paths = IndirectPaths(
+            question_num=8,
+            sentences_path="fake_sentences.csv",
+            people_path="fake_people.csv",
+            stopwords_path="fake_stopwords.txt",
+            window_size=0,
+            threshold=1,
+            people_connections_path="fake_people_connections.json",
+            K=1
+        )
+        # Cycle of 12 people: the only simple paths between p0 and p{j} have lengths j and 12 - j
+        size = 12
+        indirect_paths.graph = CSRGraph.from_edges((f"p{i}", f"p{(i + 1) % size}") for i in range(size))
+
+        for budget in (20000, 0):  # The default DFS, then a DFS that immediately hands over to meet-in-the-middle
+            with patch('task_implementation.Task_7_8_Indirect_Connections.DFS_EXPANSION_BUDGET', budget):
+                for K in range(0, size + 1):
+                    indirect_paths.K = K
+                    for j in range(size):
+                        expected = K in (j, size - j) if j else K == 0
+                        self.assertEqual(indirect_paths.dfs_exact_paths("p0", f"p{j}"), expected, (budget, K, j))
+
+    @patch('builtins.open', new_callable=mock_open,
+           read_data='{"keys": [["a", "b"], ["a", "c"], ["a", "a"], ["a", "z"]]}')
+    @patch('task_implementation.Task_6_Direct_Connections.preprocess_init', return_value={
+        "Processed Sentences": [],
+        "Processed Names": []
+    })
+    def test_task_8_walks(self, mock_preprocess, mock_file):
+        indirect_paths = IndirectPaths(
+            question_num=8,
+            sentences_path="fake_sentences.csv",
+            people_path="fake_people.csv",
+            stopwords_path="fake_stopwords.txt",
+            window_size=0,
+            threshold=1,
+            people_connections_path="fake_people_connections.json",
+            K=3,
+            walks=True
+        )
+        indirect_paths.graph = CSRGraph.from_edges([("a", "b"), ("b", "c")])  # a - b - c
+
+        result = indirect_paths.generate_results_task_8()
+        # a-b-a-b has length 3, while walks from a to a or c always have an even length
+        expected = {
+            "Question 8": {
+                "Pair Matches": [
+                    ["a", "a", False], ["a", "b", True], ["a", "c", False], ["a", "z", False]
+                ]
+            }
+        }
+        self.assertEqual(result, expected)
+
+        indirect_paths.K = 4
+        self.assertEqual(indirect_paths.find_fixed_length_walks(),
+                         [["a", "a", True], ["a", "b", False], ["a", "c", True], ["a", "z", False]])
+
+
+    @staticmethod
+    def indirect_paths_on(graph: CSRGraph, **options) -> IndirectPaths:
+        """ An IndirectPaths instance searching a given graph. """
+        with patch('task_implementation.Task_6_Direct_Connections.preprocess_init',
+                   return_value={"Processed Sentences": [], "Processed Names": []}):
+            indirect_paths = IndirectPaths(sentences_path="fake_sentences.csv", people_path="fake_people.csv",
+                                           stopwords_path="fake_stopwords.txt", window_size=0, threshold=1, **options)
+        indirect_paths.graph = graph
+        return indirect_paths
+
+    def test_components_prune_searches(self):
+        rng = random.Random(3)
+        names = [f"p{i}" for i in range(14)]
+        pairs = [sorted(rng.sample(names, 2)) for _ in range(30)] + [["p0", "p1"], ["p0", "p2"], ["p0", "p3"]]
+
+        def simple_path_lengths(graph: CSRGraph, start: int, end: int) -> set:
+            lengths = set()
+
+            def extend(node: int, visited: set):
+                for neighbor in graph.neighbors(node):
+                    if neighbor == end:
+                        lengths.add(len(visited))
+                    elif neighbor not in visited:
+                        extend(neighbor, visited | {neighbor})
+
+            extend(start, {start})
+            return lengths
+
+        for _ in range(20):
+            # Several components, some of them bipartite
+            edges = [tuple(rng.sample(names[:7], 2)) for _ in range(6)]
+            edges += [(f"p{7 + 2 * i}", f"p{8 + 2 * j + 1}") for i in range(3) for j in range(3) if rng.random() < 0.6]
+            graph = CSRGraph.from_edges(edges)
+            index = graph.index
+            distance_matrix = DistanceMatrix.build(graph)
+
+            task_7 = self.indirect_paths_on(graph, question_num=7, maximal_distance=2, people_pairs=pairs)
+            expected = [[person1, person2, 1 <= distance_matrix.distance(person1, person2) <= 2]
+                        for person1, person2 in pairs]
+            self.assertEqual(task_7.find_indirect_connections(), expected)
+
+            for K in range(0, 6):
+                task_8 = self.indirect_paths_on(graph, question_num=8, K=K, people_pairs=pairs)
+                expected = sorted([person1, person2, person1 in index and person2 in index and
+                                   K in simple_path_lengths(graph, index[person1], index[person2])]
+                                  for person1, person2 in pairs)
+                self.assertEqual(task_8.find_fixed_length_paths(), expected, (edges, K))
+
+    def test_meet_in_the_middle_on_dense_graphs(self):
+        rng = random.Random(7)
+        for _ in range(15):
+            names = [f"p{i}" for i in range(9)]
+            edges = {tuple(sorted(rng.sample(names, 2))) for _ in range(16)}
+            graph = CSRGraph.from_edges(edges)
+            adjacency = {name: set() for name in graph.names}
+            for name1, name2 in edges:
+                adjacency[name1].add(name2)
+                adjacency[name2].add(name1)
+
+            def lengths_from(path: list) -> set:
+                """ The lengths of the simple paths extending path to each node, as (node, length). """
+                found = {(path[-1], len(path) - 1)}
+                for neighbor in adjacency[path[-1]] - set(path):
+                    found |= lengths_from(path + [neighbor])
+                return found
+
+            pairs = [sorted(rng.sample(graph.names, 2)) for _ in range(6)]
+            with patch('task_implementation.Task_7_8_Indirect_Connections.DFS_EXPANSION_BUDGET', 0), \
+                    patch('task_implementation.Task_7_8_Indirect_Connections.MEET_IN_THE_MIDDLE_MIN_K', 2):
+                for K in range(2, 9):
+                    task_8 = self.indirect_paths_on(graph, question_num=8, K=K, people_pairs=pairs)
+                    expected = sorted([person1, person2, (person2, K) in lengths_from([person1])]
+                                      for person1, person2 in pairs)
+                    self.assertEqual(task_8.find_fixed_length_paths(), expected, (sorted(edges), K))
+
+    def test_repeated_person_beyond_maximal_distance(self):
+        # A path a - b - c - d - e, with a in several pairs of its component
+        graph = CSRGraph.from_edges([("a", "b"), ("b", "c"), ("c", "d"), ("d", "e")])
+        pairs = [["a", "b"], ["a", "c"], ["a", "d"], ["a", "e"]]
+        task_7 = self.indirect_paths_on(graph, question_num=7, maximal_distance=2, people_pairs=pairs)
+        self.assertEqual(task_7.find_indirect_connections(),
+                         [["a", "b", True], ["a", "c", True], ["a", "d", False], ["a", "e", False]])
+        # The kept search of a stopped at maximal_distance, it only holds the nodes it reached
+        self.assertEqual(task_7.near_distances, {(graph.index["a"], 2): {graph.index["a"]: 0, graph.index["b"]: 1,
+                                                                          graph.index["c"]: 2}})
+
 
 if __name__ == '__main__':
     unittest.main()
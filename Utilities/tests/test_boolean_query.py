@@ -0,0 +1,87 @@
+import random
+import unittest
+from Utilities.boolean_query import ListCursor, QueryEvaluator, QuerySyntaxError, filter_ids, parse_query
+from Utilities.postings import PostingCursor, PostingList, PostingsIndex
+
+
+class TestQueryParser(unittest.TestCase):
+
+    def test_parse(self):
+        self.assertEqual(parse_query('"Harry Potter" AND (hogwarts OR ron) AND NOT voldemort'),
+                         ("and", [("term", "harry potter"), ("or", [("term", "hogwarts"), ("term", "ron")]),
+                                  ("not", ("term", "voldemort"))]))
+        # Implicit AND, and WITHIN binding tighter than AND
+        self.assertEqual(parse_query("harry ron WITHIN 2 snape OR dobby"),
+                         ("or", [("and", [("term", "harry"), ("within", 2, ("term", "ron"), ("term", "snape"))]),
+                                 ("term", "dobby")]))
+
+    def test_syntax_errors(self):
+        for query in ["", "harry AND", "(harry", "harry)", 'say "hello', "harry WITHIN ron", 'harry OR ""']:
+            with self.assertRaises(QuerySyntaxError):
+                parse_query(query)
+
+
+class TestIntersection(unittest.TestCase):
+
+    def test_list_cursor_gallops(self):
+        ids = list(range(0, 3000, 3))
+        cursor = ListCursor(ids)
+        self.assertEqual([cursor.next_geq(target) for target in (0, 1, 700, 700, 2998)], [0, 3, 702, 702, None])
+
+    def test_filter_ids_matches_sets(self):
+        rng = random.Random(0)
+        for _ in range(40):
+            # Few candidates gallop through the operand, many are checked against its decoded ids
+            candidates = sorted(rng.sample(range(5000), rng.choice([rng.randint(1, 20), rng.randint(500, 2000)])))
+            ids = sorted(rng.sample(range(5000), rng.randint(1000, 3000)))
+            posting = PostingList()
+            for sentence_id in ids:
+                posting.append(sentence_id)
+            for cursor in (PostingCursor(posting), ListCursor(ids)):
+                self.assertEqual(filter_ids(candidates, cursor, keep=True), sorted(set(candidates) & set(ids)))
+            for cursor in (PostingCursor(posting), ListCursor(ids)):
+                self.assertEqual(filter_ids(candidates, cursor, keep=False), sorted(set(candidates) - set(ids)))
+
+
+class TestQueryEvaluator(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(1)
+        words = ["harry", "ron", "hermione", "snape", "dobby"]
+        self.sentences = [[rng.choice(words) for _ in range(rng.randint(1, 4))] for _ in range(300)]
+        self.evaluator = QueryEvaluator(PostingsIndex.from_sentences(self.sentences))
+
+    def matching(self, predicate) -> list:
+        """ The distinct sentences satisfying a predicate of (position, words), in order of first appearance. """
+        matches = []
+        for position, sentence in enumerate(self.sentences):
+            if predicate(position, sentence) and tuple(sentence) not in matches:
+                matches.append(tuple(sentence))
+        return sorted(matches, key=self.evaluator.index.sentence_ids.get)
+
+    def test_boolean_operators(self):
+        def has(sentence, k_seq):
+            return f" {k_seq} " in f" {' '.join(sentence)} "
+
+        self.assertEqual(self.evaluator.search('harry AND ron AND NOT "snape dobby"'),
+                         self.matching(lambda _, s: has(s, "harry") and has(s, "ron") and not has(s, "snape dobby")))
+        self.assertEqual(self.evaluator.search("(hermione OR dobby) NOT harry"),
+                         self.matching(lambda _, s: (has(s, "hermione") or has(s, "dobby")) and not has(s, "harry")))
+        self.assertEqual(self.evaluator.search("NOT ron"), self.matching(lambda _, s: not has(s, "ron")))
+        self.assertEqual(self.evaluator.search("nobody OR harry"), self.evaluator.index.lookup("harry"))
+
+    def test_wildcards(self):
+        self.assertEqual(self.evaluator.search("h*"), self.evaluator.search("harry OR hermione"))
+        self.assertEqual(self.evaluator.search('"harry *" AND NOT h*e'),
+                         self.matching(lambda _, s: "harry" in s[:-1] and "hermione" not in s))
+
+    def test_within(self):
+        snape = [position for position, sentence in enumerate(self.sentences) if "snape" in sentence]
+        for distance in (0, 2):
+            self.assertEqual(self.evaluator.search(f'"harry ron" WITHIN {distance} snape'),
+                             self.matching(lambda position, s: " harry ron " in f" {' '.join(s)} " and
+                                           any(abs(position - other) <= distance for other in snape)))
+
+
+if __name__ == '__main__':
+    unittest.main()
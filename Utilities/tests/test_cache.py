@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+import Utilities.cache as cache_module
+from Utilities.cache import ArtifactCache, cached, configure_cache
+
+
+class TestArtifactCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmp_dir.name, "cache")
+        self.input_path = os.path.join(self.tmp_dir.name, "sentences.csv")
+        with open(self.input_path, "w") as file:
+            file.write("sentence\nharry potter\n")
+
+    def tearDown(self):
+        configure_cache(None)
+        self.tmp_dir.cleanup()
+
+    def test_key_depends_on_content_and_params(self):
+        cache = ArtifactCache(self.cache_dir)
+        key = cache.make_key("preprocess", [self.input_path, None], {"N": 2})
+
+        self.assertEqual(key, cache.make_key("preprocess", [self.input_path, None], {"N": 2}))
+        self.assertNotEqual(key, cache.make_key("preprocess", [self.input_path, None], {"N": 3}))
+        self.assertNotEqual(key, cache.make_key("n_grams", [self.input_path, None], {"N": 2}))
+
+        with open(self.input_path, "a") as file:
+            file.write("ron weasley\n")
+        self.assertNotEqual(key, cache.make_key("preprocess", [self.input_path, None], {"N": 2}))
+
+        self.assertIsNone(cache.make_key("preprocess", [None, None]))  # No input file to key on
+        self.assertIsNone(cache.make_key("preprocess", [os.path.join(self.tmp_dir.name, "missing.csv")]))
+
+    def test_put_get(self):
+        cache = ArtifactCache(self.cache_dir)
+        cache.put("key", {"Processed Sentences": [["harry", "potter"]]})
+
+        self.assertEqual(cache.get("key"), {"Processed Sentences": [["harry", "potter"]]})
+        self.assertIsNone(cache.get("other key"))
+        self.assertEqual([name for name in os.listdir(self.cache_dir) if name.endswith(".tmp")], [])
+
+    def test_lru_eviction(self):
+        cache = ArtifactCache(self.cache_dir, max_bytes=10 ** 9)
+        for key in ("first", "second", "third"):
+            cache.put(key, "x" * 1000)
+        os.utime(cache.entry_path("first"), ns=(0, 0))
+        os.utime(cache.entry_path("second"), ns=(1, 1))
+        cache.get("first")  # Reading an entry makes it the most recently used
+
+        cache.max_bytes = 2500
+        cache.evict()
+
+        self.assertIsNotNone(cache.get("first"))
+        self.assertIsNone(cache.get("second"))
+        self.assertIsNotNone(cache.get("third"))
+
+    def test_cached_computes_once(self):
+        compute = MagicMock(return_value=[["harry", "potter"]])
+
+        self.assertEqual(cached("preprocess", [self.input_path], {}, compute), [["harry", "potter"]])
+        self.assertEqual(compute.call_count, 1)  # No active cache, always computed
+
+        configure_cache(self.cache_dir)
+        cached("preprocess", [self.input_path], {}, compute)
+        result = cached("preprocess", [self.input_path], {}, compute)
+        self.assertEqual(result, [["harry", "potter"]])
+        self.assertEqual(compute.call_count, 2)
+        self.assertIsNotNone(cache_module.active_cache)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+import os
+import pickle
+import random
+import tempfile
+import unittest
+from Utilities.graph import Components, CSRGraph, WeightedCSRGraph
+
+
+class TestCSRGraph(unittest.TestCase):
+
+    def test_from_edges(self):
+        graph = CSRGraph.from_edges([("ron", "harry"), ("harry", "hermione"), ("hermione", "harry"),
+                                     ("draco", "draco")])
+
+        self.assertEqual(graph.names, ["harry", "hermione", "ron"])  # Self loops do not create nodes
+        self.assertEqual(len(graph), 3)
+        self.assertIn("harry", graph)
+        self.assertNotIn("draco", graph)
+        self.assertEqual(list(graph.offsets), [0, 2, 3, 4])
+        self.assertEqual(list(graph.neighbors(graph.index["harry"])), [1, 2])
+        self.assertEqual(graph.degree(graph.index["ron"]), 1)
+        self.assertEqual(graph.edges(), [(0, 1), (0, 2)])
+
+    def test_neighbors_share_targets(self):
+        graph = WeightedCSRGraph.from_counts({("harry", "ron"): 2, ("harry", "hermione"): 1})
+        neighbors = graph.neighbors(graph.index["harry"])
+        self.assertIsInstance(neighbors, memoryview)  # A view of targets, not a copy
+        self.assertTrue(neighbors.readonly)
+        restored = pickle.loads(pickle.dumps(graph))  # As the artifact cache stores it
+        self.assertEqual(list(restored.neighbors(restored.index["harry"])), list(neighbors))
+        self.assertEqual(list(restored.neighbor_weights(restored.index["harry"])), [1, 2])
+
+    def test_from_pair_matches(self):
+        pair_matches = [[["harry", "potter"], ["ron", "weasley"]], [["hermione", "granger"], ["ron", "weasley"]]]
+        graph = CSRGraph.from_pair_matches(pair_matches)
+
+        ron = graph.index["ron weasley"]
+        self.assertEqual(sorted(graph.names[node] for node in graph.neighbors(ron)),
+                         ["harry potter", "hermione granger"])
+
+    def test_empty_graph(self):
+        graph = CSRGraph.from_edges([])
+
+        self.assertEqual(len(graph), 0)
+        self.assertFalse(graph)
+        self.assertEqual(list(graph.offsets), [0])
+
+
+class TestWeightedCSRGraph(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = WeightedCSRGraph.from_counts({("harry", "ron"): 5, ("harry", "hermione"): 9, ("ron", "snape"): 1,
+                                                   ("draco", "draco"): 3, ("dobby", "harry"): 0},
+                                                  {"window_size": 2})
+
+    def test_from_counts(self):
+        graph = self.graph
+        self.assertEqual(graph.names, ["harry", "hermione", "ron", "snape"])  # No self loops or empty counts
+        harry = graph.index["harry"]
+        self.assertEqual(list(graph.neighbors(harry)), [1, 2])
+        self.assertEqual(list(graph.neighbor_weights(harry)), [9, 5])
+        self.assertEqual(graph.weighted_edges(), [("harry", "hermione", 9), ("harry", "ron", 5), ("ron", "snape", 1)])
+        self.assertEqual(graph.edges_at_least(5), [("harry", "hermione"), ("harry", "ron")])
+        self.assertEqual(graph.top_neighbors(graph.index["ron"], 1), [(harry, 5)])
+
+    def test_save_load(self):
+        with tempfile.TemporaryDirectory() as work_dir:
+            path = os.path.join(work_dir, "graph.counts")
+            self.graph.save(path)
+            loaded = WeightedCSRGraph.load(path)
+            with open(path, "r+b") as file:
+                file.truncate(os.path.getsize(path) - 4)
+            with self.assertRaises(EOFError):
+                WeightedCSRGraph.load(path)
+
+        self.assertEqual(loaded.names, self.graph.names)
+        self.assertEqual(loaded.info, {"window_size": 2})
+        self.assertEqual(loaded.weighted_edges(), self.graph.weighted_edges())
+        self.assertEqual(loaded.edges(), self.graph.edges())
+
+
+
+class TestComponents(unittest.TestCase):
+
+    def test_components_and_bipartiteness(self):
+        rng = random.Random(0)
+        for _ in range(50):
+            size = rng.randint(2, 20)
+            edges = [(f"p{rng.randrange(size)}", f"p{rng.randrange(size)}") for _ in range(rng.randint(1, size + 3))]
+            graph = CSRGraph.from_edges(edges)
+            components = Components(graph)
+
+            # Brute force: BFS coloring of each component
+            colors, labels, bipartite = {}, {}, []
+            for source in range(len(graph)):
+                if source in colors:
+                    continue
+                colors[source], labels[source] = 0, len(bipartite)
+                bipartite.append(True)
+                frontier = [source]
+                while frontier:
+                    node = frontier.pop()
+                    for neighbor in graph.neighbors(node):
+                        if neighbor not in colors:
+                            colors[neighbor], labels[neighbor] = colors[node] ^ 1, labels[source]
+                            frontier.append(neighbor)
+                        elif colors[neighbor] == colors[node]:
+                            bipartite[labels[source]] = False
+
+            self.assertEqual(list(components.labels), [labels[node] for node in range(len(graph))])
+            self.assertEqual(list(components.bipartite), bipartite)
+            self.assertEqual(list(components.sizes), [list(labels.values()).count(label)
+                                                      for label in range(len(bipartite))])
+            for node1 in range(len(graph)):
+                for node2 in range(len(graph)):
+                    self.assertEqual(components.connected(node1, node2), labels[node1] == labels[node2])
+                    if labels[node1] == labels[node2] and bipartite[labels[node1]]:
+                        same_color = colors[node1] == colors[node2]
+                        self.assertEqual(components.parity_allows(node1, node2, 2), same_color)
+                        self.assertEqual(components.parity_allows(node1, node2, 3), not same_color)
+
+    def test_odd_cycle(self):
+        graph = CSRGraph.from_edges([("a", "b"), ("b", "c"), ("c", "a"), ("d", "e")])
+        components = Components(graph)
+
+        self.assertEqual(list(components.labels), [0, 0, 0, 1, 1])
+        self.assertEqual(list(components.bipartite), [0, 1])
+        self.assertTrue(components.parity_allows(0, 1, 2))  # a - c - b
+        self.assertFalse(components.parity_allows(3, 4, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,164 @@
+import os
+import tempfile
+import unittest
+from task_implementation.Task_2_Counting_Seq import SequenceCounter
+from task_implementation.Task_6_Direct_Connections import DirectConnections
+from Utilities.incremental import IncrementalCorpus
+
+SENTENCES = [
+    "Harry Potter met Ron Weasley.",
+    "The train left.",
+    "Ron Weasley and Hermione Granger argued.",
+    "",
+    "Draco Malfoy laughed at Harry.",
+    "Hermione read a book.",
+    "Harry, Ron and Hermione went to Hogwarts.",
+]
+
+
+class TestIncrementalCorpus(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.sentences_path = self.path("sentences.csv")
+        self.people_path = self.path("people.csv")
+        self.stopwords_path = self.path("stopwords.csv")
+        with open(self.people_path, "w") as file:
+            file.write("Name,Other Names\nHarry Potter,\nRon Weasley,\nHermione Granger,\nDraco Malfoy,\n")
+        with open(self.stopwords_path, "w") as file:
+            file.write("the\nand\na\nat\nto\n")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory.name, name)
+
+    def write_sentences(self, sentences, mode="w"):
+        with open(self.sentences_path, mode) as file:
+            if mode == "w":
+                file.write("sentence\n")
+            for sentence in sentences:
+                file.write(f'"{sentence}"\n')
+
+    def test_append_matches_full_rebuild(self):
+        for split in range(len(SENTENCES) + 1):
+            self.write_sentences(SENTENCES[:split])
+            corpus = IncrementalCorpus(self.sentences_path, self.people_path, self.stopwords_path, N=2, window_size=2)
+            corpus.update()
+            corpus.save(self.path("state.pkl"))
+
+            self.write_sentences(SENTENCES[split:], mode="a")
+            corpus = IncrementalCorpus.load(self.path("state.pkl"))
+            corpus.update()
+            self.assertEqual(corpus.update(), 0)  # Nothing new to read
+
+            data = corpus.data()
+            self.assertEqual(len(data["Processed Sentences"]), 6)  # The empty sentence is skipped
+            self.assertEqual(corpus.sequence_count_results(),
+                             SequenceCounter(N=2, data=data).generate_results())
+            for threshold in (1, 2):
+                self.assertEqual(corpus.pair_match_results(threshold),
+                                 DirectConnections(question_num=6, window_size=2, threshold=threshold,
+                                                   data=data).generate_results())
+            self.assertEqual(corpus.postings.lookup("harry potter"), [('harry', 'potter', 'met', 'ron', 'weasley')])
+
+    def assert_matches_rebuild(self, corpus: IncrementalCorpus):
+        data = corpus.data()
+        self.assertEqual(corpus.sequence_count_results(), SequenceCounter(N=2, data=data).generate_results())
+        self.assertEqual(corpus.pair_match_results(1),
+                         DirectConnections(question_num=6, window_size=2, threshold=1, data=data).generate_results())
+
+    def test_updates_are_appended_to_the_state(self):
+        state_path = self.path("state.pkl")
+        self.write_sentences(SENTENCES * 4)
+        corpus = IncrementalCorpus(self.sentences_path, self.people_path, self.stopwords_path, N=2, window_size=2)
+        corpus.update()
+        corpus.save(state_path)
+        with open(state_path, "rb") as file:
+            snapshot = file.read()
+
+        for sentence in SENTENCES:
+            self.write_sentences([sentence], mode="a")
+            corpus = IncrementalCorpus.load(state_path)
+            corpus.update()
+            corpus.save(state_path)
+            with open(state_path, "rb") as file:
+                self.assertTrue(file.read().startswith(snapshot))  # Only the update records were written
+        corpus = IncrementalCorpus.load(state_path)
+        self.assertEqual(len(corpus.processed_sentences), 30)
+        self.assert_matches_rebuild(corpus)
+
+        # Once the records would outweigh the snapshot, a new snapshot is written
+        for _ in range(10):
+            self.write_sentences(SENTENCES * 4, mode="a")
+            corpus.update()
+            corpus.save(state_path)
+        with open(state_path, "rb") as file:
+            self.assertFalse(file.read().startswith(snapshot))
+        self.assertLessEqual(corpus.state_bytes - corpus.snapshot_bytes, corpus.snapshot_bytes)
+        corpus = IncrementalCorpus.load(state_path)
+        self.assertEqual(len(corpus.processed_sentences), 270)
+        self.assert_matches_rebuild(corpus)
+
+    def test_cut_update_record_is_read_again(self):
+        state_path = self.path("state.pkl")
+        self.write_sentences(SENTENCES * 4)
+        corpus = IncrementalCorpus(self.sentences_path, self.people_path, self.stopwords_path, N=2, window_size=2)
+        corpus.update()
+        corpus.save(state_path)
+        self.write_sentences(SENTENCES[:3], mode="a")
+        corpus.update()
+        corpus.save(state_path)
+        with open(state_path, "r+b") as file:  # An update interrupted while writing its record
+            file.truncate(os.path.getsize(state_path) - 5)
+
+        corpus = IncrementalCorpus.load(state_path)
+        self.assertEqual(len(corpus.processed_sentences), 24)
+        self.assertEqual(corpus.update(), 3)
+        corpus.save(state_path)
+        corpus = IncrementalCorpus.load(state_path)
+        self.assertEqual(len(corpus.processed_sentences), 27)
+        self.assert_matches_rebuild(corpus)
+
+    def test_partial_row_is_read_later(self):
+        self.write_sentences(SENTENCES[:1])
+        with open(self.sentences_path, "a") as file:
+            file.write('"The train')
+        corpus = IncrementalCorpus(self.sentences_path, self.people_path, self.stopwords_path)
+        self.assertEqual(corpus.update(), 1)
+        with open(self.sentences_path, "a") as file:
+            file.write(' left."\n')
+        self.assertEqual(corpus.update(), 1)
+        self.assertEqual(corpus.processed_sentences[-1], ['train', 'left'])
+
+    def test_partial_multi_line_record_is_read_later(self):
+        self.write_sentences(SENTENCES[:1])
+        with open(self.sentences_path, "a") as file:
+            file.write('"Hermione read\n')  # A quoted line break, the record goes on
+        corpus = IncrementalCorpus(self.sentences_path, self.people_path, self.stopwords_path)
+        self.assertEqual(corpus.update(), 1)
+        with open(self.sentences_path, "a") as file:
+            file.write('a book."\n')
+        self.assertEqual(corpus.update(), 1)
+        self.assertEqual(corpus.processed_sentences[-1], ['hermione', 'read', 'book'])
+
+    def test_missing_sentence_column(self):
+        self.write_sentences(SENTENCES)
+        corpus = IncrementalCorpus(self.sentences_path, self.people_path, self.stopwords_path)
+        with open(self.sentences_path, "w") as file:  # Replaced before the first update
+            file.write("text\nHarry Potter met Ron Weasley.\n")
+        with self.assertRaises(SystemExit):
+            corpus.update()
+
+    def test_changed_people_file_requires_rebuild(self):
+        self.write_sentences(SENTENCES)
+        IncrementalCorpus(self.sentences_path, self.people_path, self.stopwords_path).save(self.path("state.pkl"))
+        with open(self.people_path, "a") as file:
+            file.write("Albus Dumbledore,\n")
+        with self.assertRaises(SystemExit):
+            IncrementalCorpus.load(self.path("state.pkl"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import io
+import json
+import unittest
+from Utilities.output import ResultWriter
+
+RESULTS = [
+    {"Question 2": {"2-Seq Counts": [["1_seq", [["harry", 2], ["ron", 1]]], ["2_seq", [["harry ron", 1]]]]}},
+    {"Question 4": {"K-Seq Matches": [["harry", [["harry", "ron"], ["harry"]]]]}},
+    {"Question 6": {"Pair Matches": []}},
+]
+
+
+class TestResultWriter(unittest.TestCase):
+
+    def write(self, **options) -> str:
+        file = io.StringIO()
+        with ResultWriter(file, **options) as writer:
+            for result in RESULTS:
+                writer.write(result)
+        return file.getvalue()
+
+    def test_indented_output_matches_json_dumps(self):
+        merged = {key: value for result in RESULTS for key, value in result.items()}
+        self.assertEqual(self.write(), json.dumps(merged, indent=4) + "\n")
+        self.assertEqual(self.write(indent=None), json.dumps(merged, separators=(",", ":")) + "\n")
+
+    def test_empty_output(self):
+        file = io.StringIO()
+        ResultWriter(file).close()
+        self.assertEqual(file.getvalue(), "{}\n")
+
+    def test_ndjson(self):
+        lines = [json.loads(line) for line in self.write(ndjson=True).splitlines()]
+        self.assertEqual(lines, [
+            {"Question 2": {"2-Seq Counts": [["1_seq", [["harry", 2], ["ron", 1]]]]}},
+            {"Question 2": {"2-Seq Counts": [["2_seq", [["harry ron", 1]]]]}},
+            {"Question 4": {"K-Seq Matches": [["harry", [["harry", "ron"], ["harry"]]]]}},
+            {"Question 6": {"Pair Matches": []}},
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
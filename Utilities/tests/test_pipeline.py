@@ -0,0 +1,64 @@
+import unittest
+from argparse import Namespace
+from unittest.mock import patch, mock_open
+from Utilities.pipeline import Pipeline, parse_tasks, plan_stages
+
+
+class TestPipeline(unittest.TestCase):
+
+    def test_parse_tasks(self):
+        self.assertEqual(parse_tasks("7,2, 3,2"), [2, 3, 7])
+        with self.assertRaises(SystemExit):
+            parse_tasks("2,x")
+        with self.assertRaises(SystemExit):
+            parse_tasks("2,10")
+
+    def test_plan_stages(self):
+        self.assertEqual(plan_stages([2, 3]), ["preprocess"])
+        self.assertEqual(plan_stages([7]), ["preprocess", "graph"])
+        self.assertEqual(plan_stages([2, 6, 7, 8]), ["preprocess", "graph"])
+
+    @patch('builtins.open', new_callable=mock_open, read_data='{"keys": [["harry potter", "ron weasley"]]}')
+    @patch('Utilities.pipeline.preprocess_init', return_value={
+        "Processed Sentences": [['harry', 'potter', 'and', 'ron', 'weasley', 'were', 'at', 'hogwarts']],
+        "Processed Names": [[['harry', 'potter'], []], [['ron', 'weasley'], []]]
+    })
+    def test_run_shares_stages(self, mock_preprocess, mock_file):
+        args = Namespace(preprocessed=None, sentences="fake_sentences.csv", names="fake_people.csv",
+                         removewords="fake_stopwords.txt", windowsize=1, threshold=1, pairs="fake_pairs.json",
+                         maximal_distance=2, fixed_length=1, walks=False, maxk=1, qsek_query_path=None)
+
+        result = Pipeline([1, 6, 7, 8], args).run()
+
+        mock_preprocess.assert_called_once()  # Preprocessing runs once for all the tasks
+        self.assertEqual(list(result), ["Question 1", "Question 6", "Question 7", "Question 8"])
+        self.assertEqual(result["Question 6"]["Pair Matches"], [[['harry', 'potter'], ['ron', 'weasley']]])
+        self.assertEqual(result["Question 7"]["Pair Matches"], [["harry potter", "ron weasley", True]])
+        self.assertEqual(result["Question 8"]["Pair Matches"], [["harry potter", "ron weasley", True]])
+
+    @patch('Utilities.pipeline.preprocess_init', return_value={
+        "Processed Sentences": [['harry', 'potter', 'and', 'ron', 'weasley']],
+        "Processed Names": [[['harry', 'potter'], []], [['ron', 'weasley'], []]]
+    })
+    def test_bad_input_stops_before_any_result(self, mock_preprocess):
+        args = Namespace(preprocessed=None, sentences="fake_sentences.csv", names="fake_people.csv",
+                         removewords="fake_stopwords.txt", windowsize=1, threshold=1, maxk=1, top_k=None,
+                         raw_text=False, qsek_query_path="missing_queries.json")
+        results = Pipeline([1, 2, 4], args).results()
+        with self.assertRaises(SystemExit):
+            next(results)  # Task 4 reads its queries before the results of Tasks 1 and 2 are written
+
+    def test_single_task_options_rejected(self):
+        for option, value in (("all_pairs", True), ("top_neighbors", 3), ("counts", "q6.counts"),
+                              ("save_counts", True), ("raw_offsets", True), ("shards", ["more.json"]),
+                              ("shard_count", 2), ("shard_processes", True)):
+            args = Namespace(all_pairs=False, top_neighbors=None, counts=None, save_counts=False, raw_offsets=False,
+                             shards=None, shard_count=1, shard_processes=False)
+            setattr(args, option, value)
+            with self.assertRaises(SystemExit):
+                Pipeline([6, 7], args)
+        Pipeline([6, 7], Namespace(shard_count=1))  # The defaults are accepted
+
+
+if __name__ == '__main__':
+    unittest.main()
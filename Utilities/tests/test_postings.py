@@ -0,0 +1,115 @@
+import pickle
+import random
+import unittest
+from bisect import bisect_left
+from fnmatch import fnmatchcase
+from Utilities.helper import map_n_grams
+from Utilities.postings import BLOCK_SIZE, SKIP_INTERVAL, PostingCursor, PostingList, PostingsIndex, TermDictionary
+
+
+class TestPostingList(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(0)
+        self.ids = sorted(rng.sample(range(1, 1 << 20), 1000)) + [(1 << 32) - 1]  # Gaps of one to five bytes
+        self.posting = PostingList()
+        for sentence_id in self.ids:
+            self.posting.append(sentence_id)
+
+    def test_round_trip(self):
+        self.assertEqual(list(self.posting), self.ids)
+        self.assertEqual(len(self.posting), len(self.ids))
+        self.assertEqual(len(self.posting.skip_ids), len(self.ids) // SKIP_INTERVAL)
+        self.posting.compact()
+        restored = pickle.loads(pickle.dumps(self.posting))
+        self.assertEqual(list(restored), self.ids)
+        restored.append(1 << 33)  # Appending after compaction
+        self.assertEqual(list(restored), self.ids + [1 << 33])
+
+    def test_cursor_next_geq(self):
+        rng = random.Random(1)
+        for _ in range(50):
+            cursor = PostingCursor(self.posting)
+            for target in sorted(rng.sample(range(1 << 20), 30)):
+                expected = next((sentence_id for sentence_id in self.ids if sentence_id >= target), None)
+                self.assertEqual(cursor.next_geq(target), expected)
+        cursor = PostingCursor(7)  # A single id posting
+        self.assertEqual((cursor.next_geq(0), cursor.next_geq(7), cursor.next_geq(8)), (7, 7, None))
+
+    def test_cursor_uses_skips(self):
+        cursor = PostingCursor(self.posting)
+        self.assertEqual(cursor.next_geq(self.ids[-2]), self.ids[-2])
+        self.assertGreaterEqual(cursor.index, len(self.ids) - SKIP_INTERVAL)  # Most ids were skipped, not decoded
+
+
+class TestTermDictionary(unittest.TestCase):
+
+    def test_front_coded_terms(self):
+        rng = random.Random(1)
+        terms = sorted({"".join(rng.choice("abé") for _ in range(rng.randint(1, 6))) for _ in range(300)})
+        dictionary = pickle.loads(pickle.dumps(TermDictionary(terms)))
+        self.assertEqual(len(dictionary), len(terms))
+        self.assertEqual(len(dictionary.heads), -(-len(terms) // BLOCK_SIZE))
+        self.assertEqual(dictionary.terms(), terms)
+        self.assertEqual(dictionary.terms(5, 40), terms[5:40])
+        for position, term in enumerate(terms):
+            self.assertEqual(dictionary.find(term), position)
+        for term in ("", "a", "ab", "b", "é", "éééééé", "z"):
+            self.assertEqual(dictionary.bisect(term), bisect_left(terms, term), term)
+            self.assertEqual(dictionary.find(term), terms.index(term) if term in terms else None, term)
+
+
+class TestPostingsIndex(unittest.TestCase):
+
+    def test_matches_map_n_grams(self):
+        sentences = [["harry", "potter", "harry"], ["ron", "harry"], ["harry", "potter", "harry"], ["ron"]]
+        for N in (None, 2):
+            index = PostingsIndex.from_sentences(sentences, N)
+            n_grams = map_n_grams(sentences, N)
+            self.assertEqual(set(index.n_grams()), set(n_grams))
+            for n_gram, matched_sentences in n_grams.items():
+                self.assertCountEqual(index.lookup(n_gram), matched_sentences)
+        self.assertEqual(index.sentence_ids_of("harry"), [0, 1])  # Identical sentences are indexed once
+        self.assertEqual(index.lookup("hermione"), [])
+        self.assertIsNone(index.cursor("hermione"))
+
+    def test_expand_matches_brute_force(self):
+        rng = random.Random(2)
+        words = ["harry", "hagrid", "hermione", "ron", "dumbledore", "dudley"]
+        sentences = [[rng.choice(words) for _ in range(rng.randint(1, 4))] for _ in range(200)]
+        index = PostingsIndex.from_sentences(sentences, N=3)
+        for pattern in ("h*", "harry *", "* ron", "d*d*", "h* r*", "dumbledore", "x*", "*"):
+            parts = pattern.split()
+            expected = sorted(n_gram for n_gram in map_n_grams(sentences, 3) if len(n_gram.split()) == len(parts)
+                              and all(fnmatchcase(word, part) for word, part in zip(n_gram.split(), parts)))
+            self.assertEqual(index.expand(pattern), expected, pattern)
+            matching = {sentence_id for n_gram in expected for sentence_id in index.sentence_ids_of(n_gram)}
+            self.assertEqual(index.pattern_ids(pattern), sorted(matching), pattern)
+
+    def test_term_dictionary_follows_new_sentences(self):
+        index = PostingsIndex.from_sentences([["harry", "potter"]])
+        self.assertEqual(index.expand("h*"), ["harry"])
+        index.add_sentence(["hagrid", "potter"])
+        self.assertEqual(index.expand("h*"), ["hagrid", "harry"])
+        self.assertEqual(index.expand("* potter"), ["hagrid potter", "harry potter"])
+
+    def test_postings_follow_the_term_dictionary(self):
+        rng = random.Random(3)
+        words = ["harry", "hagrid", "hermione", "ron", "dumbledore", "dudley"]
+        sentences = [[rng.choice(words) for _ in range(rng.randint(1, 4))] for _ in range(300)]
+        index = PostingsIndex.from_sentences(sentences[:100], N=2)
+        for sentence in sentences[100:200]:  # Into postings of n-grams already in the term dictionary
+            index.add_sentence(sentence)
+        index = pickle.loads(pickle.dumps(index))
+        for sentence in sentences[200:]:
+            index.add_sentence(sentence)
+        expected = PostingsIndex.from_sentences(sentences, N=2)
+        self.assertEqual(len(index), len(expected))
+        self.assertEqual(list(index.n_grams()), list(expected.n_grams()))
+        for n_gram in expected.n_grams():
+            self.assertEqual(index.sentence_ids_of(n_gram), expected.sentence_ids_of(n_gram), n_gram)
+        self.assertEqual(index.repeats, expected.repeats)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import io
+import json
+import threading
+import unittest
+from unittest.mock import mock_open, patch
+from Utilities import profiling
+from Utilities.profiling import profile_stage, profiled, profiling as profiling_enabled
+
+
+@profiled(count=len)
+def make_list(size: int) -> list:
+    return [str(i) for i in range(size)]
+
+
+@profiled(name="outer")
+def outer(size: int) -> list:
+    return make_list(size) + make_list(size)
+
+
+class TestProfiling(unittest.TestCase):
+
+    def test_disabled_passthrough(self):
+        self.assertIsNone(profiling.active_profiler)
+        self.assertEqual(outer(2), ["0", "1", "0", "1"])
+        self.assertEqual(make_list.__name__, "make_list")
+
+    @patch("sys.stderr", new_callable=io.StringIO)
+    def test_report_to_stderr(self, mock_stderr):
+        with profiling_enabled():
+            outer(1000)
+            with profile_stage("block"):
+                make_list(10)
+        self.assertIsNone(profiling.active_profiler)
+
+        report = json.loads(mock_stderr.getvalue())
+        stages = {stage["stage"]: stage for stage in report["stages"]}
+        self.assertEqual(list(stages), ["make_list", "outer", "block"])  # In order of completion
+        self.assertEqual(stages["make_list"]["calls"], 3)
+        self.assertEqual(stages["make_list"]["items"], 2010)
+        self.assertEqual(stages["outer"]["calls"], 1)
+        self.assertIsNone(stages["outer"]["items"])
+        # Nested stages are included in the time and memory of the enclosing stage
+        self.assertGreaterEqual(stages["outer"]["peak_allocated_mb"], 0.01)
+        self.assertGreaterEqual(stages["outer"]["wall_seconds"], 0)
+        self.assertGreaterEqual(report["total_wall_seconds"], stages["outer"]["wall_seconds"])
+
+    @patch("sys.stderr", new_callable=io.StringIO)
+    def test_stages_of_threads(self, mock_stderr):
+        entered, main_exited = threading.Event(), threading.Event()
+        thread_stacks = []
+
+        def in_thread():
+            with profile_stage("thread"):
+                thread_stacks.append([frame.name for frame in profiling.active_profiler.stack])
+                entered.set()
+                main_exited.wait()  # Still running after the stage of the main thread ended
+                make_list(10)
+
+        with profiling_enabled():
+            thread = threading.Thread(target=in_thread)
+            with profile_stage("main"):
+                thread.start()
+                entered.wait()
+            main_exited.set()
+            thread.join()
+            self.assertEqual(profiling.active_profiler.stack, [])
+
+        self.assertEqual(thread_stacks, [["thread"]])  # Each thread nests its own stages
+        stages = {stage["stage"]: stage for stage in json.loads(mock_stderr.getvalue())["stages"]}
+        self.assertEqual([stages[name]["calls"] for name in ("main", "thread", "make_list")], [1, 1, 1])
+        self.assertEqual(stages["make_list"]["items"], 10)
+
+    @patch("sys.stderr", new_callable=io.StringIO)
+    def test_run_peak_after_a_smaller_stage(self, mock_stderr):
+        with profiling_enabled():
+            with profile_stage("large"):
+                buffer = bytearray(8 * 2 ** 20)
+                del buffer
+            with profile_stage("small"):
+                make_list(10)
+        report = json.loads(mock_stderr.getvalue())
+        self.assertGreaterEqual(report["peak_traced_mb"], 8)  # Not only the peak since the last stage started
+        stages = {stage["stage"]: stage for stage in report["stages"]}
+        self.assertGreaterEqual(stages["large"]["peak_allocated_mb"], 8)
+        self.assertLess(stages["small"]["peak_allocated_mb"], 1)
+
+    @patch("sys.stderr", new_callable=io.StringIO)
+    def test_peak_kept_by_stages_of_other_threads(self, mock_stderr):
+        allocated, main_entered = threading.Event(), threading.Event()
+
+        def in_thread():
+            with profile_stage("thread"):
+                buffer = bytearray(8 * 2 ** 20)
+                del buffer
+                allocated.set()
+                main_entered.wait()  # The main thread starts a stage, resetting the peak, before this one ends
+
+        with profiling_enabled():
+            thread = threading.Thread(target=in_thread)
+            thread.start()
+            allocated.wait()
+            with profile_stage("main"):
+                main_entered.set()
+                thread.join()
+        stages = {stage["stage"]: stage for stage in json.loads(mock_stderr.getvalue())["stages"]}
+        self.assertGreaterEqual(stages["thread"]["peak_allocated_mb"], 8)
+
+    @patch("builtins.open", new_callable=mock_open)
+    def test_report_written_on_exit(self, mock_file):
+        with self.assertRaises(SystemExit):
+            with profiling_enabled("report.json"):
+                make_list(3)
+                raise SystemExit(1)
+        mock_file.assert_called_once_with("report.json", "w")
+        written = "".join(call.args[0] for call in mock_file().write.call_args_list)
+        self.assertEqual(json.loads(written)["stages"][0]["items"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
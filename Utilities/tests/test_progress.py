@@ -0,0 +1,53 @@
+import io
+import json
+import unittest
+from unittest.mock import patch
+from Utilities import progress
+from Utilities.progress import NULL_TRACKER, ProgressReporter, reporting_progress, track
+
+
+class TestProgress(unittest.TestCase):
+
+    def test_disabled_returns_null_tracker(self):
+        self.assertIsNone(progress.active_reporter)
+        self.assertIs(track("stage", 10), NULL_TRACKER)
+
+    @patch("Utilities.progress.time.perf_counter")
+    def test_reports_are_throttled(self, mock_clock):
+        mock_clock.return_value = 0.0
+        file = io.StringIO()
+        tracker = ProgressReporter(file).track("Task 9 sentence pairs", 1000, "pairs")
+        clock_readings = mock_clock.call_count
+        for done in range(1, 1001):
+            mock_clock.return_value = done / 100  # 100 pairs per second
+            tracker.update(done, connected_sentences=done // 10)
+        tracker.finish(1000, connected_sentences=100)
+
+        lines = file.getvalue().splitlines()
+        # One report after each REPORT_INTERVAL (2 seconds) of the first 10 seconds, plus the final one
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(lines[0], "[progress] Task 9 sentence pairs: 204/1000 pairs (20.4%), 100.0 pairs/s, "
+                                   "20 connected_sentences, ETA 8s")
+        self.assertEqual(lines[-1], "[progress] Task 9 sentence pairs: 1000/1000 pairs (100.0%), 100.0 pairs/s, "
+                                    "100 connected_sentences, done in 10.0s")
+        # The clock is read about CHECKS_PER_INTERVAL times per interval, not on every update
+        self.assertLess(mock_clock.call_count - clock_readings, 120)
+
+    def test_metrics_file(self):
+        file = io.StringIO()
+        file.close = lambda: None
+        with patch("builtins.open", return_value=file) as mock_open:
+            with reporting_progress("metrics.jsonl"):
+                tracker = track("Task 5 person contexts", 3, "sentences")
+                for done in range(1, 4):
+                    tracker.update(done)
+                tracker.finish(3, people=2)
+        mock_open.assert_called_once_with("metrics.jsonl", "w")
+        self.assertIsNone(progress.active_reporter)
+        metrics = json.loads(file.getvalue().splitlines()[-1])
+        self.assertEqual((metrics["stage"], metrics["done"], metrics["total"], metrics["people"], metrics["final"]),
+                         ("Task 5 person contexts", 3, 3, 2, True))
+
+
+if __name__ == "__main__":
+    unittest.main()
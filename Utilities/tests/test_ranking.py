@@ -0,0 +1,76 @@
+import math
+import random
+import unittest
+from unittest.mock import patch
+from Utilities import ranking
+from Utilities.postings import PostingsIndex
+from Utilities.ranking import B, K1, Bm25Ranker
+
+
+class TestBm25Ranker(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(3)
+        words = ["harry", "ron", "hermione", "snape"]
+        sentences = [[rng.choice(words) for _ in range(rng.randint(1, 8))] for _ in range(200)]
+        self.index = PostingsIndex.from_sentences(sentences, N=2)
+        self.ranker = Bm25Ranker(self.index)
+
+    def bm25(self, n_grams: list, sentence_id: int) -> float:
+        """ The BM25 score of a sentence, counted from its words. """
+        sentences = self.index.sentences
+        average_length = sum(len(sentence) for sentence in sentences) / len(sentences)
+        words = sentences[sentence_id]
+        score = 0.0
+        for n_gram in n_grams:
+            n = len(n_gram.split())
+            tf = sum(" ".join(words[i:i + n]) == n_gram for i in range(len(words) - n + 1))
+            df = sum(f" {n_gram} " in f" {' '.join(sentence)} " for sentence in sentences)
+            idf = math.log(1 + (len(sentences) - df + 0.5) / (df + 0.5))
+            score += idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * len(words) / average_length))
+        return score
+
+    def expected(self, n_grams: list, k: int, candidates: list) -> list:
+        scores = {sentence_id: self.bm25(n_grams, sentence_id) for sentence_id in candidates}
+        return sorted(candidates, key=lambda sentence_id: (-round(scores[sentence_id], 9), sentence_id))[:k]
+
+    def test_single_k_seq(self):
+        for n_gram in ("harry", "ron ron", "snape hermione"):
+            self.assertEqual(self.ranker.top_k([n_gram], 10),
+                             self.expected([n_gram], 10, self.index.sentence_ids_of(n_gram)))
+
+    def test_several_k_seqs_and_candidates(self):
+        n_grams = ["harry", "snape ron", "nobody"]
+        matches = sorted(set(self.index.sentence_ids_of("harry")) | set(self.index.sentence_ids_of("snape ron")))
+        self.assertEqual(self.ranker.top_k(n_grams, 15), self.expected(n_grams, 15, matches))
+        candidates = matches[::3]
+        self.assertEqual(self.ranker.top_k(n_grams, 5, candidates), self.expected(n_grams, 5, candidates))
+
+    def test_early_termination_keeps_the_ranking(self):
+        rng = random.Random(5)
+        words = [f"word{i}" for i in range(60)]
+        weights = [1 / (i + 1) for i in range(60)]  # Frequent words have a low idf, the bound of their scores
+        sentences = [rng.choices(words, weights, k=rng.randint(2, 12)) for _ in range(3000)]
+        index = PostingsIndex.from_sentences(sentences, N=1)
+        ranker = Bm25Ranker(index)
+        for _ in range(30):
+            n_grams = rng.sample(words[:8], 4) + rng.sample(words[30:], 2)
+            candidates = sorted(rng.sample(range(len(index.sentences)), 800))
+            for k, query_candidates in ((1, None), (10, None), (5, candidates)):
+                with patch.object(index, "cursor", wraps=index.cursor) as mock_cursor:
+                    ranking_found = ranker.top_k_scored(n_grams, k, query_candidates)
+                with patch.object(ranking, "BOUND_MARGIN", 1e9):  # No early termination
+                    self.assertEqual(ranking_found, ranker.top_k_scored(n_grams, k, query_candidates))
+                if k == 1 and query_candidates is None:
+                    mock_cursor.assert_called()  # The frequent words were only searched for the best sentences
+
+    def test_follows_new_sentences(self):
+        self.ranker.top_k(["harry"], 1)
+        self.index.add_sentence(["dobby", "harry"])
+        self.index.add_sentence(["dobby", "dobby", "ron"])
+        last = len(self.index.sentences) - 1
+        self.assertEqual(self.ranker.top_k(["dobby"], 2), [last, last - 1])  # Two occurrences rank first
+
+
+if __name__ == '__main__':
+    unittest.main()
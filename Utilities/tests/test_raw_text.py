@@ -0,0 +1,93 @@
+import csv
+import io
+import os
+import tempfile
+import unittest
+from array import array
+from Utilities.raw_text import RawSentences, read_records, write_offsets
+
+SENTENCES = [
+    "Harry Potter, the boy who lived.",
+    'He said "Hello, Ron!"',
+    "A sentence\nover two lines, with é accents.",
+    "",
+    "The last one.",
+]
+
+
+class TestRawSentences(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.TemporaryDirectory()
+        self.sentences_path = os.path.join(self.work_dir.name, "sentences.csv")
+        with open(self.sentences_path, "w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow(["sentence"])
+            for sentence in SENTENCES:
+                writer.writerow([sentence])
+            file.write("\r\n")  # A blank line, skipped
+        self.offsets_path = os.path.join(self.work_dir.name, "output.json.offsets")
+
+    def tearDown(self):
+        self.work_dir.cleanup()
+
+    def test_read_records(self):
+        records = list(read_records(self.sentences_path))
+        self.assertEqual([row["sentence"] for row, _, _ in records], SENTENCES)
+        with open(self.sentences_path, "rb") as file:
+            data = file.read()
+        for row, start, end in records:  # Each record parses back alone, quoted line breaks included
+            self.assertEqual(next(csv.reader(io.StringIO(data[start:end].decode())))[0], row["sentence"])
+
+    def test_bom_and_short_rows(self):
+        with open(self.sentences_path, "w", newline="", encoding="utf-8-sig") as file:
+            file.write("sentence,source\r\nThe first one.,book\r\nA short row.\r\n")
+        self.assertEqual([row for row, _, _ in read_records(self.sentences_path)],
+                         [{"sentence": "The first one.", "source": "book"},
+                          {"sentence": "A short row.", "source": None}])
+
+    def test_complete_records_only(self):
+        with open(self.sentences_path, "rb") as file:
+            data = file.read()
+        records = list(read_records(self.sentences_path))
+        multi_line = records[2]  # The record with a quoted line break
+        for length, count in ((multi_line[1] + 5, 2), (multi_line[2] - 1, 2), (multi_line[2], 3), (0, 0), (4, 0)):
+            with open(self.sentences_path, "wb") as file:  # A file still being written, cut at length bytes
+                file.write(data[:length])
+            self.assertEqual(list(read_records(self.sentences_path, complete_only=True)), records[:count])
+        with open(self.sentences_path, "wb") as file:
+            file.write(data[:multi_line[2]])
+        self.assertEqual(list(read_records(self.sentences_path, start=records[1][1], complete_only=True)),
+                         records[1:3])
+
+    def test_round_trip(self):
+        offsets = array('Q')
+        kept = []
+        for row, start, end in read_records(self.sentences_path):
+            if row["sentence"]:
+                offsets.extend((start, end))
+                kept.append(row["sentence"])
+        write_offsets(self.offsets_path, self.sentences_path, "sentence", offsets)
+
+        raw_sentences = RawSentences(self.offsets_path)
+        try:
+            self.assertEqual(len(raw_sentences), len(kept))
+            self.assertEqual(raw_sentences.texts(list(range(len(kept)))), kept)
+            self.assertEqual(raw_sentences.text(3), "The last one.")
+        finally:
+            raw_sentences.close()
+
+    def test_changed_sentences_file(self):
+        write_offsets(self.offsets_path, self.sentences_path, "sentence", array('Q', [0, 0]))
+        with open(self.sentences_path, "a") as file:
+            file.write("A new sentence.\n")
+        with self.assertRaises(SystemExit):
+            RawSentences(self.offsets_path)
+
+    def test_missing_offsets(self):
+        with self.assertRaises(SystemExit):
+            RawSentences(os.path.join(self.work_dir.name, "missing.offsets"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import json
+import unittest
+from unittest.mock import patch
+from Utilities import serialization
+from Utilities.serialization import PAIR_MATCHES_SCHEMA, KEYS_SCHEMA
+
+
+class TestSerialization(unittest.TestCase):
+
+    def tearDown(self):
+        serialization.select_backend()
+
+    def test_backends_agree(self):
+        task6 = {"Question 6": {"Pair Matches": [[["harry", "potter"], ["ron", "weasley"]]]}}
+        for backend in serialization.installed_backends():
+            self.assertEqual(serialization.select_backend(backend), backend)
+            data = serialization.dumps_json(task6)
+            self.assertEqual(json.loads(data), task6)
+            self.assertEqual(serialization.loads_json(data.encode(), PAIR_MATCHES_SCHEMA), task6)
+            # A document of another shape than the schema is still decoded
+            self.assertEqual(serialization.loads_json('["harry", "potter"]', KEYS_SCHEMA), ["harry", "potter"])
+            with self.assertRaises(json.JSONDecodeError):
+                serialization.loads_json('{"keys": [')
+
+    def test_small_documents_do_not_import_a_backend(self):
+        with patch.object(serialization, "backend_name", None), \
+                patch.object(serialization, "select_backend") as mock_select:
+            self.assertEqual(serialization.loads_json(b'{"keys": [["harry"]]}', KEYS_SCHEMA), {"keys": [["harry"]]})
+            mock_select.assert_not_called()
+            large = b'{"keys": [' + b",".join([b'["harry"]'] * (serialization.SMALL_DOCUMENT_BYTES // 8)) + b"]}"
+            self.assertEqual(len(serialization.loads_json(large)["keys"]), serialization.SMALL_DOCUMENT_BYTES // 8)
+            mock_select.assert_called_once_with()
+
+    def test_unknown_backend_falls_back(self):
+        self.assertIn(serialization.select_backend("unknown"), serialization.installed_backends())
+
+
+if __name__ == '__main__':
+    unittest.main()
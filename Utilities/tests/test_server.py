@@ -0,0 +1,117 @@
+import asyncio
+import json
+import unittest
+from unittest.mock import patch
+from task_implementation.Task_4_Search_Engine import SearchEngine
+from task_implementation.Task_5_Contexts import PersonContexts
+from task_implementation.Task_6_Direct_Connections import DirectConnections
+from task_implementation.Task_7_8_Indirect_Connections import IndirectPaths
+from Utilities.server import QueryServer, QueryError
+
+
+class TestQueryServer(unittest.TestCase):
+
+    def setUp(self):
+        data = {
+            "Processed Sentences": [['harry', 'potter', 'met', 'ron', 'weasley'],
+                                    ['ron', 'weasley', 'met', 'hermione', 'granger'],
+                                    ['draco', 'malfoy', 'was', 'alone']],
+            "Processed Names": [[['harry', 'potter'], []], [['ron', 'weasley'], []],
+                                [['hermione', 'granger'], []], [['draco', 'malfoy'], []]]
+        }
+        direct_connections = DirectConnections(question_num=6, window_size=1, threshold=1, data=data)
+        self.server = QueryServer(search_engine=SearchEngine(k_seq_list={"keys": []}, data=data),
+                                  person_contexts=PersonContexts(N=1, data=data),
+                                  indirect_paths=IndirectPaths(question_num=7, maximal_distance=1, people_pairs=[],
+                                                               direct_connections=direct_connections),
+                                  maximal_distance=1,
+                                  workers=2)
+
+    def tearDown(self):
+        self.server.executor.shutdown()
+
+    def test_answer(self):
+        self.assertEqual(self.server.answer({"op": "kseq", "keys": [["met"], ["ron", "weasley"], ["nobody"]]}),
+                         {"K-Seq Matches": [
+                             ["met", [['harry', 'potter', 'met', 'ron', 'weasley'],
+                                      ['ron', 'weasley', 'met', 'hermione', 'granger']]],
+                             ["ron weasley", [['harry', 'potter', 'met', 'ron', 'weasley'],
+                                              ['ron', 'weasley', 'met', 'hermione', 'granger']]]]})
+        self.assertEqual(self.server.answer({"op": "contexts", "names": ["draco malfoy", "nobody"]}),
+                         {"Person Contexts and K-Seqs": [
+                             ["draco malfoy", [["alone"], ["draco"], ["malfoy"], ["was"]]]]})
+
+        pairs = [["ron weasley", "harry potter"], ["harry potter", "hermione granger"], ["draco malfoy", "ron weasley"]]
+        self.assertEqual(self.server.answer({"op": "connected", "pairs": pairs}),
+                         {"Pair Matches": [["draco malfoy", "ron weasley", False],
+                                           ["harry potter", "hermione granger", False],
+                                           ["harry potter", "ron weasley", True]]})
+        self.assertEqual(self.server.answer({"op": "connected", "pairs": pairs[1:2], "maximal_distance": 2}),
+                         {"Pair Matches": [["harry potter", "hermione granger", True]]})
+
+        self.assertEqual(self.server.answer({"op": "query", "queries": ["met AND NOT harry", "alone OR granger"]}),
+                         {"Query Matches": [
+                             ["alone OR granger", [['draco', 'malfoy', 'was', 'alone'],
+                                                   ['ron', 'weasley', 'met', 'hermione', 'granger']]],
+                             ["met AND NOT harry", [['ron', 'weasley', 'met', 'hermione', 'granger']]]]})
+
+        self.assertEqual(self.server.answer({"op": "kseq", "keys": [["met"]], "top_k": 1}),
+                         {"K-Seq Matches": [["met", [['harry', 'potter', 'met', 'ron', 'weasley']]]]})
+        self.assertEqual(self.server.answer({"op": "query", "queries": ["weasley OR alone"], "top_k": 1}),
+                         {"Query Matches": [["weasley OR alone", [['draco', 'malfoy', 'was', 'alone']]]]})
+
+        with self.assertRaises(QueryError):
+            self.server.answer({"op": "kseq", "keys": [["met"]], "top_k": 0})
+        with self.assertRaises(QueryError):
+            self.server.answer({"op": "query", "queries": ["(met"]})
+        with self.assertRaises(QueryError):
+            self.server.answer({"op": "connected", "pairs": [["harry potter"]]})
+        with self.assertRaises(QueryError):
+            self.server.answer({"op": "unknown"})
+
+    def test_answer_batch(self):
+        answers = self.server.answer_batch([{"op": "ping"}, {"op": "kseq"}, {"op": "ping"}])
+        self.assertEqual(answers[0], {"ok": True})
+        self.assertIn("error", answers[1])
+        self.assertIs(answers[0], answers[2])  # Repeated queries are answered once
+
+    def test_answer_batch_with_bad_queries(self):
+        bad_queries = [{"op": "contexts", "names": [["x"]]}, {"op": "connected", "pairs": [[1, "a"]]},
+                       {"op": "kseq", "keys": [[1]]}, {"op": "kseq", "keys": ["met"]}]
+        for query in bad_queries:
+            with self.assertRaises(QueryError):
+                self.server.answer(query)
+
+        with patch.object(self.server.search_engine, "search", side_effect=RuntimeError("index broken")):
+            answers = self.server.answer_batch(bad_queries + [{"op": "kseq", "keys": [["met"]]}, {"op": "ping"}])
+        self.assertTrue(all("error" in answer for answer in answers[:-1]))
+        self.assertIn("index broken", answers[-2]["error"])
+        self.assertEqual(answers[-1], {"ok": True})  # The other queries of the batch are still answered
+
+    def test_localhost_round_trip(self):
+        async def exchange():
+            server = await self.server.start("127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            responses = []
+            for request in (b'{"op": "ping"}\n',
+                            b'{"batch": [{"op": "kseq", "keys": [["alone"]]}, {"op": "contexts", "names": []}]}\n',
+                            b'not json\n'):
+                writer.write(request)
+                await writer.drain()
+                responses.append(json.loads(await reader.readline()))
+            writer.close()
+            server.close()
+            await server.wait_closed()
+            return responses
+
+        responses = asyncio.run(exchange())
+        self.assertEqual(responses[0], {"ok": True})
+        self.assertEqual(responses[1], {"batch": [
+            {"K-Seq Matches": [["alone", [['draco', 'malfoy', 'was', 'alone']]]]},
+            {"Person Contexts and K-Seqs": []}]})
+        self.assertIn("error", responses[2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+# Description: Benchmark of Task 4 on large K-seq query files: the former per K-seq search (each result sorted by
+# joining its sentences) against the batch executor of SearchEngine.search (distinct K-seqs, postings decoded once
+# per batch, results ordered by the ranks of one alphabetical sort of the corpus). The query file is drawn from the
+# n-grams of a synthetic corpus (see synthetic_corpus.py), with repeats and some K-seqs that match nothing.
+# Run from the project root: python3 -m benchmarks.bench_batch_search --sentences 20000 --keys 50000
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from typing import Dict, List
+from benchmarks.synthetic_corpus import generate_corpus
+from task_implementation.Task_1_Preprocessing import Preprocessing
+from task_implementation.Task_4_Search_Engine import SearchEngine
+from Utilities.postings import PostingsIndex
+
+
+def search_one_by_one(index: PostingsIndex, k_seqs: List[List[str]]) -> Dict[str, List[List[str]]]:
+    """ The search before the batch executor. """
+    search_index = {}
+    for k_seq_value in k_seqs:
+        k_seq_text = " ".join(k_seq_value)
+        if k_seq_text in index and k_seq_text not in search_index:
+            search_index[k_seq_text] = sorted((list(seq) for seq in index.lookup(k_seq_text)),
+                                              key=lambda x: " ".join(x))
+    return search_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Task 4 batch search benchmark")
+    parser.add_argument('--sentences', type=int, default=20000, help="number of sentences of the corpus")
+    parser.add_argument('--keys', type=int, default=50000, help="number of K-seqs of the query file")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        paths = generate_corpus(os.path.join(work_dir, "corpus"), args.sentences, seed=args.seed)
+        sentences = Preprocessing(sentences_path=paths["sentences"],
+                                  stopwords_path=paths["stopwords"]).preprocess_sentences()
+    engine = SearchEngine(k_seq_list={"keys": []}, data={"Processed Sentences": sentences})
+    index = engine.get_sentence_index()
+
+    rng = random.Random(args.seed)
+    words = index.sorted_terms(1)
+    pairs = index.sorted_terms(2)
+    distinct = [[word] for word in rng.sample(words, min(len(words), args.keys // 4))]
+    distinct += [pair.split() for pair in rng.sample(pairs, min(len(pairs), args.keys // 4))]
+    distinct += [[rng.choice(words), rng.choice(words), "nobody"] for _ in range(args.keys // 10)]
+    k_seqs = [rng.choice(distinct) for _ in range(args.keys)]
+
+    start = time.perf_counter()
+    expected = search_one_by_one(index, k_seqs)
+    one_by_one_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    result = engine.search(k_seqs)
+    batch_seconds = time.perf_counter() - start
+    assert result == expected, "The batch executor returned different results"
+
+    print(f"{len(sentences)} sentences, {len(k_seqs)} K-seqs ({len(set(map(tuple, k_seqs)))} distinct), "
+          f"{sum(map(len, result.values()))} matched sentences")
+    print(f"one by one {one_by_one_seconds:.2f}s, batch {batch_seconds:.2f}s "
+          f"({one_by_one_seconds / batch_seconds:.1f}x faster, alphabetical sort of the corpus included)")
+
+
+if __name__ == "__main__":
+    main()
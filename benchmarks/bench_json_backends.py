@@ -0,0 +1,65 @@
+# Description: Benchmark of the JSON backends of Utilities.serialization.
+# Scales up example result files (Task 1 preprocessed data, Task 2 counts, Task 6 pair matches) by repeating
+# their lists, then times decoding (untyped and typed) and compact encoding with every installed backend.
+# Run from the project root: python3 -m benchmarks.bench_json_backends --scale 1000 --repeat 3
+
+import argparse
+import json
+import time
+from typing import Any, Callable
+from Utilities import serialization
+from Utilities.serialization import PAIR_MATCHES_SCHEMA, PREPROCESSED_SCHEMA
+
+EXAMPLES = [
+    ("Task 1", "Examples/Q1_examples/example_2/Q1_result2.json", PREPROCESSED_SCHEMA),
+    ("Task 2", "Examples/Q2_examples/example_1/Q2_result1.json", None),
+    ("Task 6", "Examples/Q6_examples/example_1/Q6_result1_w4_t4.json", PAIR_MATCHES_SCHEMA),
+]
+
+
+def scale_lists(value: Any, scale: int, depth: int = 0) -> Any:
+    """ Repeat the elements of the lists found at the top of the result dictionaries (e.g. the sentences). """
+    if isinstance(value, dict):
+        return {key: scale_lists(item, scale, depth) for key, item in value.items()}
+    if isinstance(value, list) and depth == 0:
+        return [scale_lists(item, scale, depth + 1) for item in value] * scale
+    return value
+
+
+def best_time(function: Callable[[], Any], repeat: int) -> float:
+    """ The fastest of several runs, in seconds. """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON backend load/dump benchmark")
+    parser.add_argument('--scale', type=int, default=1000, help="number of times the example lists are repeated")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per measurement, the fastest is reported")
+    args = parser.parse_args()
+
+    print(f"{'file':<8} {'backend':<8} {'MB':>7} {'load MB/s':>10} {'typed MB/s':>11} {'dump MB/s':>10}")
+    for name, path, schema in EXAMPLES:
+        with open(path, "r") as file:
+            value = scale_lists(json.load(file), args.scale)
+        data = json.dumps(value).encode()
+        megabytes = len(data) / 1e6
+
+        for backend in serialization.PREFERENCE:
+            if backend not in serialization.installed_backends():
+                continue
+            serialization.select_backend(backend)
+            assert serialization.loads_json(data, schema) == value, f"{backend} decoded {name} differently"
+            load_time = best_time(lambda: serialization.loads_json(data), args.repeat)
+            typed_time = best_time(lambda: serialization.loads_json(data, schema), args.repeat)
+            dump_time = best_time(lambda: serialization.dumps_json(value), args.repeat)
+            print(f"{name:<8} {backend:<8} {megabytes:>7.1f} {megabytes / load_time:>10.1f} "
+                  f"{megabytes / typed_time:>11.1f} {megabytes / dump_time:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# Description: Benchmark of the Task 4 index: map_n_grams (sets of sentence tuples) against PostingsIndex
+# (compressed postings of sentence ids and a front coded term dictionary). Reports the memory held by each index
+# (tracemalloc), that of a dict of the n-gram keys alone (what map_n_grams needs besides its postings), the build time
+# and the mean latency of the K-seq queries of a synthetic corpus (see synthetic_corpus.py).
+# Run from the project root: python3 -m benchmarks.bench_postings --sentences 20000
+
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, List, Tuple
+from benchmarks.synthetic_corpus import generate_corpus
+from task_implementation.Task_1_Preprocessing import Preprocessing
+from Utilities.helper import map_n_grams
+from Utilities.postings import PostingsIndex, n_grams_of
+
+
+def measure(build: Callable[[], Any]) -> Tuple[Any, float, float]:
+    """ Build an index, returning it with its build time in seconds and the MB it holds. """
+    tracemalloc.start()
+    start = time.perf_counter()
+    index = build()
+    seconds = time.perf_counter() - start
+    megabytes = tracemalloc.get_traced_memory()[0] / 1e6
+    tracemalloc.stop()
+    return index, seconds, megabytes
+
+
+def query_latency(lookup: Callable[[str], List[Any]], queries: List[str], repeat: int) -> float:
+    """ Mean seconds per query, sorting the matched sentences as SearchEngine.search does. """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in queries:
+            sorted((list(sentence) for sentence in lookup(query)), key=lambda x: " ".join(x))
+    return (time.perf_counter() - start) / (repeat * len(queries))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Task 4 index memory and latency benchmark")
+    parser.add_argument('--sentences', type=int, default=20000, help="number of sentences of the corpus")
+    parser.add_argument('--repeat', type=int, default=20, help="times each query is run")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        paths = generate_corpus(os.path.join(work_dir, "corpus"), args.sentences, seed=args.seed)
+        sentences = Preprocessing(sentences_path=paths["sentences"],
+                                  stopwords_path=paths["stopwords"]).preprocess_sentences()
+        with open(paths["kseq"], "r") as file:
+            queries = [" ".join(key) for key in json.load(file)["keys"]]
+    # The most frequent words, whose postings are the longest
+    common = sorted((len(sentences) for sentences in map_n_grams(sentences, 1).values()), reverse=True)[:3]
+
+    _, _, keys_mb = measure(lambda: {n_gram: None for sentence in sentences for n_gram in n_grams_of(sentence, None)})
+    n_grams, n_grams_seconds, n_grams_mb = measure(lambda: map_n_grams(sentences, None))
+    n_grams_latency = query_latency(lambda query: n_grams.get(query, ()), queries, args.repeat)
+    del n_grams
+    postings, postings_seconds, postings_mb = measure(lambda: PostingsIndex.from_sentences(sentences))
+    postings_latency = query_latency(postings.lookup, queries, args.repeat)
+
+    print(f"{len(sentences)} sentences, {len(postings)} n-grams, longest postings {common}")
+    print(f"dict of the n-gram keys alone: {keys_mb:.1f} MB")
+    print(f"{'index':<14} {'MB':>8} {'build s':>8} {'query us':>9}")
+    for name, megabytes, seconds, latency in (("map_n_grams", n_grams_mb, n_grams_seconds, n_grams_latency),
+                                              ("PostingsIndex", postings_mb, postings_seconds, postings_latency)):
+        print(f"{name:<14} {megabytes:>8.1f} {seconds:>8.2f} {latency * 1e6:>9.1f}")
+    print(f"{n_grams_mb / postings_mb:.1f}x smaller index")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# Description: Startup time benchmark of main.py.
+# Runs each task on the small example files with `python -X importtime` and reports the total import time (the
+# fastest of several runs for each import, since single runs are noisy), the wall time of the whole process, and the
+# modules that take the longest to import. The lightest tasks (e.g. a
+# Task 7 lookup on a Task 6 JSON) should import in well under TARGET_MILLISECONDS.
+# Run from the project root: python3 -m benchmarks.bench_startup --repeat 10
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+MAIN_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+TARGET_MILLISECONDS = 50
+STOPWORDS_PATH = os.path.join("Data - example", "REMOVEWORDS.csv")
+TASK_ARGUMENTS = {
+    1: ["-t", "1", "-s", "Examples/Q1_examples/example_2/sentences_small_2.csv",
+        "-n", "Examples/Q1_examples/example_2/people_small_2.csv", "-r", STOPWORDS_PATH],
+    2: ["-t", "2", "-p", "Examples/Q1_examples/example_2/Q1_result2.json", "--maxk", "3"],
+    3: ["-t", "3", "-p", "Examples/Q1_examples/example_2/Q1_result2.json"],
+    4: ["-t", "4", "-p", "Examples/Q1_examples/example_2/Q1_result2.json",
+        "--qsek_query_path", "Examples/Q4_examples/example_2/kseq_query_keys_2.json"],
+    5: ["-t", "5", "-p", "Examples/Q1_examples/example_2/Q1_result2.json", "--maxk", "3"],
+    6: ["-t", "6", "-p", "Examples/Q1_examples/example_2/Q1_result2.json", "--windowsize", "3", "--threshold", "2"],
+    7: ["-t", "7", "-p", "Examples/Q7_examples/example_2/Q7_result2_w3_t2.json",
+        "--pairs", "Examples/Q7_examples/example_2/people_connections_2.json", "--maximal_distance", "2"],
+    8: ["-t", "8", "-p", "Examples/Q7_examples/example_2/Q7_result2_w3_t2.json",
+        "--pairs", "Examples/Q7_examples/example_2/people_connections_2.json", "--fixed_length", "2"],
+    9: ["-t", "9", "-p", "Examples/Q1_examples/example_2/Q1_result2.json", "--threshold", "2"],
+}
+
+
+def import_times(arguments: List[str], repeat: int) -> Dict[str, int]:
+    """ The cumulative import time in microseconds of each top-level import, the fastest of repeat runs. """
+    times = {}
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-X", "importtime", MAIN_PATH] + arguments,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True).stderr
+        for line in output.splitlines():
+            if not line.startswith("import time:") or "|" not in line:
+                continue
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdigit() and not name.startswith("  "):  # Top-level imports only
+                times[name.strip()] = min(times.get(name.strip(), int(cumulative)), int(cumulative))
+    return times
+
+
+def wall_time(arguments: List[str], repeat: int) -> float:
+    """ The median wall time in seconds of a run of main.py. """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, MAIN_PATH] + arguments, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return sorted(times)[len(times) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="main.py startup time benchmark")
+    parser.add_argument('--tasks', default="1,2,3,4,5,6,7,8,9", help="comma separated task numbers")
+    parser.add_argument('--repeat', type=int, default=10,
+                        help="runs per measurement, the fastest import times and the median wall time are kept")
+    parser.add_argument('--top', type=int, default=5, help="number of slowest top-level imports to list")
+    args = parser.parse_args()
+
+    interpreter = wall_time(["--help"], args.repeat)  # Interpreter and argparse startup, for reference
+    print(f"main.py --help: {interpreter * 1000:.1f} ms")
+    print(f"{'task':<5} {'imports ms':>10} {'wall ms':>8}  slowest imports")
+    for task in [int(task) for task in args.tasks.split(",")]:
+        times = import_times(TASK_ARGUMENTS[task], args.repeat)
+        total = sum(times.values()) / 1000
+        slowest: List[Tuple[str, int]] = sorted(times.items(), key=lambda item: -item[1])[:args.top]
+        flag = "" if total < TARGET_MILLISECONDS else " (above target)"
+        print(f"{task:<5} {total:>10.1f} {wall_time(TASK_ARGUMENTS[task], args.repeat) * 1000:>8.1f}  "
+              + ", ".join(f"{name} {microseconds / 1000:.1f}" for name, microseconds in slowest) + flag)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# Description: Benchmark of the Task 8 fixed-length path search.
+# Sweeps the fixed length K over a random person graph and times the backtracking DFS / meet-in-the-middle
+# engine of IndirectPaths against the original BFS that copied the visited set of every partial path.
+# Run from the project root: python3 -m benchmarks.bench_task8_fixed_length --nodes 200 --degree 4 --max_k 10
+
+import argparse
+import collections
+import json
+import os
+import random
+import tempfile
+import time
+from typing import Dict, List
+from task_implementation.Task_7_8_Indirect_Connections import IndirectPaths
+
+
+def random_pair_matches(nodes: int, degree: float, seed: int) -> List[List[List[str]]]:
+    """ Random graph in the Task 6 "Pair Matches" format, with the given average degree. """
+    rng = random.Random(seed)
+    names = [f"person {i}" for i in range(nodes)]
+    edges = set()
+    while len(edges) < nodes * degree / 2:
+        person1, person2 = sorted(rng.sample(names, 2))
+        edges.add((person1, person2))
+    return sorted([[person1.split(), person2.split()] for person1, person2 in edges])
+
+
+def legacy_bfs_exact_paths(graph: Dict[str, List[str]], start_node: str, end_node: str, K: int) -> bool:
+    """ The original Task 8 engine: BFS carrying a copy of the visited set in every queue entry. """
+    if start_node not in graph or end_node not in graph:
+        return False
+    queue = collections.deque([(start_node, 0, {start_node})])
+    while queue:
+        node, depth, visited = queue.popleft()
+        if depth == K:
+            if node == end_node:
+                return True
+            continue
+        for neighbor in graph.get(node, []):
+            if neighbor not in visited:
+                queue.append((neighbor, depth + 1, visited | {neighbor}))
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Task 8 fixed-length path benchmark")
+    parser.add_argument('--nodes', type=int, default=200, help="number of people in the graph")
+    parser.add_argument('--degree', type=float, default=4, help="average number of connections per person")
+    parser.add_argument('--pairs', type=int, default=20, help="number of random pairs to query")
+    parser.add_argument('--max_k', type=int, default=10, help="largest fixed length to sweep")
+    parser.add_argument('--legacy_max_k', type=int, default=6, help="largest K to also run the legacy BFS on")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    pair_matches = random_pair_matches(args.nodes, args.degree, args.seed)
+    names = sorted({" ".join(name) for pair in pair_matches for name in pair})
+    pairs = [rng.sample(names, 2) for _ in range(args.pairs)]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        graph_path = os.path.join(tmp_dir, "task6.json")
+        pairs_path = os.path.join(tmp_dir, "pairs.json")
+        with open(graph_path, "w") as file:
+            json.dump({"Question 6": {"Pair Matches": pair_matches}}, file)
+        with open(pairs_path, "w") as file:
+            json.dump({"keys": pairs}, file)
+
+        print(f"{'K':>3} {'found':>6} {'engine (s)':>11} {'legacy BFS (s)':>15}")
+        for K in range(1, args.max_k + 1):
+            paths = IndirectPaths(question_num=8, preprocess_path=graph_path, people_connections_path=pairs_path,
+                                  K=K)
+            # Adjacency list of names, the graph format of the legacy engine
+            graph = {name: [paths.graph.names[neighbor] for neighbor in paths.graph.neighbors(node)]
+                     for node, name in enumerate(paths.graph.names)}
+            start = time.perf_counter()
+            found = sum(row[2] for row in paths.find_fixed_length_paths())
+            engine_time = time.perf_counter() - start
+
+            legacy_time = "-"
+            if K <= args.legacy_max_k:
+                start = time.perf_counter()
+                legacy_found = sum(legacy_bfs_exact_paths(graph, *sorted(pair), K) for pair in pairs)
+                legacy_time = f"{time.perf_counter() - start:.4f}"
+                assert legacy_found == found, f"Engines disagree for K={K}"
+
+            print(f"{K:>3} {found:>6} {engine_time:>11.4f} {legacy_time:>15}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+# Description: Benchmark suite of Tasks 1-9 on synthetic corpora.
+# For each scale, a synthetic corpus is generated (see synthetic_corpus.py), Task 1 preprocesses it once and
+# Tasks 2-9 run on the Task 1 JSON (Tasks 7 and 8 on the Task 6 JSON), each in its own process. The wall time
+# and the peak resident set size of every run are recorded, and compared against a saved baseline: a task that
+# got slower or bigger than the baseline by more than the tolerance is reported as a regression (exit code 1).
+# Run from the project root:
+#   python3 -m benchmarks.run_suite --scales 1000,10000 --save_baseline benchmarks/baseline.json
+#   python3 -m benchmarks.run_suite --scales 1000,10000 --baseline benchmarks/baseline.json
+
+import argparse
+import json
+import os
+import signal
+import sys
+import tempfile
+import time
+from typing import Dict, Any, List
+from benchmarks.synthetic_corpus import generate_corpus
+
+MAIN_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+DEFAULT_SCALES = "1000,10000,100000"  # Up to 1000000 with --scales, with a --timeout to cut the slow tasks
+MIN_SECONDS = 0.05  # Time differences below this are noise, never regressions
+
+
+def task_arguments(task: int, paths: Dict[str, str], work_dir: str) -> List[str]:
+    """ The command line of a task, reading the Task 1 (or Task 6) JSON written by the earlier runs. """
+    task1_path = os.path.join(work_dir, "task1.json")
+    task6_path = os.path.join(work_dir, "task6.json")
+    if task == 1:
+        return ["-t", "1", "-s", paths["sentences"], "-n", paths["people"], "-r", paths["stopwords"],
+                "-o", task1_path]
+    arguments = {
+        2: ["--maxk", "3"],
+        3: [],
+        4: ["--qsek_query_path", paths["kseq"]],
+        5: ["--maxk", "3"],
+        6: ["--windowsize", "3", "--threshold", "2", "-o", task6_path],
+        7: ["--pairs", paths["pairs"], "--maximal_distance", "3"],
+        8: ["--pairs", paths["pairs"], "--fixed_length", "3"],
+        9: ["--threshold", "3"],
+    }[task]
+    preprocessed = task6_path if task in (7, 8) else task1_path
+    if "-o" not in arguments:
+        arguments += ["-o", os.devnull]
+    return ["-t", str(task), "-p", preprocessed] + arguments
+
+
+def run_task(arguments: List[str], timeout: float, log_path: str) -> Dict[str, Any]:
+    """
+    Run main.py in a child process, reaped with wait4 to get the resource usage of that child alone.
+    :param arguments: The command line arguments of main.py.
+    :param timeout: Seconds before the child is killed.
+    :param log_path: File receiving the output of the child (its error messages, since results go to -o).
+    :return: {"seconds", "peak_rss_mb"} of the run, or {"status"} if it failed or timed out.
+    """
+    log_flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC
+    start = time.perf_counter()
+    pid = os.posix_spawn(sys.executable, [sys.executable, MAIN_PATH] + arguments, os.environ,
+                         file_actions=[(os.POSIX_SPAWN_OPEN, 1, log_path, log_flags, 0o644),
+                                       (os.POSIX_SPAWN_DUP2, 1, 2)])
+    while True:
+        finished, status, usage = os.wait4(pid, os.WNOHANG)
+        if finished:
+            break
+        if time.perf_counter() - start > timeout:
+            os.kill(pid, signal.SIGKILL)
+            os.wait4(pid, 0)
+            return {"status": "timeout"}
+        time.sleep(0.005)
+    seconds = time.perf_counter() - start
+
+    if os.waitstatus_to_exitcode(status) != 0:
+        with open(log_path, "r") as file:
+            return {"status": "failed: " + file.read().strip()[-200:]}
+    return {"seconds": round(seconds, 4), "peak_rss_mb": round(usage.ru_maxrss / 1024, 1)}  # ru_maxrss is in KB
+
+
+def run_suite(scales: List[int], tasks: List[int], timeout: float, seed: int) -> Dict[str, Any]:
+    """
+    Benchmark the tasks at each scale.
+    :return: {scale -> {task -> measurement}}, see run_task.
+    """
+    tasks = set(tasks) | {1}  # The other tasks read the Task 1 JSON
+    if tasks & {7, 8}:
+        tasks.add(6)  # Tasks 7 and 8 read the Task 6 JSON
+    results = {}
+    for scale in scales:
+        with tempfile.TemporaryDirectory() as work_dir:
+            paths = generate_corpus(os.path.join(work_dir, "corpus"), scale, seed=seed)
+            results[str(scale)] = {}
+            for task in sorted(tasks):
+                measurement = run_task(task_arguments(task, paths, work_dir), timeout,
+                                       os.path.join(work_dir, "output.log"))
+                results[str(scale)][str(task)] = measurement
+                print(f"{scale:>8} Task {task}: " + ", ".join(f"{key} {value}" for key, value in measurement.items()),
+                      file=sys.stderr, flush=True)
+    return results
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Compare results with a baseline.
+    :return: A description of each regression, a time or peak RSS above the baseline by more than the tolerance.
+    """
+    regressions = []
+    for scale, tasks in results.items():
+        for task, measurement in tasks.items():
+            reference = baseline.get(scale, {}).get(task)
+            if not reference or "seconds" not in reference:
+                continue
+            if "seconds" not in measurement:
+                regressions.append(f"{scale} sentences, Task {task}: {measurement['status']}")
+                continue
+            if (measurement["seconds"] > reference["seconds"] * (1 + tolerance)
+                    and measurement["seconds"] - reference["seconds"] > MIN_SECONDS):
+                regressions.append(f"{scale} sentences, Task {task}: {measurement['seconds']}s "
+                                   f"(baseline {reference['seconds']}s)")
+            if measurement["peak_rss_mb"] > reference["peak_rss_mb"] * (1 + tolerance):
+                regressions.append(f"{scale} sentences, Task {task}: {measurement['peak_rss_mb']} MB peak RSS "
+                                   f"(baseline {reference['peak_rss_mb']} MB)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark suite of Tasks 1-9 on synthetic corpora")
+    parser.add_argument('--scales', default=DEFAULT_SCALES, help="comma separated numbers of sentences")
+    parser.add_argument('--tasks', default="1,2,3,4,5,6,7,8,9", help="comma separated task numbers")
+    parser.add_argument('--timeout', type=float, default=600, help="seconds before a task run is stopped")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--baseline', help="saved results to compare with")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed relative slowdown or growth")
+    parser.add_argument('--save_baseline', help="file to save the results to, as the new baseline")
+    args = parser.parse_args()
+
+    scales = [int(scale) for scale in args.scales.split(",")]
+    tasks = [int(task) for task in args.tasks.split(",")]
+    results = run_suite(scales, tasks, args.timeout, args.seed)
+    print(json.dumps(results, indent=4))
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as file:
+            json.dump(results, file, indent=4)
+    if args.baseline:
+        with open(args.baseline, "r") as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# Description: Generator of synthetic corpora for the benchmarks.
+# Sentences have normally distributed lengths and words drawn from a Zipfian vocabulary, and mention people
+# from "Data - example/NAMES.csv" (by full name or by one of their names) at a configurable rate. Next to the
+# sentences and people files, the generator writes K-seq queries and people pairs drawn from the corpus,
+# so every task can run on it.
+# Run from the project root: python3 -m benchmarks.synthetic_corpus --sentences 10000 --output_dir /tmp/corpus
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import random
+from typing import Dict, List
+from task_implementation.Task_1_Preprocessing import Preprocessing, clean_text
+
+NAMES_PATH = os.path.join("Data - example", "NAMES.csv")
+STOPWORDS_PATH = os.path.join("Data - example", "REMOVEWORDS.csv")
+SYLLABLES = ["ka", "lo", "mi", "ra", "te", "su", "no", "vi", "de", "pa", "gor", "lin", "dra", "bel", "tho", "wen"]
+
+
+def make_vocabulary(size: int, seed: int) -> List[str]:
+    """ Distinct pronounceable made-up words, which never collide with the stopwords or the names, by rank. """
+    rng = random.Random(seed)
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) + "x")
+    words = sorted(words)
+    rng.shuffle(words)  # Unrelated to the rank
+    return words
+
+
+def load_people(names_path: str, count: int, seed: int) -> List[Dict[str, str]]:
+    """ A random sample of the rows of the names file, with a full name of at least two words. """
+    with open(names_path, "r") as file:
+        rows = [row for row in csv.DictReader(file) if len(row["Name"].split()) >= 2 and "." not in row["Name"]]
+    return random.Random(seed).sample(rows, min(count, len(rows)))
+
+
+def generate_corpus(
+        output_dir: str,
+        sentences: int,
+        mean_length: float = 12,
+        length_deviation: float = 5,
+        vocabulary_size: int = 20000,
+        zipf_exponent: float = 1.1,
+        people: int = 200,
+        name_density: float = 0.3,
+        queries: int = 100,
+        seed: int = 0,
+        names_path: str = NAMES_PATH
+) -> Dict[str, str]:
+    """
+    Write a synthetic corpus.
+
+    :param output_dir: Directory of the generated files, created if missing.
+    :param sentences: Number of sentences.
+    :param mean_length: Mean number of words of a sentence.
+    :param length_deviation: Standard deviation of the number of words (lengths are at least 1).
+    :param vocabulary_size: Number of distinct words.
+    :param zipf_exponent: Exponent s of the Zipf law, the word of rank r is drawn with weight 1 / r^s.
+    :param people: Number of people taken from the names file.
+    :param name_density: Probability of a sentence to mention a person (or two, with half that probability).
+    :param queries: Number of K-seq queries and of people pairs to write.
+    :param seed: Seed of the random generator, the same parameters always give the same files.
+    :param names_path: The names file the people are taken from.
+    :return: The paths of the generated files, {"sentences", "people", "stopwords", "kseq", "pairs"}.
+    """
+    rng = random.Random(seed)
+    os.makedirs(output_dir, exist_ok=True)
+    vocabulary = make_vocabulary(vocabulary_size, seed)
+    cumulative_weights = list(itertools.accumulate(1 / rank ** zipf_exponent
+                                                   for rank in range(1, vocabulary_size + 1)))
+    people_rows = load_people(names_path, people, seed)
+    mentions = [[row["Name"]] + [name for name in row["Name"].split() if len(name) > 2] for row in people_rows]
+
+    paths = {name: os.path.join(output_dir, file_name) for name, file_name in (
+        ("sentences", "sentences.csv"), ("people", "people.csv"), ("kseq", "kseq_queries.json"),
+        ("pairs", "people_pairs.json"))}
+    paths["stopwords"] = STOPWORDS_PATH
+
+    sample_sentences = []  # A few sentences to draw the K-seq queries from
+    with open(paths["sentences"], "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["sentence"])
+        for i in range(sentences):
+            length = max(1, round(rng.gauss(mean_length, length_deviation)))
+            words = rng.choices(vocabulary, cum_weights=cumulative_weights, k=length)
+            if mentions and rng.random() < name_density:
+                for _ in range(2 if rng.random() < 0.5 else 1):
+                    words.insert(rng.randrange(len(words) + 1), rng.choice(rng.choice(mentions)))
+            if len(sample_sentences) < queries:
+                sample_sentences.append(words)
+            elif rng.random() < queries / (i + 1):  # Reservoir sampling over the whole corpus
+                sample_sentences[rng.randrange(queries)] = words
+            writer.writerow([" ".join(words).capitalize() + "."])
+
+    with open(paths["people"], "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["Name", "Other Names"])
+        for row in people_rows:
+            writer.writerow([row["Name"], row["Other Names"]])
+
+    keys = []
+    for words in sample_sentences:
+        start = rng.randrange(len(words))
+        keys.append([word.lower() for word in words[start:start + rng.randint(1, 3)]])
+    with open(paths["kseq"], "w") as file:
+        json.dump({"keys": keys}, file)
+
+    # Pairs use the preprocessed names, as in the Task 7 and 8 pair files
+    stopwords = Preprocessing.load_stopwords_file(paths["stopwords"])
+    names = sorted({clean_text(row["Name"], stopwords) for row in people_rows} - {""})
+    pairs = [rng.sample(names, 2) for _ in range(queries)] if len(names) >= 2 else []
+    with open(paths["pairs"], "w") as file:
+        json.dump({"keys": pairs}, file)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic corpus generator")
+    parser.add_argument('--output_dir', required=True, help="directory of the generated files")
+    parser.add_argument('--sentences', type=int, default=10000, help="number of sentences")
+    parser.add_argument('--mean_length', type=float, default=12, help="mean number of words per sentence")
+    parser.add_argument('--length_deviation', type=float, default=5, help="standard deviation of the lengths")
+    parser.add_argument('--vocabulary', type=int, default=20000, help="number of distinct words")
+    parser.add_argument('--zipf', type=float, default=1.1, help="exponent of the Zipfian word distribution")
+    parser.add_argument('--people', type=int, default=200, help="number of people taken from NAMES.csv")
+    parser.add_argument('--name_density', type=float, default=0.3, help="probability of a sentence to name a person")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    paths = generate_corpus(args.output_dir, args.sentences, args.mean_length, args.length_deviation,
+                            args.vocabulary, args.zipf, args.people, args.name_density, seed=args.seed)
+    print(json.dumps(paths, indent=4))
+
+
+if __name__ == "__main__":
+    main()
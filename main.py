@@ -1,14 +1,13 @@
 import argparse
-import json
+import os
 import sys
-from task_implementation.Task_1_Preprocessing import Preprocessing
-from task_implementation.Task_2_Counting_Seq import SequenceCounter
-from task_implementation.Task_3_Counting_Person import PersonMentionCounter
-from task_implementation.Task_4_Search_Engine import SearchEngine
-from task_implementation.Task_5_Contexts import PersonContexts
-from task_implementation.Task_6_Direct_Connections import DirectConnections
-from task_implementation.Task_7_8_Indirect_Connections import IndirectPaths
-from task_implementation.Task_9_Grouping_Sentences import SentenceClustering
+from contextlib import ExitStack
+from typing import Dict, Any
+
+# Task modules, engines and optional backends are imported by the functions that use them, so a run only pays
+# for the imports of its own task (see benchmarks/bench_startup.py)
+
+DEFAULT_HOST = "127.0.0.1"  # Same as Utilities.server.DEFAULT_HOST, without importing asyncio for every run
 
 
 def readargs(args=None):
@@ -16,11 +15,14 @@ def readargs(args=None):
         prog='Text Analyzer project',
     )
     # General arguments
-    parser.add_argument('-t', '--task',
-                        help="task number",
-                        type=int,
-                        required=True
-                        )
+    task_selection = parser.add_mutually_exclusive_group(required=True)
+    task_selection.add_argument('-t', '--task',
+                                help="task number",
+                                type=int,
+                                )
+    task_selection.add_argument('--tasks',
+                                help="comma separated task numbers to run in a single process, e.g. 2,3,5,6,7",
+                                )
     parser.add_argument('-s', '--sentences',
                         help="Sentence file path",
                         )
@@ -57,110 +59,504 @@ def readargs(args=None):
                         type=int,
                         help="maximal distance between nodes in graph",
                         )
+    parser.add_argument('--windowsizes',
+                        type=int,
+                        nargs='+',
+                        help="window sizes to sweep in Task 6, giving the Pair Matches of every combination with "
+                             "the thresholds in one run",
+                        )
+    parser.add_argument('--thresholds',
+                        type=int,
+                        nargs='+',
+                        help="graph connection thresholds to sweep in Task 6, with the window sizes",
+                        )
+
+    parser.add_argument('--all_pairs',
+                        action='store_true',
+                        help="precompute all-pairs distances (saved next to the Task 6 JSON) for Task 7",
+                        )
+    parser.add_argument('--save_counts',
+                        action='store_true',
+                        help="save the Task 6 co-occurrence counts next to the output file, with the .counts "
+                             "extension instead of its own (-o q6.json saves q6.counts)",
+                        )
+    parser.add_argument('--counts',
+                        help="co-occurrence counts saved by Task 6, answering Tasks 6, 7 and 8 without the corpus",
+                        )
+    parser.add_argument('--top_neighbors',
+                        type=int,
+                        help="also list the people co-occurring most with each person in Task 6",
+                        )
+
+    parser.add_argument('--walks',
+                        action='store_true',
+                        help="check for walks of length fixed_length instead of simple paths in Task 8",
+                        )
 
     parser.add_argument('--qsek_query_path',
                         help="json file with query path",
                         )
+    parser.add_argument('--top_k',
+                        type=int,
+                        help="return only the top_k sentences of each K-seq and query in Task 4, ranked by BM25",
+                        )
+    parser.add_argument('--shards',
+                        nargs='+',
+                        help="more corpora (Task 1 JSON or sentences CSV files) searched by Task 4, each with its "
+                             "own index shard",
+                        )
+    parser.add_argument('--shard_count',
+                        type=int,
+                        default=1,
+                        help="split the index of each Task 4 corpus into this many shards of consecutive sentences",
+                        )
+    parser.add_argument('--shard_processes',
+                        action='store_true',
+                        help="search each Task 4 index shard in a process of its own instead of a thread",
+                        )
+    parser.add_argument('--raw_offsets',
+                        action='store_true',
+                        help="record the byte offsets of the original sentences next to the Task 1 output "
+                             "(<output>.offsets)",
+                        )
+    parser.add_argument('--raw_text',
+                        action='store_true',
+                        help="add the original text of the matched sentences to the Task 4 results, read through "
+                             "the offsets recorded next to the preprocessed file",
+                        )
+    parser.add_argument('--cache_dir',
+                        help="directory of the artifact cache, reused across runs on the same inputs",
+                        )
+    parser.add_argument('--cache_max_mb',
+                        type=int,
+                        default=1024,
+                        help="maximal size of the artifact cache in MB",
+                        )
+    parser.add_argument('-o', '--output',
+                        help="file to write the results to, standard output by default",
+                        )
+    output_format = parser.add_mutually_exclusive_group()
+    output_format.add_argument('--compact',
+                               action='store_true',
+                               help="write compact JSON instead of indented JSON",
+                               )
+    output_format.add_argument('--ndjson',
+                               action='store_true',
+                               help="write one JSON object per result list element and line (NDJSON)",
+                               )
+    parser.add_argument('--profile',
+                        nargs='?',
+                        const='-',
+                        help="write a JSON report of the time, memory and items of every stage to this file "
+                             "(standard error if no file is given)",
+                        )
+    parser.add_argument('--progress',
+                        nargs='?',
+                        const='-',
+                        help="report the progress, rate and ETA of the long loops of Tasks 5, 6 and 9 on standard "
+                             "error, or as JSON lines to this metrics file",
+                        )
+    return parser.parse_args(args)
+
+
+def read_serve_args(args=None):
+    parser = argparse.ArgumentParser(
+        prog='Text Analyzer project serve',
+        description="Load the corpus once and answer K-seq, person context and connectivity queries on a local port",
+    )
+    parser.add_argument('-s', '--sentences',
+                        help="Sentence file path",
+                        )
+    parser.add_argument('-n', '--names',
+                        help="Names file path",
+                        )
+    parser.add_argument('-r', '--removewords',
+                        help="Words to remove file path",
+                        )
+    parser.add_argument('-p', '--preprocessed',
+                        help="json with preprocessed data",
+                        )
+    parser.add_argument('--graph',
+                        help="json with the Task 6 results, used instead of building the graph",
+                        )
+    parser.add_argument('--maxk',
+                        type=int,
+                        help="Max k of the person contexts",
+                        )
+    parser.add_argument('--windowsize',
+                        type=int,
+                        help="Window size",
+                        )
+    parser.add_argument('--threshold',
+                        type=int,
+                        help="graph connection threshold",
+                        )
+    parser.add_argument('--maximal_distance',
+                        type=int,
+                        help="default maximal distance of connectivity queries",
+                        )
+    parser.add_argument('--all_pairs',
+                        action='store_true',
+                        help="precompute all-pairs distances to answer connectivity queries by lookup",
+                        )
+    parser.add_argument('--host',
+                        default=DEFAULT_HOST,
+                        help="address to listen on",
+                        )
+    parser.add_argument('--port',
+                        type=int,
+                        default=8765,
+                        help="port to listen on",
+                        )
+    parser.add_argument('--workers',
+                        type=int,
+                        default=4,
+                        help="number of threads answering queries",
+                        )
+    parser.add_argument('--cache_dir',
+                        help="directory of the artifact cache, reused across runs on the same inputs",
+                        )
+    parser.add_argument('--cache_max_mb',
+                        type=int,
+                        default=1024,
+                        help="maximal size of the artifact cache in MB",
+                        )
     return parser.parse_args(args)
 
 
+def serve(args):
+    """ Build the engines whose inputs were given, then answer queries until interrupted. """
+    from task_implementation.Task_4_Search_Engine import SearchEngine
+    from task_implementation.Task_5_Contexts import PersonContexts
+    from task_implementation.Task_6_Direct_Connections import DirectConnections
+    from task_implementation.Task_7_8_Indirect_Connections import IndirectPaths
+    from Utilities.cache import configure_cache
+    from Utilities.helper import preprocess_init
+    from Utilities.server import QueryServer
+
+    if args.cache_dir:
+        configure_cache(args.cache_dir, args.cache_max_mb * 1024 * 1024)
+
+    data = None
+    if args.preprocessed or args.sentences:
+        data = preprocess_init(args.preprocessed, args.sentences, args.names, args.removewords)
+
+    search_engine = SearchEngine(k_seq_list={"keys": []}, data=data) if data is not None else None
+    person_contexts = None
+    if data is not None and data.get("Processed Names") and args.maxk is not None:
+        person_contexts = PersonContexts(N=args.maxk, data=data)
+
+    indirect_paths = None
+    graph_options = dict(question_num=7, people_pairs=[], all_pairs=args.all_pairs,
+                         maximal_distance=args.maximal_distance if args.maximal_distance is not None else 0)
+    if args.graph:
+        indirect_paths = IndirectPaths(preprocess_path=args.graph, **graph_options)
+    elif data is not None and data.get("Processed Names") and None not in (args.windowsize, args.threshold):
+        direct_connections = DirectConnections(question_num=6, window_size=args.windowsize,
+                                               threshold=args.threshold, data=data)
+        indirect_paths = IndirectPaths(direct_connections=direct_connections, **graph_options)
+
+    if search_engine is None and indirect_paths is None:
+        print("Error: Provide a sentences file, a preprocessed JSON or a Task 6 graph to serve.")
+        sys.exit(1)
+
+    server = QueryServer(search_engine=search_engine,
+                         person_contexts=person_contexts,
+                         indirect_paths=indirect_paths,
+                         maximal_distance=args.maximal_distance,
+                         workers=args.workers)
+    server.serve_forever(args.host, args.port)
+
+
+def read_append_args(args=None):
+    parser = argparse.ArgumentParser(
+        prog='Text Analyzer project append',
+        description="Read the rows appended to the sentences file and update the saved corpus state in place",
+    )
+    parser.add_argument('--state',
+                        required=True,
+                        help="incremental corpus state file, created on the first run",
+                        )
+    parser.add_argument('-s', '--sentences',
+                        help="Sentence file path (first run only)",
+                        )
+    parser.add_argument('-n', '--names',
+                        help="Names file path (first run only)",
+                        )
+    parser.add_argument('-r', '--removewords',
+                        help="Words to remove file path (first run only)",
+                        )
+    parser.add_argument('--maxk',
+                        type=int,
+                        help="Max k of the maintained sequence counts (first run only)",
+                        )
+    parser.add_argument('--windowsize',
+                        type=int,
+                        help="Window size of the maintained co-occurrence counts (first run only)",
+                        )
+    parser.add_argument('--threshold',
+                        type=int,
+                        help="print the Task 6 results for this graph connection threshold",
+                        )
+    parser.add_argument('--qsek_query_path',
+                        help="print the Task 4 results for this json file with query path",
+                        )
+    parser.add_argument('--counts',
+                        action='store_true',
+                        help="print the Task 2 results",
+                        )
+    return parser.parse_args(args)
+
+
+def append(args) -> Dict[str, Any]:
+    """ Update the incremental corpus with the new sentences, and return a summary and the requested results. """
+    from Utilities.incremental import IncrementalCorpus
+
+    if os.path.exists(args.state):
+        corpus = IncrementalCorpus.load(args.state)
+    else:
+        corpus = IncrementalCorpus(sentences_path=args.sentences,
+                                   people_path=args.names,
+                                   stopwords_path=args.removewords,
+                                   N=args.maxk,
+                                   window_size=args.windowsize)
+    appended = corpus.update()
+    corpus.save(args.state)
+
+    result = {"Incremental Update": {"Appended Sentences": appended,
+                                     "Total Sentences": len(corpus.processed_sentences)}}
+    if args.counts:
+        result.update(corpus.sequence_count_results())
+    if args.qsek_query_path:
+        result.update(corpus.search_results(args.qsek_query_path))
+    if args.threshold is not None:
+        result.update(corpus.pair_match_results(args.threshold))
+    return result
+
+
+def task_1(args) -> Dict[str, Any]:
+    from task_implementation.Task_1_Preprocessing import Preprocessing
+    if args.raw_offsets and not args.output:
+        print("Error: --raw_offsets needs an output file (-o), the offsets are written next to it.")
+        sys.exit(1)
+    processor = Preprocessing(question_num=args.task,
+                              sentences_path=args.sentences,
+                              people_path=args.names,
+                              stopwords_path=args.removewords,
+                              record_offsets=args.raw_offsets)
+    result = processor.generate_results()
+    if args.raw_offsets:
+        from Utilities.raw_text import OFFSETS_SUFFIX, write_offsets
+        write_offsets(args.output + OFFSETS_SUFFIX, args.sentences, "sentence", processor.sentence_offsets)
+    return result
+
+
+def task_2(args) -> Dict[str, Any]:
+    from task_implementation.Task_2_Counting_Seq import SequenceCounter
+    counter = SequenceCounter(question_num=args.task,
+                              sentences_path=args.sentences,
+                              stopwords_path=args.removewords,
+                              preprocess_path=args.preprocessed,
+                              N=args.maxk)
+    return counter.generate_results()
+
+
+def task_3(args) -> Dict[str, Any]:
+    from task_implementation.Task_3_Counting_Person import PersonMentionCounter
+    person_counter = PersonMentionCounter(question_num=args.task,
+                                          sentences_path=args.sentences,
+                                          stopwords_path=args.removewords,
+                                          people_path=args.names,
+                                          preprocess_path=args.preprocessed)
+    return person_counter.generate_results()
+
+
+def task_4(args) -> Dict[str, Any]:
+    raw_offsets_path = None
+    if args.raw_text:
+        if not args.preprocessed:
+            print("Error: --raw_text needs the preprocessed file (-p) written by Task 1 with --raw_offsets.")
+            sys.exit(1)
+        from Utilities.raw_text import OFFSETS_SUFFIX
+        raw_offsets_path = args.preprocessed + OFFSETS_SUFFIX
+        if args.shards or args.shard_count != 1:
+            print("Error: --raw_text reads the offsets of a single corpus, it cannot be used with sharded indexes.")
+            sys.exit(1)
+    if args.shards or args.shard_count != 1:
+        from task_implementation.Task_4_Search_Engine import ShardedSearchEngine
+        corpus_paths = [path for path in [args.preprocessed or args.sentences] if path] + (args.shards or [])
+        search_engine = ShardedSearchEngine(question_num=args.task,
+                                            corpus_paths=corpus_paths,
+                                            stopwords_path=args.removewords,
+                                            k_seq_path=args.qsek_query_path,
+                                            top_k=args.top_k,
+                                            shard_count=args.shard_count,
+                                            processes=args.shard_processes)
+        try:
+            return search_engine.generate_results()
+        finally:
+            search_engine.close()
+    from task_implementation.Task_4_Search_Engine import SearchEngine
+    search_engine = SearchEngine(question_num=args.task,
+                                 sentences_path=args.sentences,
+                                 stopwords_path=args.removewords,
+                                 k_seq_path=args.qsek_query_path,
+                                 preprocess_path=args.preprocessed,
+                                 top_k=args.top_k,
+                                 raw_offsets_path=raw_offsets_path)
+    return search_engine.generate_results()
+
+
+def task_5(args) -> Dict[str, Any]:
+    from task_implementation.Task_5_Contexts import PersonContexts
+    context_finder = PersonContexts(question_num=args.task,
+                                    sentences_path=args.sentences,
+                                    people_path=args.names,
+                                    stopwords_path=args.removewords,
+                                    preprocess_path=args.preprocessed,
+                                    N=args.maxk)
+    return context_finder.generate_results()
+
+
+def task_6(args) -> Dict[str, Any]:
+    if args.counts:
+        if args.windowsizes or args.save_counts:
+            print("Error: The saved co-occurrence counts are those of one window size, they cannot be swept or "
+                  "saved again.")
+            sys.exit(1)
+        from task_implementation.Task_6_Direct_Connections import SavedDirectConnections
+        saved_conn = SavedDirectConnections(question_num=args.task,
+                                            counts_path=args.counts,
+                                            threshold=args.threshold,
+                                            thresholds=args.thresholds,
+                                            top_neighbors=args.top_neighbors)
+        return saved_conn.generate_results()
+    if args.save_counts and (not args.output or args.windowsizes):
+        print("Error: --save_counts needs an output file (-o), the counts of a single --windowsize are saved next "
+              "to it.")
+        sys.exit(1)
+    from task_implementation.Task_6_Direct_Connections import DirectConnections
+    direct_conn = DirectConnections(question_num=args.task,
+                                    sentences_path=args.sentences,
+                                    people_path=args.names,
+                                    stopwords_path=args.removewords,
+                                    preprocess_path=args.preprocessed,
+                                    window_size=args.windowsize,
+                                    threshold=args.threshold,
+                                    window_sizes=args.windowsizes,
+                                    thresholds=args.thresholds,
+                                    top_neighbors=args.top_neighbors)
+    result = direct_conn.generate_results()
+    if args.save_counts:
+        direct_conn.save_counts(os.path.splitext(args.output)[0] + ".counts")
+    return result
+
+
+def task_7(args) -> Dict[str, Any]:
+    from task_implementation.Task_7_8_Indirect_Connections import IndirectPaths
+    indirect_conn = IndirectPaths(question_num=args.task,
+                                  sentences_path=args.sentences,
+                                  people_path=args.names,
+                                  stopwords_path=args.removewords,
+                                  preprocess_path=args.preprocessed,
+                                  window_size=args.windowsize,
+                                  threshold=args.threshold,
+                                  people_connections_path=args.pairs,
+                                  maximal_distance=args.maximal_distance,
+                                  all_pairs=args.all_pairs,
+                                  counts_path=args.counts)
+    return indirect_conn.generate_results_task_7()
+
+
+def task_8(args) -> Dict[str, Any]:
+    from task_implementation.Task_7_8_Indirect_Connections import IndirectPaths
+    fixed_length_paths = IndirectPaths(question_num=args.task,
+                                       sentences_path=args.sentences,
+                                       people_path=args.names,
+                                       stopwords_path=args.removewords,
+                                       preprocess_path=args.preprocessed,
+                                       window_size=args.windowsize,
+                                       threshold=args.threshold,
+                                       people_connections_path=args.pairs,
+                                       K=args.fixed_length,
+                                       walks=args.walks,
+                                       counts_path=args.counts)
+    return fixed_length_paths.generate_results_task_8()
+
+
+def task_9(args) -> Dict[str, Any]:
+    from task_implementation.Task_9_Grouping_Sentences import SentenceClustering
+    sentence_cluster = SentenceClustering(question_num=9,
+                                          sentences_path=args.sentences,
+                                          stopwords_path=args.removewords,
+                                          preprocess_path=args.preprocessed,
+                                          threshold=args.threshold,
+                                          )
+    return sentence_cluster.generate_results()
+
+
+TASKS = {1: task_1, 2: task_2, 3: task_3, 4: task_4, 5: task_5, 6: task_6, 7: task_7, 8: task_8, 9: task_9}
+COMMANDS = {"serve": (read_serve_args, serve), "append": (read_append_args, append)}  # {subcommand -> (parse, run)}
+
+
 def main():
+    if sys.argv[1:2] and sys.argv[1] in COMMANDS:
+        parse, command = COMMANDS[sys.argv[1]]
+        result = command(parse(sys.argv[2:]))
+        if result is not None:
+            from Utilities.output import OutputFile
+            with OutputFile() as writer:
+                writer.write(result)
+        return
+
     args = readargs()
+    with ExitStack() as stack:
+        if args.profile is not None:
+            from Utilities.profiling import profiling
+            stack.enter_context(profiling(args.profile))
+        if args.progress is not None:
+            from Utilities.progress import reporting_progress
+            stack.enter_context(reporting_progress(args.progress))
+        run(args)
+
 
+def run(args):
     # General check for preprocessed data
     if args.preprocessed and not args.preprocessed.endswith('.json'):
         print("Error: The preprocessed file should be a JSON file.")
         sys.exit(1)
 
-    if args.task == 1:
-        processor = Preprocessing(question_num=args.task,
-                                  sentences_path=args.sentences,
-                                  people_path=args.names,
-                                  stopwords_path=args.removewords)
-        result = processor.generate_results()
+    if args.cache_dir:
+        from Utilities.cache import configure_cache
+        configure_cache(args.cache_dir, args.cache_max_mb * 1024 * 1024)
 
-    elif args.task == 2:
-        counter = SequenceCounter(question_num=args.task,
-                                  sentences_path=args.sentences,
-                                  stopwords_path=args.removewords,
-                                  preprocess_path=args.preprocessed,
-                                  N=args.maxk)
-        result = counter.generate_results()
-
-    elif args.task == 3:
-        person_counter = PersonMentionCounter(question_num=args.task,
-                                              sentences_path=args.sentences,
-                                              stopwords_path=args.removewords,
-                                              people_path=args.names,
-                                              preprocess_path=args.preprocessed)
-        result = person_counter.generate_results()
-
-    elif args.task == 4:
-        search_engine = SearchEngine(question_num=args.task,
-                                     sentences_path=args.sentences,
-                                     stopwords_path=args.removewords,
-                                     k_seq_path=args.qsek_query_path,
-                                     preprocess_path=args.preprocessed)
-        result = search_engine.generate_results()
-
-    elif args.task == 5:
-        context_finder = PersonContexts(question_num=args.task,
-                                        sentences_path=args.sentences,
-                                        people_path=args.names,
-                                        stopwords_path=args.removewords,
-                                        preprocess_path=args.preprocessed,
-                                        N=args.maxk)
-        result = context_finder.generate_results()
-
-    elif args.task == 6:
-
-        direct_conn = DirectConnections(question_num=args.task,
-                                        sentences_path=args.sentences,
-                                        people_path=args.names,
-                                        stopwords_path=args.removewords,
-                                        preprocess_path=args.preprocessed,
-                                        window_size=args.windowsize,
-                                        threshold=args.threshold)
-        result = direct_conn.generate_results()
-
-    elif args.task == 7:
-        indirect_conn = IndirectPaths(question_num=args.task,
-                                      sentences_path=args.sentences,
-                                      people_path=args.names,
-                                      stopwords_path=args.removewords,
-                                      preprocess_path=args.preprocessed,
-                                      window_size=args.windowsize,
-                                      threshold=args.threshold,
-                                      people_connections_path=args.pairs,
-                                      maximal_distance=args.maximal_distance)
-        result = indirect_conn.generate_results_task_7()
-
-    elif args.task == 8:
-        fixed_length_paths = IndirectPaths(question_num=args.task,
-                                           sentences_path=args.sentences,
-                                           people_path=args.names,
-                                           stopwords_path=args.removewords,
-                                           preprocess_path=args.preprocessed,
-                                           window_size=args.windowsize,
-                                           threshold=args.threshold,
-                                           people_connections_path=args.pairs,
-                                           K=args.fixed_length)
-        result = fixed_length_paths.generate_results_task_8()
-
-    elif args.task == 9:
-        sentence_cluster = SentenceClustering(question_num=9,
-                                              sentences_path=args.sentences,
-                                              stopwords_path=args.removewords,
-                                              preprocess_path=args.preprocessed,
-                                              threshold=args.threshold,
-                                              )
-        result = sentence_cluster.generate_results()
+    if args.tasks and (args.windowsizes or args.thresholds):
+        print("Error: --windowsizes and --thresholds sweep Task 6 alone (-t 6), the --tasks share one graph.")
+        sys.exit(1)
 
-    else:
+    if args.tasks:
+        # Run all the requested tasks in this process, computing shared intermediates once,
+        # and write the results of each task as soon as it finishes
+        from Utilities.output import OutputFile
+        from Utilities.pipeline import Pipeline, parse_tasks
+        from Utilities.profiling import profile_stage
+        pipeline = Pipeline(parse_tasks(args.tasks), args)
+        pipeline.prepare()  # Every task checks its inputs before the output file is opened
+        with OutputFile(args.output, args.compact, args.ndjson) as writer:
+            for task_result in pipeline.results():
+                with profile_stage("write results"):
+                    writer.write(task_result)
+        return
+
+    if args.task not in TASKS:
         print("Invalid task number. Please specify a task between 1 and 9.")
         return
+    result = TASKS[args.task](args)
 
-    print(json.dumps(result, indent=4))
+    from Utilities.output import OutputFile
+    from Utilities.profiling import profile_stage
+    with profile_stage("write results"), OutputFile(args.output, args.compact, args.ndjson) as writer:
+        writer.write(result)
 
 
 if __name__ == "__main__":